@@ -1,12 +1,17 @@
-"""Command-line entrypoint and explicit command registry."""
+"""Command-line entrypoint built from the static command manifest."""
 
 from __future__ import annotations
 
 import argparse
 import sys
+from collections.abc import Sequence
+from pathlib import Path
+from typing import TYPE_CHECKING
 
-from .commands.common import Handler
-from .core.context import Context
+from .commands.registry import GROUPS
+
+if TYPE_CHECKING:
+    from .commands.common import Handler
 
 
 def _group(
@@ -18,51 +23,77 @@ def _group(
     return group.add_subparsers(dest=f"{name}_command", required=True)
 
 
-def build_parser() -> argparse.ArgumentParser:
+def _selected_command(argv: Sequence[str]) -> tuple[str, ...]:
+    """Return the group and command named in ``argv`` before parsing it."""
+
+    positionals: list[str] = []
+    arguments = iter(argv)
+    for argument in arguments:
+        if argument == "--trace-out":
+            next(arguments, None)
+        elif not argument.startswith("-"):
+            positionals.append(argument)
+            if len(positionals) == 2:
+                break
+    return tuple(positionals)
+
+
+def build_parser(argv: Sequence[str] | None = None) -> argparse.ArgumentParser:
+    """Build the command parser from the static command manifest.
+
+    Given the arguments about to be parsed, only the selected group's commands
+    are listed and only the selected command's module is imported and configured.
+    """
+
     parser = argparse.ArgumentParser(
         prog="ft",
         description="Authoritative Financial Tracker repository orchestrator",
     )
-    groups = parser.add_subparsers(dest="group", required=True)
-
-    from .commands import (
-        backend,
-        backup,
-        container,
-        debug,
-        deploy,
-        deps,
-        env,
-        frontend,
-        pipeline,
-        python,
-        release,
-        security,
+    parser.add_argument(
+        "--trace-out",
+        type=Path,
+        metavar="PATH",
+        help="Write a Chrome trace-event timeline of this run to PATH",
     )
-
-    python.register(_group(groups, "python", "Maintain the repository Python tooling"))
-    deps.register(_group(groups, "deps", "Install and verify repository dependencies"))
-    backend.register(_group(groups, "backend", "Build and maintain the .NET backend"))
-    frontend.register(_group(groups, "frontend", "Build and run the frontend"))
-    debug.register(_group(groups, "debug", "Manage local development environments"))
-    container.register(_group(groups, "container", "Build and smoke-test images"))
-    security.register(_group(groups, "security", "Scan dependencies and images"))
-    release.register(_group(groups, "release", "Validate release artifacts"))
-    deploy.register(_group(groups, "deploy", "Deploy and roll back instances"))
-    backup.register(_group(groups, "backup", "Create and verify encrypted backups"))
-    env.register(_group(groups, "env", "Validate and inspect environment profiles"))
-    pipeline.register(_group(groups, "ci", "Run repository verification workflows"))
+    groups = parser.add_subparsers(dest="group", required=True)
+    selected = None if argv is None else _selected_command(argv)
+    for group in GROUPS:
+        commands = _group(groups, group.name, group.description)
+        if selected is not None and selected[:1] != (group.name,):
+            continue
+        for command in group.commands:
+            command_parser = commands.add_parser(
+                command.name, help=command.description, description=command.description
+            )
+            if selected is None or selected == (group.name, command.name):
+                configure = command.load_configure()
+                if configure is not None:
+                    configure(command_parser)
+                command_parser.set_defaults(handler=command.load_handler())
     return parser
 
 
 def main(argv: list[str] | None = None) -> int:
     """Parse and execute one command."""
 
-    parser = build_parser()
-    arguments = parser.parse_args(argv)
+    if argv is None:
+        argv = sys.argv[1:]
+    arguments = build_parser(argv).parse_args(argv)
     handler: Handler = arguments.handler
+
+    from .core.context import Context
+    from .core.timeline import recording, span
+    from .core.trace import SubprocessTrace
+
+    command = getattr(arguments, f"{arguments.group}_command")
     try:
-        result = handler(Context(), arguments)
+        context = Context()
+        context.runner.trace = SubprocessTrace(context.paths.subprocess_trace)
+        with (
+            recording(arguments.trace_out),
+            span(f"ft {arguments.group} {command}", "command"),
+        ):
+            result = handler(context, arguments)
         return int(result or 0)
     except KeyboardInterrupt, BrokenPipeError:
         return 130
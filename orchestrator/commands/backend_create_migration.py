@@ -1,10 +1,14 @@
 """Create a database migration."""
 
-from argparse import Namespace
+from argparse import ArgumentParser, Namespace
 
 from ..core.context import Context
 
 
+def configure(parser: ArgumentParser) -> None:
+    parser.add_argument("name")
+
+
 def run(context: Context, args: Namespace) -> int:
     return context.runner.run(
         [
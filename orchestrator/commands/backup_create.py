@@ -1,11 +1,24 @@
 """Create an encrypted database backup."""
 
-from argparse import Namespace
+from argparse import ArgumentParser, Namespace
 
 from ..core.context import Context
 from ..operations.backup import BackupOperations
+from ..operations.validation import ValidationLevel
+from .backup_support import configure_validation
+
+
+def configure(parser: ArgumentParser) -> None:
+    configure_validation(parser)
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Pipe the snapshot into Restic instead of mounting it from disk",
+    )
 
 
 def run(context: Context, args: Namespace) -> int:
-    BackupOperations(args.path, context.runner).backup()
+    BackupOperations(args.path, context.runner).backup(
+        ValidationLevel(args.validation), stream=args.stream
+    )
     return 0
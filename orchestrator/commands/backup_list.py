@@ -0,0 +1,32 @@
+"""List the backup snapshots of an instance from its local catalog."""
+
+from argparse import ArgumentParser, Namespace
+
+from ..core.context import Context
+from ..operations.backup import BackupOperations
+from .backup_support import configure as configure_path
+
+
+def configure(parser: ArgumentParser) -> None:
+    configure_path(parser)
+    parser.add_argument(
+        "--cached",
+        action="store_true",
+        help="List the catalog without checking the repository for new snapshots",
+    )
+
+
+def run(context: Context, args: Namespace) -> int:
+    operations = BackupOperations(args.path, context.runner)
+    configuration = operations.configuration()
+    if args.cached:
+        snapshots = operations.list_snapshots(configuration, refresh=False)
+    else:
+        with operations.restic_session():
+            snapshots = operations.list_snapshots(configuration)
+    if not snapshots:
+        print(f"No backup snapshots exist for {configuration.name}")
+        return 0
+    for snapshot in snapshots:
+        print(f"{snapshot.short_id}  {snapshot.time.isoformat()}")
+    return 0
@@ -0,0 +1,34 @@
+"""Rebuild an instance database at a point in time from shipped WAL segments."""
+
+from __future__ import annotations
+
+from argparse import ArgumentParser, Namespace
+from datetime import UTC, datetime
+from pathlib import Path
+
+from ..core.context import Context
+from .backup_stream import configure_store, segment_store
+from .backup_support import timestamp
+
+
+def configure(parser: ArgumentParser) -> None:
+    configure_store(parser)
+    parser.add_argument(
+        "--to",
+        type=timestamp,
+        default=None,
+        help="ISO date or time to restore to; defaults to the latest shipped frames",
+    )
+    parser.add_argument(
+        "--output", required=True, help="Database file to write; must not exist"
+    )
+
+
+def run(context: Context, args: Namespace) -> int:
+    output = Path(args.output).expanduser().resolve()
+    if output.exists():
+        raise ValueError(f"{output} already exists")
+    moment = args.to or datetime.now(UTC)
+    reached = segment_store(args).restore(moment, output)
+    print(f"Restored {output} as of {reached.isoformat()}")
+    return 0
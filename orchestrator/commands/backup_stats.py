@@ -0,0 +1,93 @@
+"""Summarize recorded backup durations, sizes, and deduplication."""
+
+from __future__ import annotations
+
+import math
+import statistics
+from argparse import ArgumentParser, Namespace
+from collections.abc import Sequence
+from typing import Any
+
+from ..core.context import Context
+from ..operations.backup import BACKUP_STATE_DIRECTORY_NAME
+from ..operations.backup_state import read_history
+from ..operations.instance import resolve_instance_path
+from .backup_support import configure as configure_path
+
+PHASES = (
+    ("snapshot", "snapshot_seconds"),
+    ("validation", "validation_seconds"),
+    ("upload", "upload_seconds"),
+    ("prune", "prune_seconds"),
+)
+MEBIBYTE = 1024 * 1024
+
+
+def configure(parser: ArgumentParser) -> None:
+    configure_path(parser)
+    parser.add_argument(
+        "--last", type=int, default=90, help="Number of recent backups to include"
+    )
+
+
+def percentile(values: Sequence[float], fraction: float) -> float:
+    """Return the nearest-rank percentile of ``values``."""
+
+    ordered = sorted(values)
+    return ordered[max(math.ceil(fraction * len(ordered)) - 1, 0)]
+
+
+def trend(values: Sequence[float]) -> float | None:
+    """Return the change of the newer half's median over the older half's."""
+
+    if len(values) < 4:
+        return None
+    half = len(values) // 2
+    older = statistics.median(values[:half])
+    newer = statistics.median(values[-half:])
+    return None if older == 0 else newer / older - 1
+
+
+def total_seconds(entry: dict[str, Any]) -> float:
+    return sum(float(entry.get(key) or 0) for _, key in PHASES)
+
+
+def run(context: Context, args: Namespace) -> int:
+    history_path = (
+        resolve_instance_path(args.path) / BACKUP_STATE_DIRECTORY_NAME / "backups.jsonl"
+    )
+    entries = read_history(history_path)[-args.last :]
+    if not entries:
+        print(f"No backups have been recorded in {history_path}")
+        return 0
+    print(
+        f"{len(entries)} backups from {entries[0].get('finished_at', '?')}"
+        f" to {entries[-1].get('finished_at', '?')}"
+    )
+    print(f"{'phase':<11} {'p50 s':>8} {'p95 s':>8} {'max s':>8} {'trend':>7}")
+    rows = [
+        (name, [float(entry.get(key) or 0) for entry in entries])
+        for name, key in PHASES
+    ]
+    rows.append(("total", [total_seconds(entry) for entry in entries]))
+    for name, values in rows:
+        change = trend(values)
+        print(
+            f"{name:<11} {percentile(values, 0.5):8.1f} {percentile(values, 0.95):8.1f}"
+            f" {max(values):8.1f}"
+            f" {'' if change is None else f'{change:+.0%}':>7}"
+        )
+    added = [float(entry.get("data_added") or 0) for entry in entries]
+    processed = sum(float(entry.get("total_bytes_processed") or 0) for entry in entries)
+    change = trend(added)
+    print(
+        f"Data added: p50 {percentile(added, 0.5) / MEBIBYTE:.1f} MiB,"
+        f" p95 {percentile(added, 0.95) / MEBIBYTE:.1f} MiB"
+        + ("" if change is None else f", trend {change:+.0%}")
+    )
+    if sum(added):
+        print(
+            f"Deduplication: {processed / MEBIBYTE:.1f} MiB processed,"
+            f" {sum(added) / MEBIBYTE:.1f} MiB stored ({processed / sum(added):.1f}x)"
+        )
+    return 0
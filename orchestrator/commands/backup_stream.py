@@ -0,0 +1,89 @@
+"""Ship an instance's SQLite WAL continuously, and benchmark the shipper."""
+
+from __future__ import annotations
+
+import signal
+import tempfile
+import threading
+from argparse import ArgumentParser, Namespace
+from contextlib import suppress
+from pathlib import Path
+
+from ..core.context import Context
+from ..operations.backup import BACKUP_STATE_DIRECTORY_NAME
+from ..operations.instance import resolve_instance_path
+from ..operations.wal_shipping import (
+    POLL_SECONDS,
+    SegmentStore,
+    WalShipper,
+)
+from ..operations.wal_shipping import (
+    benchmark as run_benchmark,
+)
+from .backup_support import configure as configure_path
+
+MEBIBYTE = 1024 * 1024
+
+
+def configure_store(parser: ArgumentParser) -> None:
+    configure_path(parser)
+    parser.add_argument(
+        "--store",
+        help="Segment store directory; defaults to backup-state/wal in the instance",
+    )
+
+
+def configure(parser: ArgumentParser) -> None:
+    configure_store(parser)
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=POLL_SECONDS,
+        help="Seconds between shipping new WAL frames",
+    )
+
+
+def configure_benchmark(parser: ArgumentParser) -> None:
+    parser.add_argument(
+        "--transactions", type=int, default=2000, help="Synthetic transactions to ship"
+    )
+    parser.add_argument(
+        "--row-bytes", type=int, default=512, help="Payload bytes per transaction"
+    )
+
+
+def segment_store(args: Namespace) -> SegmentStore:
+    if args.store:
+        return SegmentStore(Path(args.store).expanduser().resolve())
+    instance = resolve_instance_path(args.path)
+    return SegmentStore(instance / BACKUP_STATE_DIRECTORY_NAME / "wal")
+
+
+def run(context: Context, args: Namespace) -> int:
+    if args.interval <= 0:
+        raise ValueError("The shipping interval must be positive")
+    database = resolve_instance_path(args.path) / "data" / "database.db"
+    if not database.is_file():
+        raise RuntimeError(f"No database exists at {database}")
+    store = segment_store(args)
+    shipper = WalShipper(database, store)
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    print(f"Shipping {database} to {store.root}; stop with Ctrl-C or SIGTERM")
+    with suppress(KeyboardInterrupt):
+        shipper.run(stop, args.interval)
+    print(f"Shipped {shipper.shipped_bytes / MEBIBYTE:.1f} MiB of WAL frames")
+    return 0
+
+
+def benchmark(context: Context, args: Namespace) -> int:
+    with tempfile.TemporaryDirectory(prefix="wal-benchmark-") as directory:
+        result = run_benchmark(
+            Path(directory), transactions=args.transactions, row_bytes=args.row_bytes
+        )
+    print(
+        f"Shipped {result.transactions} transactions in {result.seconds:.2f}s:"
+        f" {result.transactions / result.seconds:.0f} transactions/s,"
+        f" {result.bytes_per_second / MEBIBYTE:.1f} MiB/s of WAL frames"
+    )
+    return 0
@@ -0,0 +1,29 @@
+"""Arguments shared by backup commands."""
+
+from argparse import ArgumentParser
+from datetime import datetime
+
+from ..operations.restic import parse_restic_time
+from ..operations.validation import ValidationLevel
+
+
+def configure(parser: ArgumentParser) -> None:
+    parser.add_argument(
+        "--path", required=True, help="Path to the Financial Tracker instance"
+    )
+
+
+def configure_validation(parser: ArgumentParser) -> None:
+    configure(parser)
+    parser.add_argument(
+        "--validation",
+        choices=[level.value for level in ValidationLevel],
+        default=ValidationLevel.STANDARD.value,
+        help="Database validation depth; full checks tables in parallel",
+    )
+
+
+def timestamp(value: str) -> datetime:
+    """Parse an ISO date or time argument, taking times without an offset as UTC."""
+
+    return parse_restic_time(value)
@@ -1,11 +1,39 @@
-"""Restore and verify the latest encrypted backup."""
+"""Restore and verify encrypted backups that have not been verified yet."""
 
-from argparse import Namespace
+from argparse import ArgumentParser, Namespace
 
 from ..core.context import Context
-from ..operations.backup import BackupOperations
+from ..operations.backup import DATA_CHECK_SUBSETS, BackupOperations
+from ..operations.validation import ValidationLevel
+from .backup_support import configure_validation, timestamp
+
+
+def configure(parser: ArgumentParser) -> None:
+    configure_validation(parser)
+    parser.add_argument(
+        "--data-subsets",
+        type=int,
+        default=DATA_CHECK_SUBSETS,
+        help="Read one of this many repository data slices per run, in rotation",
+    )
+    selection = parser.add_mutually_exclusive_group()
+    selection.add_argument(
+        "--since",
+        type=timestamp,
+        help="Verify every unverified snapshot taken at or after this ISO date",
+    )
+    selection.add_argument(
+        "--all-unverified",
+        action="store_true",
+        help="Verify every snapshot that has not been verified yet",
+    )
 
 
 def run(context: Context, args: Namespace) -> int:
-    BackupOperations(args.path, context.runner).verify()
+    BackupOperations(args.path, context.runner).verify(
+        ValidationLevel(args.validation),
+        since=args.since,
+        all_unverified=args.all_unverified,
+        data_subsets=args.data_subsets,
+    )
     return 0
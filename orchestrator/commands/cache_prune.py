@@ -0,0 +1,21 @@
+"""Remove superseded cached CI step results."""
+
+from argparse import ArgumentParser, Namespace
+
+from ..core.context import Context
+from ..core.step_cache import StepCache
+
+
+def configure(parser: ArgumentParser) -> None:
+    parser.add_argument(
+        "--all",
+        action="store_true",
+        help="Remove every entry instead of keeping the newest per step",
+    )
+
+
+def run(context: Context, args: Namespace) -> int:
+    cache = StepCache(context.root, context.paths.ci_cache, context.paths.toolchain)
+    removed = cache.prune(keep_latest=not args.all)
+    print(f"Removed {removed} cached CI step results from {context.paths.ci_cache}")
+    return 0
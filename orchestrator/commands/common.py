@@ -13,22 +13,6 @@ from ..core.context import Context
 Handler = Callable[[Context, Namespace], int | None]
 
 
-def add_command(
-    commands: object,
-    name: str,
-    description: str,
-    handler: Handler,
-    configure: Callable[[ArgumentParser], None] | None = None,
-) -> ArgumentParser:
-    """Register one command in a subparser collection."""
-
-    parser = commands.add_parser(name, help=description, description=description)  # type: ignore[attr-defined]
-    if configure is not None:
-        configure(parser)
-    parser.set_defaults(handler=handler)
-    return parser
-
-
 def add_path_argument(parser: ArgumentParser, name: str, help_text: str) -> None:
     parser.add_argument(f"--{name}", required=True, help=help_text)
 
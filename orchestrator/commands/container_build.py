@@ -7,6 +7,8 @@ from argparse import Namespace
 
 from ..config.toolchain import Toolchain
 from ..core.context import Context
+from ..core.runner import Invocation
+from ..operations.migrator import source_migrations
 
 
 def run(context: Context, _args: Namespace) -> int:
@@ -36,9 +38,15 @@ def run(context: Context, _args: Namespace) -> int:
             context.paths.backend,
             "migrator",
             context.paths.migrator_dockerfile,
-            dotnet_build_args,
+            {
+                **dotnet_build_args,
+                "MIGRATIONS": ",".join(
+                    source_migrations(context.paths.backend_migrations)
+                ),
+            },
         ),
     )
+    invocations: list[Invocation] = []
     for build_context, image_name, dockerfile, build_args in images:
         tag = toolchain.require_image(image_name)
         scope = f"financial-tracker-{image_name}"
@@ -63,5 +71,6 @@ def run(context: Context, _args: Namespace) -> int:
                 ]
             )
         command.append(str(build_context))
-        context.runner.run(command, cwd=context.root)
+        invocations.append(Invocation(command, cwd=context.root, label=image_name))
+    context.runner.run_many(invocations)
     return 0
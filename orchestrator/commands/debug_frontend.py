@@ -1,11 +1,18 @@
 """Run the native debug frontend."""
 
-from argparse import Namespace
+from argparse import ArgumentParser, Namespace
 
 from ..core.context import Context
 from .debug_support import default_debug_frontend_port, environment
 
 
+def configure(parser: ArgumentParser) -> None:
+    parser.add_argument("--port", type=int, default=default_debug_frontend_port())
+    parser.add_argument(
+        "--inspect", action="store_true", help="Enable the Node.js inspector"
+    )
+
+
 def run(context: Context, args: Namespace) -> int:
     values = environment(context)
     print("Run Debug Frontend", flush=True)
@@ -1,9 +1,11 @@
 """Restore a production backup into the native debug database."""
 
 from argparse import ArgumentParser, Namespace
+from pathlib import Path
 
 from ..core.context import Context
 from ..operations.debug_restore import DebugRestoreOperations
+from .backup_support import timestamp
 
 
 def configure(parser: ArgumentParser) -> None:
@@ -13,6 +15,29 @@ def configure(parser: ArgumentParser) -> None:
         "--s3-uri", help="S3 bucket or prefix containing a Restic repository"
     )
     parser.add_argument("--aws-profile", help="AWS CLI profile used for an S3 download")
+    parser.add_argument(
+        "--mirror",
+        type=Path,
+        help="Directory of persistent S3 repository mirrors;"
+        " defaults to ~/.cache/financial-tracker/restic",
+    )
+    parser.add_argument(
+        "--snapshot-packs",
+        action="store_true",
+        help="Fetch only the packs the selected snapshot needs from S3",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Restore and migrate again even if the snapshot's database is cached",
+    )
+    selection = parser.add_mutually_exclusive_group()
+    selection.add_argument(
+        "--at",
+        type=timestamp,
+        help="Restore the newest snapshot taken at or before this ISO time",
+    )
+    selection.add_argument("--snapshot", help="Restore the snapshot with this ID")
 
 
 def run(context: Context, args: Namespace) -> int:
@@ -22,6 +47,11 @@ def run(context: Context, args: Namespace) -> int:
         aws_profile=args.aws_profile,
         paths=context.paths,
         runner=context.runner,
+        at=args.at,
+        snapshot=args.snapshot,
+        mirror_root=args.mirror,
+        snapshot_packs=args.snapshot_packs,
+        use_cache=not args.no_cache,
     )
     operations.validate()
     operations.restore()
@@ -0,0 +1,47 @@
+"""List or restore the databases archived by deployments."""
+
+from argparse import ArgumentParser, Namespace
+from pathlib import Path
+
+from ..core.context import Context
+from ..operations.archive import ARCHIVE_DIRECTORY_NAME, ArchiveStore
+from ..operations.instance import resolve_instance_path
+
+MEBIBYTE = 1024 * 1024
+
+
+def configure(parser: ArgumentParser) -> None:
+    parser.add_argument("action", choices=["list", "restore"])
+    parser.add_argument("--path", required=True)
+    parser.add_argument(
+        "--archive", help="Archive file name or timestamp prefix to restore"
+    )
+    parser.add_argument("--output", help="Database file to write; must not exist")
+
+
+def run(context: Context, args: Namespace) -> int:
+    store = ArchiveStore(resolve_instance_path(args.path) / ARCHIVE_DIRECTORY_NAME)
+    if args.action == "list":
+        archives = store.entries()
+        if not archives:
+            print("No archived databases")
+        for archive in archives:
+            state = "zstd" if archive.compressed else "uncompressed"
+            print(
+                f"{archive.path.name:<52} {archive.created_at.isoformat()}"
+                f" {archive.size / MEBIBYTE:10.1f} MiB {state}"
+            )
+        pending = store.pending()
+        if pending:
+            print(f"{len(pending)} replaced databases wait to be archived")
+        return 0
+
+    if not args.archive or not args.output:
+        raise ValueError("restore needs --archive and --output")
+    output = Path(args.output).expanduser().resolve()
+    if output.exists():
+        raise ValueError(f"{output} already exists")
+    archive = store.find(args.archive)
+    store.restore(archive, output)
+    print(f"Restored {archive.path.name} to {output}")
+    return 0
@@ -0,0 +1,51 @@
+"""Measure how fast each copy mechanism clones a large file on a filesystem."""
+
+import os
+import tempfile
+from argparse import ArgumentParser, Namespace
+from pathlib import Path
+
+from ..core.clone import benchmark
+from ..core.context import Context
+
+GIBIBYTE = 1024 * 1024 * 1024
+MEBIBYTE = 1024 * 1024
+
+
+def configure(parser: ArgumentParser) -> None:
+    parser.add_argument(
+        "--path",
+        required=True,
+        help="Directory on the filesystem to measure, such as the instance path",
+    )
+    parser.add_argument("--size", type=float, default=2.0, help="Test file size in GiB")
+
+
+def run(context: Context, args: Namespace) -> int:
+    directory = Path(args.path).expanduser().resolve()
+    if not directory.is_dir():
+        raise ValueError(f"Path {directory} does not point to a directory")
+    size = int(args.size * GIBIBYTE)
+    if size <= 0:
+        raise ValueError("The test file size must be positive")
+    with tempfile.TemporaryDirectory(
+        prefix=".clone-benchmark-", dir=directory
+    ) as work_value:
+        work = Path(work_value)
+        source = work / "source.db"
+        block = os.urandom(MEBIBYTE)
+        with source.open("wb") as file:
+            for written in range(0, size, MEBIBYTE):
+                file.write(block[: min(MEBIBYTE, size - written)])
+            os.fsync(file.fileno())
+        print(f"Cloning a {size / GIBIBYTE:.1f} GiB file in {directory}")
+        for result in benchmark(source, work):
+            rate = result.bytes_per_second(size)
+            if result.seconds is None or rate is None:
+                print(f"{result.method:<16} unsupported")
+            else:
+                print(
+                    f"{result.method:<16} {result.seconds:8.2f}s"
+                    f" {rate / GIBIBYTE:8.2f} GiB/s"
+                )
+    return 0
@@ -1,11 +1,17 @@
 """Deploy an immutable release."""
 
-from argparse import Namespace
+from argparse import ArgumentParser, Namespace
 
 from ..core.context import Context
 from ..operations.deployment import deploy_release
 
 
+def configure(parser: ArgumentParser) -> None:
+    parser.add_argument("--path", required=True)
+    parser.add_argument("--release-manifest", required=True)
+    parser.add_argument("--change-configuration", action="store_true")
+
+
 def run(context: Context, args: Namespace) -> int:
     deploy_release(
         args.path, args.release_manifest, args.change_configuration, context.runner
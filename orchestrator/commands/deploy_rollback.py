@@ -1,11 +1,15 @@
 """Roll back to the previous healthy release."""
 
-from argparse import Namespace
+from argparse import ArgumentParser, Namespace
 
 from ..core.context import Context
 from ..operations.deployment import rollback_release
 
 
+def configure(parser: ArgumentParser) -> None:
+    parser.add_argument("--path", required=True)
+
+
 def run(context: Context, args: Namespace) -> int:
     rollback_release(args.path, context.runner)
     return 0
@@ -1,11 +1,15 @@
 """Explain one environment variable."""
 
-from argparse import Namespace
+from argparse import ArgumentParser, Namespace
 
 from ..core.context import Context
 from .env_support import schema
 
 
+def configure(parser: ArgumentParser) -> None:
+    parser.add_argument("name")
+
+
 def run(context: Context, args: Namespace) -> int:
     loaded_schema = schema(context)
     try:
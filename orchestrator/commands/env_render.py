@@ -4,7 +4,7 @@ from __future__ import annotations
 
 import secrets
 import shlex
-from argparse import Namespace
+from argparse import ArgumentParser, Namespace
 from pathlib import Path
 
 from ..core.context import Context
@@ -12,6 +12,12 @@ from .common import ensure_directory
 from .env_support import schema
 
 
+def configure(parser: ArgumentParser) -> None:
+    parser.add_argument("--profile", required=True, choices=["debug", "production"])
+    parser.add_argument("--output")
+    parser.add_argument("--force", action="store_true")
+
+
 def _configure_debug_paths(context: Context, output: Path) -> None:
     """Keep generated native-debug paths usable by every debug process."""
 
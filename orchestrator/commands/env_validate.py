@@ -1,13 +1,28 @@
 """Validate one environment profile."""
 
-from argparse import Namespace
+from argparse import ArgumentParser, Namespace
 from pathlib import Path
 
-from ..config.environment import merged_environment, read_dotenv
+from ..config.environment import EnvironmentSchema, merged_environment, read_dotenv
 from ..core.context import Context
+from ..core.paths import RepoPaths
 from .env_support import schema
 
 
+def configure(parser: ArgumentParser) -> None:
+    parser.add_argument(
+        "--profile",
+        required=True,
+        choices=sorted(
+            EnvironmentSchema.read(RepoPaths.discover().environment_schema).profiles
+        ),
+    )
+    parser.add_argument(
+        "--file", help="Optional dotenv file to layer over the process environment"
+    )
+    parser.add_argument("--allow-unknown", action="store_true")
+
+
 def run(context: Context, args: Namespace) -> int:
     source = Path(args.file) if args.file else None
     file_values = read_dotenv(source) if source else {}
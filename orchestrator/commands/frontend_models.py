@@ -1,11 +1,17 @@
 """Generate or verify frontend API models."""
 
-from argparse import Namespace
+from argparse import ArgumentParser, Namespace
 
 from ..core.context import Context
 from .frontend_support import npm
 
 
+def configure(parser: ArgumentParser) -> None:
+    parser.add_argument(
+        "--verify", action="store_true", help="Fail if generated models are stale"
+    )
+
+
 def run(context: Context, args: Namespace) -> int:
     input_path = context.paths.openapi_contract
     command = [
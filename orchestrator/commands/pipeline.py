@@ -2,10 +2,14 @@
 
 from __future__ import annotations
 
-from argparse import Namespace
-from collections.abc import Callable
+import os
+from argparse import ArgumentParser, Namespace
+from collections.abc import Callable, Iterable
+from dataclasses import replace
 
 from ..core.context import Context
+from ..core.scheduler import Step, run_steps
+from ..core.step_cache import StepCache
 from . import (
     backend_build,
     backend_coverage,
@@ -19,6 +23,7 @@ from . import (
     python_format,
     python_install,
     python_lint,
+    python_startup,
     python_test,
     python_typecheck,
     security_dependencies,
@@ -34,127 +39,238 @@ from . import (
 from . import (
     frontend_format as frontend_format_command,
 )
-from .common import add_command
 
-Workflow = Callable[[Context], int]
+Command = Callable[[Context, Namespace], int]
+DEFAULT_JOBS = os.cpu_count() or 1
 
 
-def _run(
-    context: Context,
-    commands: list[Callable[[Context, Namespace], int]],
+PYTHON_INPUTS = ("orchestrator/**/*.py", "pyproject.toml")
+BACKEND_INPUTS = ("backend/**", "global.json", ".config/dotnet-tools.json")
+FRONTEND_INPUTS = ("frontend/**",)
+# Wall-clock checks run alone once every other step has finished, so concurrent
+# builds do not skew them.
+TIMED_STEPS = frozenset({"python startup"})
+
+
+def _step(
+    name: str,
+    command: Command,
+    *requires: str,
     arguments: Namespace | None = None,
-) -> int:
+    inputs: tuple[str, ...] = (),
+) -> Step:
     values = arguments or Namespace(verify=False)
-    for command in commands:
-        command(context, values)
-    return 0
+    return Step(name, lambda context: command(context, values), requires, inputs)
 
 
-def python_workflow(context: Context, _args: Namespace) -> int:
-    return _run(
-        context,
-        [
-            python_install.run,
-            python_format.check,
-            python_lint.run,
-            python_typecheck.run,
-            python_test.run,
-        ],
-    )
+# Every CI step once, with the prerequisites that order it against other steps.
+# Prerequisites outside a selected workflow are assumed to be satisfied already,
+# such as the backend-built API contract downloaded by the api-contract job.
+# Steps with inputs are checks whose result depends only on those files and the
+# toolchain; installs, builds, and vulnerability scans always run when needed.
+STEPS = (
+    _step("python install", python_install.run),
+    _step(
+        "python format",
+        python_format.check,
+        "python install",
+        inputs=PYTHON_INPUTS,
+    ),
+    _step("python lint", python_lint.run, "python install", inputs=PYTHON_INPUTS),
+    _step(
+        "python typecheck",
+        python_typecheck.run,
+        "python install",
+        inputs=PYTHON_INPUTS,
+    ),
+    _step(
+        "python test",
+        python_test.run,
+        "python install",
+        inputs=(*PYTHON_INPUTS, "config/**", ".env.example"),
+    ),
+    # Its budgets are wall-clock times on this machine, so it is never cached.
+    _step("python startup", python_startup.run, arguments=Namespace(runs=15)),
+    _step("backend restore", backend_restore.run),
+    _step(
+        "backend format",
+        backend_format_command.run,
+        "backend restore",
+        inputs=BACKEND_INPUTS,
+    ),
+    # Formatting and building share MSBuild intermediates, so they never overlap.
+    _step("backend build", backend_build.run, "backend restore", "backend format"),
+    _step(
+        "backend coverage",
+        backend_coverage.run,
+        "backend build",
+        inputs=BACKEND_INPUTS,
+    ),
+    _step("frontend install", frontend_install.run),
+    _step(
+        "frontend format",
+        frontend_format_command.check,
+        "frontend install",
+        inputs=FRONTEND_INPUTS,
+    ),
+    _step(
+        "frontend lint",
+        frontend_lint.run,
+        "frontend install",
+        inputs=FRONTEND_INPUTS,
+    ),
+    _step(
+        "frontend build",
+        frontend_build_command.run,
+        "frontend install",
+        inputs=FRONTEND_INPUTS,
+    ),
+    _step(
+        "frontend models --verify",
+        frontend_models.run,
+        "frontend install",
+        "backend build",
+        arguments=Namespace(verify=True),
+        inputs=(*FRONTEND_INPUTS, *BACKEND_INPUTS),
+    ),
+    _step(
+        "security scan-dependencies",
+        security_dependencies.run,
+        "backend restore",
+        "frontend install",
+    ),
+    _step(
+        "frontend install-browser", frontend_playwright_install.run, "frontend install"
+    ),
+    _step("container build", container_build.run),
+    _step("trivy install", trivy_install.run),
+    _step(
+        "security scan-images",
+        security_images.run,
+        "container build",
+        "trivy install",
+    ),
+    _step(
+        "container smoke-test",
+        container_smoke_test.run,
+        "container build",
+        "frontend install-browser",
+        inputs=(
+            *BACKEND_INPUTS,
+            *FRONTEND_INPUTS,
+            "config/**",
+            "orchestrator/operations/*.py",
+        ),
+    ),
+)
+WORKFLOWS: dict[str, tuple[str, ...]] = {
+    "python": (
+        "python install",
+        "python format",
+        "python lint",
+        "python typecheck",
+        "python test",
+        "python startup",
+    ),
+    "backend-format": ("backend restore", "backend format"),
+    "frontend-format": ("frontend install", "frontend format", "frontend lint"),
+    "backend-test": ("backend restore", "backend build", "backend coverage"),
+    "frontend-build": ("frontend install", "frontend build"),
+    "api-contract": ("frontend install", "frontend models --verify"),
+    "dependencies": ("backend restore", "security scan-dependencies"),
+    "container-images": (
+        "frontend install",
+        "frontend install-browser",
+        "container build",
+        "trivy install",
+        "security scan-images",
+        "container smoke-test",
+    ),
+}
 
 
-def backend_format(context: Context, _args: Namespace) -> int:
-    return _run(context, [backend_restore.run, backend_format_command.run])
+def select_steps(names: Iterable[str]) -> tuple[Step, ...]:
+    """Return the named steps, keeping only prerequisites among the selection."""
 
+    selected = set(names)
+    unknown = selected - {step.name for step in STEPS}
+    if unknown:
+        raise ValueError(f"Unknown CI steps: {', '.join(sorted(unknown))}")
+    return tuple(
+        replace(
+            step,
+            requires=tuple(name for name in step.requires if name in selected),
+        )
+        for step in STEPS
+        if step.name in selected
+    )
 
-def frontend_format(context: Context, _args: Namespace) -> int:
-    return _run(
+
+def _run(context: Context, workflows: Iterable[str], arguments: Namespace) -> int:
+    names = [name for workflow in workflows for name in WORKFLOWS[workflow]]
+    cache = (
+        None
+        if getattr(arguments, "no_cache", True)
+        else StepCache(context.root, context.paths.ci_cache, context.paths.toolchain)
+    )
+    steps = select_steps(names)
+    run_steps(
         context,
-        [frontend_install.run, frontend_format_command.check, frontend_lint.run],
+        [step for step in steps if step.name not in TIMED_STEPS],
+        getattr(arguments, "jobs", 1),
+        cache,
     )
+    timed = [step for step in steps if step.name in TIMED_STEPS]
+    if timed:
+        run_steps(context, timed, 1, cache)
+    return 0
 
 
-def backend_test(context: Context, _args: Namespace) -> int:
-    return _run(context, [backend_restore.run, backend_build.run, backend_coverage.run])
+def python_workflow(context: Context, args: Namespace) -> int:
+    return _run(context, ["python"], args)
 
 
-def frontend_build(context: Context, _args: Namespace) -> int:
-    return _run(context, [frontend_install.run, frontend_build_command.run])
+def backend_format(context: Context, args: Namespace) -> int:
+    return _run(context, ["backend-format"], args)
 
 
-def api_contract(context: Context, _args: Namespace) -> int:
-    frontend_install.run(context, Namespace())
-    return frontend_models.run(context, Namespace(verify=True))
+def frontend_format(context: Context, args: Namespace) -> int:
+    return _run(context, ["frontend-format"], args)
 
 
-def dependencies(context: Context, _args: Namespace) -> int:
-    return _run(context, [backend_restore.run, security_dependencies.run])
+def backend_test(context: Context, args: Namespace) -> int:
+    return _run(context, ["backend-test"], args)
 
 
-def container_images(context: Context, _args: Namespace) -> int:
-    return _run(
-        context,
-        [
-            frontend_install.run,
-            frontend_playwright_install.run,
-            container_build.run,
-            trivy_install.run,
-            security_images.run,
-            container_smoke_test.run,
-        ],
-    )
+def frontend_build(context: Context, args: Namespace) -> int:
+    return _run(context, ["frontend-build"], args)
 
 
-def run_all(context: Context, _args: Namespace) -> int:
-    for workflow in (
-        python_workflow,
-        backend_format,
-        frontend_format,
-        backend_test,
-        frontend_build,
-        api_contract,
-        dependencies,
-        container_images,
-    ):
-        workflow(context, Namespace())
-    return 0
+def api_contract(context: Context, args: Namespace) -> int:
+    return _run(context, ["api-contract"], args)
 
 
-def register(commands: object) -> None:
-    add_command(
-        commands,
-        "python",
-        "Run Python formatting, linting, typing, and tests",
-        python_workflow,
-    )
-    add_command(
-        commands, "backend-format", "Restore and format the backend", backend_format
-    )
-    add_command(
-        commands,
-        "frontend-format",
-        "Install, format, and lint the frontend",
-        frontend_format,
-    )
-    add_command(
-        commands, "backend-test", "Restore, build, and test the backend", backend_test
-    )
-    add_command(
-        commands, "frontend-build", "Install and build the frontend", frontend_build
-    )
-    add_command(
-        commands, "api-contract", "Verify generated frontend API models", api_contract
-    )
-    add_command(
-        commands,
-        "dependencies",
-        "Restore and scan application dependencies",
-        dependencies,
+def dependencies(context: Context, args: Namespace) -> int:
+    return _run(context, ["dependencies"], args)
+
+
+def container_images(context: Context, args: Namespace) -> int:
+    return _run(context, ["container-images"], args)
+
+
+def run_all(context: Context, args: Namespace) -> int:
+    return _run(context, WORKFLOWS, args)
+
+
+def configure(parser: ArgumentParser) -> None:
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=DEFAULT_JOBS,
+        help="Maximum number of independent steps to run at once",
     )
-    add_command(
-        commands,
-        "container-images",
-        "Build, scan, and smoke-test images",
-        container_images,
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Run every step even when its inputs match a cached passing run",
     )
-    add_command(commands, "run", "Run every repository verification workflow", run_all)
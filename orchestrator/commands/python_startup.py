@@ -0,0 +1,49 @@
+"""Check ft startup latency against its budget."""
+
+from __future__ import annotations
+
+import statistics
+import subprocess
+import sys
+import time
+from argparse import ArgumentParser, Namespace
+
+from ..core.context import Context
+
+# Budgets exclude bare interpreter startup, which ft cannot influence.
+STARTUP_BUDGETS_MS = {
+    ("--help",): 150.0,
+    ("env", "explain", "PUBLIC_ORIGIN"): 250.0,
+}
+
+
+def configure(parser: ArgumentParser) -> None:
+    parser.add_argument(
+        "--runs", type=int, default=15, help="Timed runs per command after a warm-up"
+    )
+
+
+def run(context: Context, args: Namespace) -> int:
+    baseline = _median_ms([sys.executable, "-c", "pass"], args.runs, context)
+    print(f"Interpreter startup: {baseline:.0f} ms")
+    over_budget = []
+    for arguments, budget in STARTUP_BUDGETS_MS.items():
+        command = [sys.executable, "-m", "orchestrator", *arguments]
+        overhead = _median_ms(command, args.runs, context) - baseline
+        print(f"ft {' '.join(arguments)}: {overhead:.0f} ms (budget {budget:.0f} ms)")
+        if overhead > budget:
+            over_budget.append(" ".join(arguments))
+    if over_budget:
+        raise RuntimeError(
+            f"ft startup exceeded its budget for: {', '.join(over_budget)}"
+        )
+    return 0
+
+
+def _median_ms(command: list[str], runs: int, context: Context) -> float:
+    durations = []
+    for _ in range(runs + 1):
+        started = time.perf_counter()
+        subprocess.run(command, cwd=context.root, capture_output=True, check=True)
+        durations.append((time.perf_counter() - started) * 1000)
+    return statistics.median(durations[1:])
@@ -0,0 +1,373 @@
+"""Static manifest of every command, resolved to its module only when chosen.
+
+Handlers and argument configuration are named as ``module:attribute`` within
+this package, so listing commands imports nothing and reads no files.
+"""
+
+from __future__ import annotations
+
+from argparse import ArgumentParser
+from collections.abc import Callable
+from dataclasses import dataclass
+from importlib import import_module
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .common import Handler
+
+
+@dataclass(frozen=True)
+class Command:
+    name: str
+    description: str
+    handler: str
+    configure: str | None = None
+
+    def load_handler(self) -> Handler:
+        return _resolve(self.handler)
+
+    def load_configure(self) -> Callable[[ArgumentParser], None] | None:
+        return None if self.configure is None else _resolve(self.configure)
+
+
+@dataclass(frozen=True)
+class Group:
+    name: str
+    description: str
+    commands: tuple[Command, ...]
+
+
+def _resolve(reference: str):
+    module, _, attribute = reference.partition(":")
+    return getattr(import_module(f"{__package__}.{module}"), attribute)
+
+
+def _ci(name: str, description: str, handler: str) -> Command:
+    return Command(name, description, f"pipeline:{handler}", "pipeline:configure")
+
+
+GROUPS = (
+    Group(
+        "python",
+        "Maintain the repository Python tooling",
+        (
+            Command(
+                "install",
+                "Install pinned Python quality dependencies",
+                "python_install:run",
+            ),
+            Command("format", "Verify Python formatting", "python_format:check"),
+            Command("format-fix", "Apply Python formatting", "python_format:fix"),
+            Command("lint", "Run Python lint checks", "python_lint:run"),
+            Command("typecheck", "Run Python type checks", "python_typecheck:run"),
+            Command("test", "Run Python tests with coverage", "python_test:run"),
+            Command(
+                "startup",
+                "Check ft startup latency against its budget",
+                "python_startup:run",
+                "python_startup:configure",
+            ),
+        ),
+    ),
+    Group(
+        "deps",
+        "Install and verify repository dependencies",
+        (
+            Command(
+                "install", "Install all repository dependencies", "deps_install:run"
+            ),
+            Command(
+                "check", "Verify the configured toolchain versions", "deps_check:run"
+            ),
+        ),
+    ),
+    Group(
+        "backend",
+        "Build and maintain the .NET backend",
+        (
+            Command("restore", "Restore the backend solution", "backend_restore:run"),
+            Command("format", "Verify backend formatting", "backend_format:run"),
+            Command("build", "Build the backend solution", "backend_build:run"),
+            Command("test", "Run backend tests", "backend_test:run"),
+            Command(
+                "coverage", "Run backend tests with coverage", "backend_coverage:run"
+            ),
+            Command(
+                "create-migration",
+                "Create a database migration",
+                "backend_create_migration:run",
+                "backend_create_migration:configure",
+            ),
+        ),
+    ),
+    Group(
+        "frontend",
+        "Build and run the frontend",
+        (
+            Command("install", "Install frontend dependencies", "frontend_install:run"),
+            Command("format", "Verify frontend formatting", "frontend_format:check"),
+            Command("format-fix", "Apply frontend formatting", "frontend_format:fix"),
+            Command("lint", "Run frontend lint checks", "frontend_lint:run"),
+            Command(
+                "install-browser",
+                "Install the Chromium browser for frontend end-to-end tests",
+                "frontend_playwright_install:run",
+            ),
+            Command("build", "Build the frontend", "frontend_build:run"),
+            Command(
+                "models",
+                "Generate or verify frontend API models",
+                "frontend_models:run",
+                "frontend_models:configure",
+            ),
+        ),
+    ),
+    Group(
+        "debug",
+        "Manage local development environments",
+        (
+            Command("create", "Create the local debug environment", "debug_create:run"),
+            Command("upgrade", "Apply debug database migrations", "debug_upgrade:run"),
+            Command(
+                "restore",
+                "Restore an encrypted backup into the native debug database",
+                "debug_restore:run",
+                "debug_restore:configure",
+            ),
+            Command(
+                "destroy", "Remove the native debug environment", "debug_destroy:run"
+            ),
+            Command(
+                "stack-up",
+                "Build and start the local container stack",
+                "debug_stack_up:run",
+            ),
+            Command(
+                "stack-down", "Stop the local container stack", "debug_stack_down:run"
+            ),
+            Command(
+                "stack-destroy",
+                "Stop the stack and remove its volumes",
+                "debug_stack_destroy:run",
+            ),
+            Command(
+                "frontend",
+                "Run the native debug frontend",
+                "debug_frontend:run",
+                "debug_frontend:configure",
+            ),
+            Command("backend", "Run the native debug backend", "debug_backend:run"),
+        ),
+    ),
+    Group(
+        "container",
+        "Build and smoke-test images",
+        (
+            Command(
+                "build", "Build deployable application images", "container_build:run"
+            ),
+            Command(
+                "smoke-test",
+                "Run the container integration smoke test",
+                "container_smoke_test:run",
+            ),
+        ),
+    ),
+    Group(
+        "security",
+        "Scan dependencies and images",
+        (
+            Command(
+                "scan-dependencies",
+                "Scan frontend and backend dependencies",
+                "security_dependencies:run",
+            ),
+            Command(
+                "scan-images",
+                "Scan deployable container images",
+                "security_images:run",
+            ),
+        ),
+    ),
+    Group(
+        "release",
+        "Validate release artifacts",
+        (
+            Command(
+                "validate-run",
+                "Validate a successful release workflow run",
+                "release_validate_run:run",
+                "release_validate_run:configure",
+            ),
+            Command(
+                "validate-artifact",
+                "Validate a downloaded release manifest",
+                "release_validate_artifact:run",
+                "release_validate_artifact:configure",
+            ),
+        ),
+    ),
+    Group(
+        "deploy",
+        "Deploy and roll back instances",
+        (
+            Command(
+                "deploy",
+                "Deploy an immutable release",
+                "deploy_deploy:run",
+                "deploy_deploy:configure",
+            ),
+            Command(
+                "rollback",
+                "Roll back to the previous healthy release",
+                "deploy_rollback:run",
+                "deploy_rollback:configure",
+            ),
+            Command(
+                "clone-benchmark",
+                "Measure database copy mechanisms on an instance filesystem",
+                "deploy_clone_benchmark:run",
+                "deploy_clone_benchmark:configure",
+            ),
+            Command(
+                "archive",
+                "List or restore databases replaced by deployments",
+                "deploy_archive:run",
+                "deploy_archive:configure",
+            ),
+        ),
+    ),
+    Group(
+        "backup",
+        "Create and verify encrypted backups",
+        (
+            Command(
+                "initialize",
+                "Initialize the encrypted backup repository",
+                "backup_initialize:run",
+                "backup_support:configure",
+            ),
+            Command(
+                "backup",
+                "Create an encrypted database backup",
+                "backup_create:run",
+                "backup_create:configure",
+            ),
+            Command(
+                "verify",
+                "Restore and verify unverified backups",
+                "backup_verify:run",
+                "backup_verify:configure",
+            ),
+            Command(
+                "list",
+                "List backup snapshots from the local catalog",
+                "backup_list:run",
+                "backup_list:configure",
+            ),
+            Command(
+                "stats",
+                "Show backup duration, size, and deduplication trends",
+                "backup_stats:run",
+                "backup_stats:configure",
+            ),
+            Command(
+                "stream",
+                "Ship database WAL frames continuously for point-in-time restore",
+                "backup_stream:run",
+                "backup_stream:configure",
+            ),
+            Command(
+                "restore",
+                "Rebuild the database at a point in time from shipped WAL",
+                "backup_restore:run",
+                "backup_restore:configure",
+            ),
+            Command(
+                "stream-benchmark",
+                "Measure WAL shipping throughput under a synthetic write load",
+                "backup_stream:benchmark",
+                "backup_stream:configure_benchmark",
+            ),
+        ),
+    ),
+    Group(
+        "env",
+        "Validate and inspect environment profiles",
+        (
+            Command(
+                "validate",
+                "Validate an environment profile",
+                "env_validate:run",
+                "env_validate:configure",
+            ),
+            Command(
+                "explain",
+                "Explain one environment variable",
+                "env_explain:run",
+                "env_explain:configure",
+            ),
+            Command(
+                "render",
+                "Render a profile environment file",
+                "env_render:run",
+                "env_render:configure",
+            ),
+        ),
+    ),
+    Group(
+        "ci",
+        "Run repository verification workflows",
+        (
+            _ci(
+                "python",
+                "Run Python formatting, linting, typing, and tests",
+                "python_workflow",
+            ),
+            _ci("backend-format", "Restore and format the backend", "backend_format"),
+            _ci(
+                "frontend-format",
+                "Install, format, and lint the frontend",
+                "frontend_format",
+            ),
+            _ci("backend-test", "Restore, build, and test the backend", "backend_test"),
+            _ci("frontend-build", "Install and build the frontend", "frontend_build"),
+            _ci("api-contract", "Verify generated frontend API models", "api_contract"),
+            _ci(
+                "dependencies",
+                "Restore and scan application dependencies",
+                "dependencies",
+            ),
+            _ci(
+                "container-images",
+                "Build, scan, and smoke-test images",
+                "container_images",
+            ),
+            _ci("run", "Run every repository verification workflow", "run_all"),
+        ),
+    ),
+    Group(
+        "cache",
+        "Manage cached CI step results",
+        (
+            Command(
+                "prune",
+                "Remove superseded cached CI step results",
+                "cache_prune:run",
+                "cache_prune:configure",
+            ),
+        ),
+    ),
+    Group(
+        "trace",
+        "Inspect recorded subprocess timings",
+        (
+            Command(
+                "report",
+                "Rank the slowest traced commands across runs",
+                "trace_report:run",
+                "trace_report:configure",
+            ),
+        ),
+    ),
+)
@@ -1,12 +1,17 @@
 """Validate a downloaded release manifest."""
 
-from argparse import Namespace
+from argparse import ArgumentParser, Namespace
 from pathlib import Path
 
 from ..core.context import Context
 from ..operations.release_manifest import ReleaseManifest
 
 
+def configure(parser: ArgumentParser) -> None:
+    parser.add_argument("--commit", required=True)
+    parser.add_argument("--manifest", required=True)
+
+
 def run(_context: Context, args: Namespace) -> int:
     manifest = ReleaseManifest.read(Path(args.manifest))
     if manifest.commit != args.commit:
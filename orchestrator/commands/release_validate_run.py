@@ -4,12 +4,17 @@ from __future__ import annotations
 
 import json
 import os
-from argparse import Namespace
+from argparse import ArgumentParser, Namespace
 from urllib.request import Request, urlopen
 
 from ..core.context import Context
 
 
+def configure(parser: ArgumentParser) -> None:
+    parser.add_argument("--commit", required=True)
+    parser.add_argument("--run-id", required=True, type=int)
+
+
 def run(_context: Context, args: Namespace) -> int:
     api_url = os.environ.get("GITHUB_API_URL", "https://api.github.com")
     repository = os.environ.get("GITHUB_REPOSITORY", "")
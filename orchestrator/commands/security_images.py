@@ -4,6 +4,7 @@ from argparse import Namespace
 
 from ..config.toolchain import Toolchain
 from ..core.context import Context
+from ..core.runner import Invocation
 from .common import find_tool
 
 
@@ -12,41 +13,45 @@ def run(context: Context, _args: Namespace) -> int:
     if trivy is None:
         raise RuntimeError("Trivy is not installed. Run 'ft deps install'.")
     toolchain = Toolchain.read(context.paths.toolchain)
-    for image in (
-        toolchain.require_image("backend"),
-        toolchain.require_image("frontend"),
-        toolchain.require_image("migrator"),
-    ):
-        context.runner.run(
-            [
-                trivy,
-                "image",
-                "--exit-code",
-                "1",
-                "--severity",
-                "HIGH,CRITICAL",
-                "--scanners",
-                "vuln",
-                image,
-            ],
-            cwd=context.root,
-        )
+    caddy_image = toolchain.require_image("caddy")
+    # Concurrent scans share one vulnerability database downloaded up front.
+    context.runner.run([trivy, "image", "--download-db-only"], cwd=context.root)
+    context.runner.run_many(
+        [
+            *(
+                Invocation(
+                    _scan_command(trivy, toolchain.require_image(name), "1"),
+                    cwd=context.root,
+                    label=name,
+                )
+                for name in ("backend", "frontend", "migrator")
+            ),
+            Invocation(
+                ["docker", "pull", caddy_image], cwd=context.root, label="caddy"
+            ),
+        ],
+        fail_fast=False,
+    )
     print(
         "Caddy findings are reported without failing CI; review this exception when Caddy releases a new image."
     )
-    caddy_image = toolchain.require_image("caddy")
-    context.runner.run(["docker", "pull", caddy_image], cwd=context.root)
     return context.runner.run(
-        [
-            trivy,
-            "image",
-            "--exit-code",
-            "0",
-            "--severity",
-            "HIGH,CRITICAL",
-            "--scanners",
-            "vuln",
-            caddy_image,
-        ],
-        cwd=context.root,
+        _scan_command(trivy, caddy_image, "0"), cwd=context.root
     ).returncode
+
+
+def _scan_command(trivy: str, image: str, exit_code: str) -> list[str]:
+    return [
+        trivy,
+        "image",
+        "--exit-code",
+        exit_code,
+        "--severity",
+        "HIGH,CRITICAL",
+        "--scanners",
+        "vuln",
+        "--skip-db-update",
+        "--cache-backend",
+        "memory",
+        image,
+    ]
@@ -0,0 +1,68 @@
+"""Rank the slowest traced commands across runs."""
+
+from __future__ import annotations
+
+from argparse import ArgumentParser, Namespace
+from dataclasses import dataclass, field
+
+from ..core.context import Context
+from ..core.trace import command_name, read_trace
+
+
+@dataclass
+class CommandTimings:
+    name: str
+    durations: list[float] = field(default_factory=list)
+    cpu: float = 0.0
+    max_rss_kib: int = 0
+    failures: int = 0
+
+    @property
+    def total(self) -> float:
+        return sum(self.durations)
+
+
+def configure(parser: ArgumentParser) -> None:
+    parser.add_argument(
+        "--limit", type=int, default=20, help="Number of commands to show"
+    )
+
+
+def summarize(entries) -> list[CommandTimings]:
+    """Group trace entries by command name, slowest total first."""
+
+    timings: dict[str, CommandTimings] = {}
+    for entry in entries:
+        name = command_name(entry.get("argv") or [])
+        command = timings.setdefault(name, CommandTimings(name))
+        command.durations.append(float(entry.get("duration") or 0))
+        command.cpu += float(entry.get("user_cpu") or 0) + float(
+            entry.get("system_cpu") or 0
+        )
+        command.max_rss_kib = max(
+            command.max_rss_kib, int(entry.get("max_rss_kib") or 0)
+        )
+        if entry.get("returncode") not in (0, None):
+            command.failures += 1
+    return sorted(timings.values(), key=lambda command: command.total, reverse=True)
+
+
+def run(context: Context, args: Namespace) -> int:
+    entries = list(read_trace(context.paths.subprocess_trace))
+    if not entries:
+        print(f"No subprocesses have been traced in {context.paths.subprocess_trace}")
+        return 0
+    runs = len({entry.get("run") for entry in entries})
+    print(f"{len(entries)} subprocesses across {runs} ft runs")
+    print(
+        f"{'total s':>9} {'runs':>5} {'mean s':>8} {'max s':>8} "
+        f"{'cpu s':>8} {'rss MiB':>8} {'fail':>5}  command"
+    )
+    for command in summarize(entries)[: args.limit]:
+        print(
+            f"{command.total:9.1f} {len(command.durations):5d} "
+            f"{command.total / len(command.durations):8.2f} "
+            f"{max(command.durations):8.2f} {command.cpu:8.1f} "
+            f"{command.max_rss_kib / 1024:8.1f} {command.failures:5d}  {command.name}"
+        )
+    return 0
@@ -4,12 +4,13 @@ from __future__ import annotations
 
 import os
 import shlex
-import tomllib
 from collections.abc import Mapping
 from dataclasses import dataclass
 from pathlib import Path
 from urllib.parse import urlsplit
 
+from .loader import cached, read_toml
+
 
 @dataclass(frozen=True)
 class VariableSpec:
@@ -37,8 +38,11 @@ class EnvironmentSchema:
 
     @classmethod
     def read(cls, path: Path) -> EnvironmentSchema:
-        with path.open("rb") as file:
-            document = tomllib.load(file)
+        return cached(path, cls._parse)
+
+    @classmethod
+    def _parse(cls, path: Path) -> EnvironmentSchema:
+        document = read_toml(path, compiled=True)
 
         variables = {
             name: VariableSpec(
@@ -0,0 +1,109 @@
+"""Process-wide cache of parsed configuration files.
+
+Entries are keyed on the resolved path and the parser, and are reused while the
+file's modification time, size, and inode are unchanged. Documents read with
+``compiled=True`` are also kept on disk in ``marshal`` form, which later
+processes load much faster than they can parse the TOML again.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import marshal
+import os
+import threading
+import tomllib
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+from ..core.paths import RepoPaths
+
+COMPILED_FORMAT = 1
+
+_lock = threading.Lock()
+_entries: dict[tuple[str, object], tuple[tuple[int, int, int], Any]] = {}
+_repository: RepoPaths | None = None
+
+
+def cached[T](path: Path, parse: Callable[[Path], T]) -> T:
+    """Return ``parse(path)``, reusing the result while the file is unchanged."""
+
+    resolved = path.resolve()
+    stamp = _stamp(resolved)
+    key = (str(resolved), parse)
+    with _lock:
+        entry = _entries.get(key)
+    if entry is not None and entry[0] == stamp:
+        return entry[1]
+    value = parse(resolved)
+    with _lock:
+        _entries[key] = (stamp, value)
+    return value
+
+
+def clear() -> None:
+    """Forget every cached configuration file, for tests that rewrite them."""
+
+    with _lock:
+        _entries.clear()
+
+
+def read_toml(path: Path, compiled: bool = False) -> dict[str, Any]:
+    """Parse a TOML document, using and refreshing its compiled form if asked."""
+
+    if not compiled:
+        with path.open("rb") as file:
+            return tomllib.load(file)
+    resolved = path.resolve()
+    stamp = _stamp(resolved)
+    compiled_path = _compiled_path(resolved)
+    if compiled_path is not None:
+        try:
+            version, compiled_stamp, document = marshal.loads(
+                compiled_path.read_bytes()
+            )
+            if version == COMPILED_FORMAT and tuple(compiled_stamp) == stamp:
+                return document
+        except OSError, EOFError, ValueError, TypeError:
+            pass
+    with resolved.open("rb") as file:
+        document = tomllib.load(file)
+    if compiled_path is not None:
+        _write_compiled(compiled_path, stamp, document)
+    return document
+
+
+def _stamp(path: Path) -> tuple[int, int, int]:
+    status = path.stat()
+    return status.st_mtime_ns, status.st_size, status.st_ino
+
+
+def _compiled_path(path: Path) -> Path | None:
+    global _repository
+    if _repository is None:
+        # The source tree does not move, so it is located once per process.
+        _repository = RepoPaths.discover()
+    paths = _repository
+    # Only repository configuration is compiled, so temporary files add nothing.
+    if not path.is_relative_to(paths.root):
+        return None
+    name = hashlib.sha256(str(path).encode()).hexdigest()[:16]
+    return paths.artifacts / "config-cache" / f"{path.stem}-{name}.marshal"
+
+
+def _write_compiled(
+    compiled_path: Path, stamp: tuple[int, int, int], document: dict[str, Any]
+) -> None:
+    try:
+        data = marshal.dumps((COMPILED_FORMAT, stamp, document))
+    except ValueError:
+        # Dates and times have no marshal form; such documents stay uncompiled.
+        return
+    try:
+        compiled_path.parent.mkdir(parents=True, exist_ok=True)
+        temporary = compiled_path.with_name(f".{compiled_path.name}.{os.getpid()}")
+        temporary.write_bytes(data)
+        os.replace(temporary, compiled_path)
+    except OSError:
+        pass
@@ -2,10 +2,11 @@
 
 from __future__ import annotations
 
-import tomllib
 from dataclasses import dataclass
 from pathlib import Path
 
+from .loader import cached, read_toml
+
 
 @dataclass(frozen=True)
 class Toolchain:
@@ -15,8 +16,11 @@ class Toolchain:
 
     @classmethod
     def read(cls, path: Path) -> Toolchain:
-        with path.open("rb") as file:
-            document = tomllib.load(file)
+        return cached(path, cls._parse)
+
+    @classmethod
+    def _parse(cls, path: Path) -> Toolchain:
+        document = read_toml(path)
         return cls(
             tools={
                 name: str(value) for name, value in document.get("tools", {}).items()
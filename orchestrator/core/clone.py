@@ -0,0 +1,183 @@
+"""Copy files and trees with the cheapest mechanism the filesystem offers.
+
+A ``FICLONE`` reflink shares extents on btrfs and XFS and finishes in constant
+time. Otherwise ``copy_file_range`` copies inside the kernel, and can still
+share extents on filesystems that support server-side or reflinked copies.
+``sendfile`` with large chunks avoids user-space buffers where neither works,
+and a buffered copy is the last resort.
+"""
+
+from __future__ import annotations
+
+import errno
+import fcntl
+import os
+import shutil
+import time
+from collections.abc import Callable, Sequence
+from dataclasses import dataclass
+from pathlib import Path
+
+FICLONE = 0x40049409
+CHUNK_BYTES = 64 * 1024 * 1024
+REFLINK = "reflink"
+COPY_FILE_RANGE = "copy_file_range"
+SENDFILE = "sendfile"
+BUFFERED = "buffered"
+# Errors meaning a mechanism does not apply to these files, not that copying failed.
+UNSUPPORTED_ERRORS = frozenset(
+    {
+        errno.EBADF,
+        errno.EINVAL,
+        errno.ENOSYS,
+        errno.ENOTSUP,
+        errno.ENOTTY,
+        errno.EOPNOTSUPP,
+        errno.EXDEV,
+    }
+)
+
+
+class UnsupportedCloneError(OSError):
+    pass
+
+
+def _reflink(source: int, destination: int, size: int) -> None:
+    fcntl.ioctl(destination, FICLONE, source)
+
+
+def _copy_file_range(source: int, destination: int, size: int) -> None:
+    if not hasattr(os, "copy_file_range"):
+        raise UnsupportedCloneError(errno.ENOSYS, "copy_file_range is not available")
+    _copy_chunks(os.copy_file_range, source, destination, size)
+
+
+def _sendfile(source: int, destination: int, size: int) -> None:
+    _copy_chunks(
+        lambda source, destination, count, offset_source: os.sendfile(
+            destination, source, offset_source, count
+        ),
+        source,
+        destination,
+        size,
+    )
+
+
+def _buffered(source: int, destination: int, size: int) -> None:
+    os.lseek(source, 0, os.SEEK_SET)
+    while chunk := os.read(source, CHUNK_BYTES):
+        view = memoryview(chunk)
+        while view:
+            view = view[os.write(destination, view) :]
+
+
+def _copy_chunks(
+    copy: Callable[[int, int, int, int], int],
+    source: int,
+    destination: int,
+    size: int,
+) -> None:
+    # Reads use explicit offsets; writes advance the destination's position.
+    offset = 0
+    while offset < size:
+        try:
+            copied = copy(source, destination, min(CHUNK_BYTES, size - offset), offset)
+        except OSError as error:
+            # A mechanism that fails part way cannot hand over to another one.
+            if offset or error.errno not in UNSUPPORTED_ERRORS:
+                raise
+            raise UnsupportedCloneError(error.errno, error.strerror) from error
+        if copied == 0:
+            # Some filesystems report no data instead of an error; never
+            # mistake that for the end of a file that is still incomplete.
+            if offset == 0:
+                raise UnsupportedCloneError(
+                    errno.ENOTSUP, "The copy mechanism copied no data"
+                )
+            raise OSError(errno.EIO, f"The copy stopped at byte {offset} of {size}")
+        offset += copied
+
+
+CopyMethod = Callable[[int, int, int], None]
+CLONE_METHODS: tuple[tuple[str, CopyMethod], ...] = (
+    (REFLINK, _reflink),
+    (COPY_FILE_RANGE, _copy_file_range),
+    (SENDFILE, _sendfile),
+    (BUFFERED, _buffered),
+)
+
+
+def clone_file(
+    source: Path,
+    destination: Path,
+    methods: Sequence[tuple[str, CopyMethod]] = CLONE_METHODS,
+) -> str:
+    """Copy ``source`` with its mode and times, returning the mechanism used."""
+
+    used: str | None = None
+    with source.open("rb") as reader, destination.open("wb") as writer:
+        size = os.fstat(reader.fileno()).st_size
+        for name, method in methods:
+            try:
+                method(reader.fileno(), writer.fileno(), size)
+            except OSError as error:
+                if (
+                    not isinstance(error, UnsupportedCloneError)
+                    and error.errno not in UNSUPPORTED_ERRORS
+                ):
+                    raise
+                continue
+            used = name
+            break
+    if used is None:
+        raise UnsupportedCloneError(
+            errno.ENOTSUP, f"No copy mechanism supports {source}"
+        )
+    shutil.copystat(source, destination)
+    return used
+
+
+def clone_tree(source: Path, destination: Path) -> None:
+    """Copy a directory tree like ``shutil.copytree``, cloning each file."""
+
+    shutil.copytree(
+        source,
+        destination,
+        copy_function=lambda source, destination: clone_file(
+            Path(source), Path(destination)
+        ),
+    )
+
+
+@dataclass(frozen=True)
+class CloneBenchmark:
+    method: str
+    seconds: float | None
+
+    def bytes_per_second(self, size: int) -> float | None:
+        if self.seconds is None or self.seconds <= 0:
+            return None
+        return size / self.seconds
+
+
+def benchmark(source: Path, directory: Path) -> list[CloneBenchmark]:
+    """Time each copy mechanism on its own, cloning ``source`` into ``directory``.
+
+    Mechanisms the filesystem does not support are reported without a time.
+    """
+
+    results = []
+    for method in CLONE_METHODS:
+        destination = directory / f".clone-benchmark-{method[0]}"
+        started = time.perf_counter()
+        try:
+            clone_file(source, destination, (method,))
+            with destination.open("rb") as file:
+                os.fsync(file.fileno())
+            seconds: float | None = time.perf_counter() - started
+        except UnsupportedCloneError:
+            seconds = None
+        finally:
+            destination.unlink(missing_ok=True)
+        results.append(CloneBenchmark(method[0], seconds))
+    return results
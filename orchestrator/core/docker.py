@@ -0,0 +1,664 @@
+"""Docker access through the Engine API socket, falling back to the docker CLI.
+
+Operations describe containers with ``ContainerSpec`` and use whichever client
+``docker_client`` selects. Talking to the Engine over its Unix socket avoids
+starting a ``docker`` process, and its Go runtime, for every inspect and poll.
+"""
+
+from __future__ import annotations
+
+import base64
+import http.client
+import json
+import os
+import socket
+import struct
+import sys
+import threading
+import time
+from collections.abc import Callable, Iterator, Mapping
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Protocol, TextIO
+from urllib.parse import quote, urlencode
+
+from .runner import Runner
+from .timeline import span
+
+DEFAULT_SOCKET = Path("/var/run/docker.sock")
+API_VERSION = "v1.41"
+REQUEST_TIMEOUT_SECONDS = 60
+CANCEL_POLL_SECONDS = 0.1
+
+PullProgress = Callable[[dict[str, Any]], None]
+
+
+@dataclass(frozen=True)
+class ContainerSpec:
+    """A hardened container: read-only root, private ``/tmp``, no capabilities.
+
+    Ports map a container port to a loopback host port, or to an ephemeral port
+    when the host port is ``None``.
+    """
+
+    image: str
+    name: str | None = None
+    environment: Mapping[str, str] = field(default_factory=dict)
+    volumes: tuple[tuple[Path, str], ...] = ()
+    ports: tuple[tuple[int, int | None], ...] = ()
+    network: str | None = None
+    network_alias: str | None = None
+
+    def run_arguments(self, detach: bool) -> list[str]:
+        """Return the equivalent ``docker run`` arguments."""
+
+        arguments = ["run", "--detach" if detach else "--rm"]
+        if self.name is not None:
+            arguments.extend(["--name", self.name])
+        if self.network is not None:
+            arguments.extend(["--network", self.network])
+        if self.network_alias is not None:
+            arguments.extend(["--network-alias", self.network_alias])
+        for container_port, host_port in self.ports:
+            arguments.extend(
+                ["--publish", f"127.0.0.1:{host_port or ''}:{container_port}"]
+            )
+        arguments.extend(
+            [
+                "--read-only",
+                "--tmpfs",
+                "/tmp",
+                "--cap-drop",
+                "ALL",
+                "--security-opt",
+                "no-new-privileges:true",
+            ]
+        )
+        for source, destination in self.volumes:
+            arguments.extend(["--volume", f"{source}:{destination}"])
+        for name, value in self.environment.items():
+            arguments.extend(["--env", f"{name}={value}"])
+        arguments.append(self.image)
+        return arguments
+
+    def create_body(self) -> dict[str, Any]:
+        """Return the equivalent Engine API container creation request."""
+
+        host_configuration: dict[str, Any] = {
+            "ReadonlyRootfs": True,
+            "Tmpfs": {"/tmp": ""},
+            "CapDrop": ["ALL"],
+            "SecurityOpt": ["no-new-privileges:true"],
+            "Binds": [
+                f"{source}:{destination}" for source, destination in self.volumes
+            ],
+            "PortBindings": {
+                f"{container_port}/tcp": [
+                    {"HostIp": "127.0.0.1", "HostPort": str(host_port or "")}
+                ]
+                for container_port, host_port in self.ports
+            },
+        }
+        body: dict[str, Any] = {
+            "Image": self.image,
+            "Env": [f"{name}={value}" for name, value in self.environment.items()],
+            "ExposedPorts": {
+                f"{container_port}/tcp": {} for container_port, _ in self.ports
+            },
+            "HostConfig": host_configuration,
+        }
+        if self.network is not None:
+            host_configuration["NetworkMode"] = self.network
+            endpoint: dict[str, Any] = {}
+            if self.network_alias is not None:
+                endpoint["Aliases"] = [self.network_alias]
+            body["NetworkingConfig"] = {"EndpointsConfig": {self.network: endpoint}}
+        return body
+
+
+class Docker(Protocol):
+    """Container operations shared by the Engine API and CLI clients."""
+
+    def run(self, spec: ContainerSpec) -> None: ...
+
+    def run_detached(self, spec: ContainerSpec) -> None: ...
+
+    def start(self, container: str) -> None: ...
+
+    def stop(self, container: str) -> None: ...
+
+    def remove(self, container: str) -> None: ...
+
+    def inspect(self, container: str) -> dict[str, Any]: ...
+
+    def health_status(self, container: str) -> str: ...
+
+    def published_port(self, container: str, container_port: int) -> int: ...
+
+    def logs(self, container: str) -> str: ...
+
+    def create_network(self, name: str) -> None: ...
+
+    def remove_network(self, name: str) -> None: ...
+
+    def image_exists(self, image: str) -> bool: ...
+
+    def image_labels(self, image: str) -> dict[str, str] | None: ...
+
+    def image_id(self, image: str) -> str | None: ...
+
+    def pull(self, image: str, progress: PullProgress | None = None) -> None: ...
+
+
+def engine_socket() -> Path | None:
+    """Return the local Engine socket, or ``None`` when the CLI must be used."""
+
+    host = os.environ.get("DOCKER_HOST", "")
+    if host and not host.startswith("unix://"):
+        return None
+    context = os.environ.get("DOCKER_CONTEXT")
+    if context is None and not host:
+        context = docker_configuration().get("currentContext")
+    if (context or "default") != "default":
+        return None
+    path = Path(host.removeprefix("unix://")) if host else DEFAULT_SOCKET
+    return path if path.is_socket() else None
+
+
+def docker_client(runner: Runner | None = None) -> Docker:
+    """Use the Engine API when its socket is local, otherwise the docker CLI."""
+
+    runner = runner or Runner()
+    socket_path = engine_socket()
+    if socket_path is None:
+        return DockerCli(runner)
+    return DockerEngine(socket_path, output=runner.output, runner=runner)
+
+
+def docker_configuration() -> dict[str, Any]:
+    """Read the docker CLI's ``config.json``, or nothing if it is unreadable."""
+
+    path = (
+        Path(os.environ.get("DOCKER_CONFIG", Path.home() / ".docker")) / "config.json"
+    )
+    try:
+        value = json.loads(path.read_text(encoding="utf-8"))
+    except OSError, ValueError:
+        return {}
+    return value if isinstance(value, dict) else {}
+
+
+class DockerCli:
+    """Run each container operation as a ``docker`` command."""
+
+    def __init__(self, runner: Runner) -> None:
+        self.runner = runner
+
+    def run(self, spec: ContainerSpec) -> None:
+        self.runner.run(["docker", *spec.run_arguments(detach=False)])
+
+    def run_detached(self, spec: ContainerSpec) -> None:
+        self.runner.run(["docker", *spec.run_arguments(detach=True)])
+
+    def start(self, container: str) -> None:
+        self.runner.run(["docker", "start", container])
+
+    def stop(self, container: str) -> None:
+        self.runner.run(["docker", "stop", container])
+
+    def remove(self, container: str) -> None:
+        self.runner.run(
+            ["docker", "container", "rm", "--force", container],
+            check=False,
+            capture_output=True,
+        )
+
+    def inspect(self, container: str) -> dict[str, Any]:
+        result = self.runner.run(
+            ["docker", "container", "inspect", container], capture_output=True
+        )
+        return json.loads(result.stdout)[0]
+
+    def health_status(self, container: str) -> str:
+        result = self.runner.run(
+            ["docker", "inspect", "--format", "{{.State.Health.Status}}", container],
+            capture_output=True,
+        )
+        return result.stdout.strip()
+
+    def published_port(self, container: str, container_port: int) -> int:
+        result = self.runner.run(
+            ["docker", "port", container, f"{container_port}/tcp"],
+            capture_output=True,
+        )
+        return int(result.stdout.strip().rsplit(":", maxsplit=1)[1])
+
+    def logs(self, container: str) -> str:
+        result = self.runner.run(
+            ["docker", "logs", container], check=False, capture_output=True
+        )
+        return f"{result.stdout}{result.stderr}" if result.returncode == 0 else ""
+
+    def create_network(self, name: str) -> None:
+        self.runner.run(["docker", "network", "create", name])
+
+    def remove_network(self, name: str) -> None:
+        self.runner.run(
+            ["docker", "network", "rm", name], check=False, capture_output=True
+        )
+
+    def image_exists(self, image: str) -> bool:
+        result = self.runner.run(
+            ["docker", "image", "inspect", image], check=False, capture_output=True
+        )
+        return result.returncode == 0
+
+    def image_labels(self, image: str) -> dict[str, str] | None:
+        result = self.runner.run(
+            [
+                "docker",
+                "image",
+                "inspect",
+                "--format",
+                "{{json .Config.Labels}}",
+                image,
+            ],
+            check=False,
+            capture_output=True,
+        )
+        if result.returncode != 0:
+            return None
+        return json.loads(result.stdout) or {}
+
+    def image_id(self, image: str) -> str | None:
+        result = self.runner.run(
+            ["docker", "image", "inspect", "--format", "{{.Id}}", image],
+            check=False,
+            capture_output=True,
+        )
+        if result.returncode != 0:
+            return None
+        return result.stdout.strip() or None
+
+    def pull(self, image: str, progress: PullProgress | None = None) -> None:
+        """Pull ``image``; with ``progress`` the CLI's own output is suppressed.
+
+        The CLI reports no structured progress, so ``progress`` is never called.
+        """
+
+        if progress is None:
+            self.runner.run(["docker", "pull", image])
+            return
+        result = self.runner.run(
+            ["docker", "pull", "--quiet", image], check=False, capture_output=True
+        )
+        if result.returncode != 0:
+            message = (
+                result.stderr or ""
+            ).strip() or f"exit status {result.returncode}"
+            raise RuntimeError(f"Could not pull {image}: {message}")
+
+
+class DockerEngine:
+    """Minimal Docker Engine API client using ``http.client`` over a Unix socket.
+
+    Pulls that need a credential helper go through ``runner`` and the CLI.
+    """
+
+    def __init__(
+        self,
+        socket_path: Path,
+        output: TextIO | None = None,
+        runner: Runner | None = None,
+    ) -> None:
+        self.socket_path = socket_path
+        self.output = output
+        self.runner = runner or Runner(output=output)
+
+    def run(self, spec: ContainerSpec) -> None:
+        container = self._create(spec)
+        try:
+            self._call("POST", f"/containers/{container}/start", allowed=(304,))
+            output = self.output or sys.stdout
+            for _stream, data in self._log_frames(container, follow=True):
+                output.write(data.decode(errors="replace"))
+            _, result = self._call(
+                "POST", f"/containers/{container}/wait", timeout=None
+            )
+            status = int(result.get("StatusCode", 1))
+        finally:
+            self.remove(container)
+        if status != 0:
+            raise RuntimeError(f"Container {spec.image} exited with status {status}")
+
+    def run_detached(self, spec: ContainerSpec) -> None:
+        container = self._create(spec)
+        self._call("POST", f"/containers/{container}/start", allowed=(304,))
+
+    def start(self, container: str) -> None:
+        self._call("POST", f"/containers/{quote(container)}/start", allowed=(304,))
+
+    def stop(self, container: str) -> None:
+        self._call(
+            "POST",
+            f"/containers/{quote(container)}/stop",
+            allowed=(304,),
+            timeout=None,
+        )
+
+    def remove(self, container: str) -> None:
+        self._call(
+            "DELETE",
+            f"/containers/{quote(container)}?force=1",
+            allowed=(404,),
+            timeout=None,
+        )
+
+    def inspect(self, container: str) -> dict[str, Any]:
+        _, value = self._call("GET", f"/containers/{quote(container)}/json")
+        return value
+
+    def health_status(self, container: str) -> str:
+        health = self.inspect(container).get("State", {}).get("Health") or {}
+        return str(health.get("Status", ""))
+
+    def published_port(self, container: str, container_port: int) -> int:
+        ports = self.inspect(container).get("NetworkSettings", {}).get("Ports") or {}
+        for binding in ports.get(f"{container_port}/tcp") or []:
+            if binding.get("HostPort"):
+                return int(binding["HostPort"])
+        raise RuntimeError(
+            f"Container {container} does not publish port {container_port}"
+        )
+
+    def logs(self, container: str) -> str:
+        try:
+            return "".join(
+                data.decode(errors="replace")
+                for _stream, data in self._log_frames(quote(container), follow=False)
+            )
+        except RuntimeError:
+            return ""
+
+    def create_network(self, name: str) -> None:
+        self._call("POST", "/networks/create", {"Name": name, "CheckDuplicate": True})
+
+    def remove_network(self, name: str) -> None:
+        self._call("DELETE", f"/networks/{quote(name)}", allowed=(404,))
+
+    def image_exists(self, image: str) -> bool:
+        status, _ = self._call(
+            "GET", f"/images/{quote(image, safe='/:@')}/json", allowed=(404,)
+        )
+        return status == 200
+
+    def image_labels(self, image: str) -> dict[str, str] | None:
+        status, value = self._call(
+            "GET", f"/images/{quote(image, safe='/:@')}/json", allowed=(404,)
+        )
+        if status != 200:
+            return None
+        return (value.get("Config") or {}).get("Labels") or {}
+
+    def image_id(self, image: str) -> str | None:
+        status, value = self._call(
+            "GET", f"/images/{quote(image, safe='/:@')}/json", allowed=(404,)
+        )
+        return str(value["Id"]) if status == 200 else None
+
+    def pull(self, image: str, progress: PullProgress | None = None) -> None:
+        """Pull ``image``, passing each progress message to ``progress``."""
+
+        name, tag = _split_reference(image)
+        configuration = docker_configuration()
+        registry = _registry(name)
+        if _uses_credential_helper(configuration, registry):
+            # Credential helpers are programs only the CLI knows how to run.
+            DockerCli(self.runner).pull(image, progress)
+            return
+        headers = {}
+        authentication = _registry_authentication(configuration, registry)
+        if authentication is not None:
+            headers["X-Registry-Auth"] = authentication
+        query = urlencode({"fromImage": name, "tag": tag})
+        with span(f"docker pull {name}", "docker"):
+            connection = self._connection(timeout=None)
+            try:
+                response = self._send(
+                    connection, "POST", f"/images/create?{query}", None, headers
+                )
+                if response.status >= 400:
+                    raise _error("POST", "/images/create", response)
+                # Pull failures arrive as messages within a successful response.
+                for line in response:
+                    message = json.loads(line or b"{}")
+                    if "error" in message:
+                        raise RuntimeError(
+                            f"Could not pull {image}: {message['error']}"
+                        )
+                    if progress is not None:
+                        progress(message)
+            finally:
+                connection.close()
+
+    def wait_until_healthy(
+        self,
+        container: str,
+        timeout: float,
+        cancel: threading.Event | None = None,
+    ) -> None:
+        """Follow the container's health events until it is healthy or exits.
+
+        Setting ``cancel`` closes the event stream and returns early.
+        """
+
+        deadline = time.monotonic() + timeout
+        filters = json.dumps(
+            {
+                "type": ["container"],
+                "container": [container],
+                "event": ["health_status", "die"],
+            }
+        )
+        path = f"/events?{urlencode({'filters': filters})}"
+        with span(f"docker wait healthy {container}", "docker"):
+            connection = self._connection(timeout)
+            finished = threading.Event()
+            if cancel is not None:
+                threading.Thread(
+                    target=_close_when_cancelled,
+                    args=(connection, cancel, finished),
+                    daemon=True,
+                ).start()
+            try:
+                response = self._send(connection, "GET", path, None, {})
+                if response.status >= 400:
+                    raise _error("GET", path, response)
+                # Subscribe first so a transition just before the inspect is not lost.
+                status = self.health_status(container)
+                while status != "healthy":
+                    if status == "unhealthy":
+                        raise RuntimeError(f"Container became unhealthy: {container}")
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0 or connection.sock is None:
+                        raise TimeoutError
+                    connection.sock.settimeout(remaining)
+                    line = response.readline()
+                    if cancel is not None and cancel.is_set():
+                        return
+                    if not line:
+                        raise RuntimeError(
+                            f"Docker event stream closed for {container}"
+                        )
+                    event = json.loads(line)
+                    action = str(event.get("Action") or event.get("status") or "")
+                    if action == "die":
+                        raise RuntimeError(
+                            f"Container {container} exited before becoming healthy"
+                        )
+                    status = action.removeprefix("health_status:").strip()
+            except TimeoutError as error:
+                raise RuntimeError(
+                    f"Container {container} did not become healthy within {timeout:g}s"
+                ) from error
+            except OSError:
+                if cancel is not None and cancel.is_set():
+                    return
+                raise
+            finally:
+                finished.set()
+                connection.close()
+
+    def _create(self, spec: ContainerSpec) -> str:
+        query = "" if spec.name is None else f"?{urlencode({'name': spec.name})}"
+        path = f"/containers/create{query}"
+        status, value = self._call("POST", path, spec.create_body(), allowed=(404,))
+        if status == 404:
+            # Unlike `docker run`, the Engine API does not pull missing images.
+            self.pull(spec.image)
+            _, value = self._call("POST", path, spec.create_body())
+        return str(value["Id"])
+
+    def _log_frames(self, container: str, follow: bool) -> Iterator[tuple[int, bytes]]:
+        query = urlencode({"stdout": 1, "stderr": 1, "follow": int(follow)})
+        connection = self._connection(
+            timeout=None if follow else REQUEST_TIMEOUT_SECONDS
+        )
+        try:
+            path = f"/containers/{container}/logs?{query}"
+            response = self._send(connection, "GET", path, None, {})
+            if response.status >= 400:
+                raise _error("GET", path, response)
+            # Without a TTY, each frame is a stream byte, padding, and a length.
+            while header := response.read(8):
+                stream, length = struct.unpack(">BxxxL", header)
+                yield stream, response.read(length)
+        finally:
+            connection.close()
+
+    def _call(
+        self,
+        method: str,
+        path: str,
+        body: dict[str, Any] | None = None,
+        *,
+        allowed: tuple[int, ...] = (),
+        timeout: float | None = REQUEST_TIMEOUT_SECONDS,
+    ) -> tuple[int, Any]:
+        with span(f"docker {method} {path.split('?')[0]}", "docker"):
+            connection = self._connection(timeout)
+            try:
+                response = self._send(connection, method, path, body, {})
+                if response.status >= 400 and response.status not in allowed:
+                    raise _error(method, path, response)
+                payload = response.read()
+            finally:
+                connection.close()
+        return response.status, json.loads(payload) if payload.strip() else {}
+
+    def _connection(self, timeout: float | None) -> _UnixConnection:
+        return _UnixConnection(self.socket_path, timeout)
+
+    @staticmethod
+    def _send(
+        connection: _UnixConnection,
+        method: str,
+        path: str,
+        body: dict[str, Any] | None,
+        headers: dict[str, str],
+    ) -> http.client.HTTPResponse:
+        encoded = None if body is None else json.dumps(body).encode()
+        if encoded is not None:
+            headers = {**headers, "Content-Type": "application/json"}
+        connection.request(method, f"/{API_VERSION}{path}", encoded, headers)
+        return connection.getresponse()
+
+
+class _UnixConnection(http.client.HTTPConnection):
+    def __init__(self, socket_path: Path, timeout: float | None) -> None:
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self) -> None:
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(str(self.socket_path))
+
+
+def _close_when_cancelled(
+    connection: _UnixConnection, cancel: threading.Event, finished: threading.Event
+) -> None:
+    """Shut down a blocked connection once ``cancel`` is set, until it finishes."""
+
+    while not finished.is_set():
+        if cancel.wait(CANCEL_POLL_SECONDS):
+            try:
+                if connection.sock is not None:
+                    connection.sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            return
+
+
+def _error(method: str, path: str, response: http.client.HTTPResponse) -> RuntimeError:
+    try:
+        message = json.loads(response.read()).get("message", "")
+    except ValueError, AttributeError:
+        message = ""
+    return RuntimeError(
+        f"Docker {method} {path.split('?')[0]} failed with HTTP {response.status}"
+        + (f": {message}" if message else "")
+    )
+
+
+def _split_reference(image: str) -> tuple[str, str]:
+    """Split an image reference into the repository and the tag or digest."""
+
+    if "@" in image:
+        name, digest = image.split("@", maxsplit=1)
+        return name, digest
+    name, separator, tag = image.rpartition(":")
+    if separator and "/" not in tag:
+        return name, tag
+    return image, "latest"
+
+
+def _registry(name: str) -> str:
+    first, separator, _rest = name.partition("/")
+    return first if separator and ("." in first or ":" in first) else "docker.io"
+
+
+def _uses_credential_helper(configuration: dict[str, Any], registry: str) -> bool:
+    """Return whether the CLI reads the registry's credentials from a helper."""
+
+    helpers = configuration.get("credHelpers") or {}
+    servers = [registry]
+    if registry == "docker.io":
+        servers += ["index.docker.io", "https://index.docker.io/v1/"]
+    return bool(configuration.get("credsStore")) or any(
+        server in helpers for server in servers
+    )
+
+
+def _registry_authentication(
+    configuration: dict[str, Any], registry: str
+) -> str | None:
+    """Encode credentials stored by ``docker login`` for the image's registry."""
+
+    authentications = configuration.get("auths", {})
+    for server in (registry, f"https://{registry}", "https://index.docker.io/v1/"):
+        encoded = authentications.get(server, {}).get("auth")
+        if encoded and (
+            server != "https://index.docker.io/v1/" or registry == "docker.io"
+        ):
+            username, _, password = base64.b64decode(encoded).decode().partition(":")
+            return base64.urlsafe_b64encode(
+                json.dumps(
+                    {
+                        "username": username,
+                        "password": password,
+                        "serveraddress": server,
+                    }
+                ).encode()
+            ).decode()
+    return None
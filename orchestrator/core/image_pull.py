@@ -0,0 +1,120 @@
+"""Pull container images concurrently behind one combined progress line.
+
+A reference pinned by digest names exactly one image, so a local image with
+that digest is what the registry would send and is used without contacting the
+registry. The other images are pulled at the same time, which bounds the wait
+by the slowest image instead of the sum of all of them.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections.abc import Sequence
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, TextIO
+
+from .docker import Docker
+
+MEBIBYTE = 1024 * 1024
+PROGRESS_INTERVAL_SECONDS = 1.0
+
+
+@dataclass(frozen=True)
+class ImagePull:
+    image: str
+    seconds: float
+    pulled: bool
+
+
+class CombinedProgress:
+    """Sum the layer downloads of concurrent pulls into one periodic line."""
+
+    def __init__(
+        self,
+        count: int,
+        output: TextIO | None = None,
+        interval: float = PROGRESS_INTERVAL_SECONDS,
+    ) -> None:
+        self.count = count
+        self.output = output
+        self.interval = interval
+        self.finished = 0
+        self._layers: dict[tuple[str, str], tuple[int, int]] = {}
+        self._reported = 0.0
+        self._lock = threading.Lock()
+
+    def update(self, image: str, message: dict[str, Any]) -> None:
+        layer = message.get("id")
+        if not layer:
+            return
+        key = (image, str(layer))
+        detail = message.get("progressDetail") or {}
+        with self._lock:
+            if message.get("status") == "Downloading" and detail.get("total"):
+                self._layers[key] = (
+                    int(detail.get("current", 0)),
+                    int(detail["total"]),
+                )
+            elif message.get("status") == "Download complete" and key in self._layers:
+                total = self._layers[key][1]
+                self._layers[key] = (total, total)
+            now = time.monotonic()
+            if now - self._reported < self.interval:
+                return
+            self._reported = now
+            current = sum(current for current, _ in self._layers.values())
+            total = sum(total for _, total in self._layers.values())
+            line = (
+                f"Pulling images: {self.finished}/{self.count} done,"
+                f" {current / MEBIBYTE:.1f} of {total / MEBIBYTE:.1f} MiB downloaded"
+            )
+        print(line, file=self.output)
+
+    def finish(self, result: ImagePull) -> None:
+        with self._lock:
+            self.finished += 1
+            line = (
+                f"{'Pulled' if result.pulled else 'Found'} {result.image.split('@')[0]}"
+                f" in {result.seconds:.1f}s ({self.finished}/{self.count})"
+            )
+        print(line, file=self.output)
+
+
+def pull_images(
+    docker: Docker,
+    images: Sequence[str],
+    output: TextIO | None = None,
+    refresh_tags: bool = True,
+) -> list[ImagePull]:
+    """Pull the images that are not present locally, all at once.
+
+    Images referenced by tag are pulled even when present unless
+    ``refresh_tags`` is false, since the tag may have moved.
+    """
+
+    images = list(dict.fromkeys(images))
+    if not images:
+        return []
+    progress = CombinedProgress(len(images), output)
+
+    def pull(image: str) -> ImagePull:
+        started = time.monotonic()
+        present = ("@" in image or not refresh_tags) and docker.image_exists(image)
+        if not present:
+            docker.pull(image, lambda message: progress.update(image, message))
+        result = ImagePull(image, time.monotonic() - started, not present)
+        progress.finish(result)
+        return result
+
+    with ThreadPoolExecutor(
+        max_workers=len(images), thread_name_prefix="ft-pull"
+    ) as executor:
+        futures = [executor.submit(pull, image) for image in images]
+    errors = [error for future in futures if (error := future.exception())]
+    if len(errors) == 1:
+        raise errors[0]
+    if errors:
+        raise RuntimeError("; ".join(str(error) for error in errors))
+    return [future.result() for future in futures]
@@ -54,6 +54,14 @@ class RepoPaths:
     def artifacts(self) -> Path:
         return self.root / ".artifacts"
 
+    @property
+    def subprocess_trace(self) -> Path:
+        return self.artifacts / "trace" / "subprocesses.jsonl"
+
+    @property
+    def ci_cache(self) -> Path:
+        return self.artifacts / "ci-cache"
+
     @property
     def backend_artifacts(self) -> Path:
         return self.backend / ".artifacts"
@@ -82,6 +90,10 @@ class RepoPaths:
     def backend_data_project(self) -> Path:
         return self.backend / "Data" / "Data.csproj"
 
+    @property
+    def backend_migrations(self) -> Path:
+        return self.backend / "Data" / "Migrations"
+
     @property
     def backend_data_artifacts(self) -> Path:
         return self.backend_artifacts / "obj" / "Data"
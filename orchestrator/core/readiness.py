@@ -0,0 +1,153 @@
+"""Wait for containers and HTTP endpoints to become ready.
+
+HTTP endpoints are probed with jittered exponential backoff that starts at a few
+milliseconds, so a service that is ready almost immediately is noticed almost
+immediately. Container health follows Docker events when the Engine API is
+available instead of inspecting the container on a fixed interval. The first
+target that fails cancels the waits for the others.
+"""
+
+from __future__ import annotations
+
+import random
+import threading
+import time
+from collections.abc import Iterator, Sequence
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from urllib.error import URLError
+from urllib.request import urlopen
+
+from .docker import Docker, DockerEngine
+
+DEFAULT_TIMEOUT_SECONDS = 60.0
+PROBE_TIMEOUT_SECONDS = 3.0
+
+
+@dataclass(frozen=True)
+class Backoff:
+    """Exponentially growing delays, each shortened by up to half at random."""
+
+    initial: float = 0.005
+    maximum: float = 1.0
+    factor: float = 2.0
+
+    def delays(self) -> Iterator[float]:
+        delay = self.initial
+        while True:
+            yield delay * random.uniform(0.5, 1.0)
+            delay = min(delay * self.factor, self.maximum)
+
+
+DEFAULT_BACKOFF = Backoff()
+
+
+@dataclass(frozen=True)
+class Endpoint:
+    """An HTTP URL that is ready once it answers with a 2xx status."""
+
+    url: str
+
+
+@dataclass(frozen=True)
+class Healthy:
+    """A container that is ready once its health check reports healthy."""
+
+    container: str
+
+
+def wait_for_url(
+    url: str,
+    timeout: float = DEFAULT_TIMEOUT_SECONDS,
+    backoff: Backoff = DEFAULT_BACKOFF,
+    cancel: threading.Event | None = None,
+) -> None:
+    """Probe ``url`` until it answers with a 2xx status or the deadline passes.
+
+    Setting ``cancel`` stops probing and returns early.
+    """
+
+    cancel = cancel or threading.Event()
+    deadline = time.monotonic() + timeout
+    for delay in backoff.delays():
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        try:
+            with urlopen(
+                url, timeout=min(PROBE_TIMEOUT_SECONDS, remaining)
+            ) as response:
+                if 200 <= response.status < 300:
+                    return
+        except OSError, URLError:
+            pass
+        if cancel.wait(min(delay, max(deadline - time.monotonic(), 0))):
+            return
+    raise RuntimeError(f"Endpoint did not become ready within {timeout:g}s: {url}")
+
+
+def wait_for_health(
+    docker: Docker,
+    container: str,
+    timeout: float = DEFAULT_TIMEOUT_SECONDS,
+    cancel: threading.Event | None = None,
+) -> None:
+    """Wait until a container's health check reports healthy.
+
+    Setting ``cancel`` stops waiting and returns early.
+    """
+
+    cancel = cancel or threading.Event()
+    if isinstance(docker, DockerEngine):
+        docker.wait_until_healthy(container, timeout, cancel)
+        return
+    # Each CLI inspect starts a process, so polling starts less eagerly.
+    deadline = time.monotonic() + timeout
+    for delay in Backoff(initial=0.1).delays():
+        status = docker.health_status(container)
+        if status == "healthy":
+            return
+        if status == "unhealthy":
+            raise RuntimeError(f"Container became unhealthy: {container}")
+        if time.monotonic() + delay > deadline:
+            break
+        if cancel.wait(delay):
+            return
+    raise RuntimeError(
+        f"Container {container} did not become healthy within {timeout:g}s"
+    )
+
+
+def wait_until_ready(
+    docker: Docker,
+    targets: Sequence[Endpoint | Healthy],
+    timeout: float = DEFAULT_TIMEOUT_SECONDS,
+) -> None:
+    """Wait for every target concurrently and raise the first that fails.
+
+    The first failure cancels the remaining waits, which return early.
+    """
+
+    cancel = threading.Event()
+    failures: list[BaseException] = []
+
+    def wait(target: Endpoint | Healthy) -> None:
+        try:
+            if isinstance(target, Endpoint):
+                wait_for_url(target.url, timeout, cancel=cancel)
+            else:
+                wait_for_health(docker, target.container, timeout, cancel)
+        except BaseException as error:
+            failures.append(error)
+            cancel.set()
+
+    if len(targets) == 1:
+        wait(targets[0])
+    else:
+        with ThreadPoolExecutor(
+            max_workers=len(targets), thread_name_prefix="ft-readiness"
+        ) as executor:
+            for target in targets:
+                executor.submit(wait, target)
+    if failures:
+        raise failures[0]
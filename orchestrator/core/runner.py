@@ -3,18 +3,55 @@
 from __future__ import annotations
 
 import os
+import resource
 import shlex
+import signal
 import subprocess
+import threading
+import time
 from collections.abc import Mapping, Sequence
-from dataclasses import dataclass
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from contextlib import suppress
+from dataclasses import dataclass, replace
 from pathlib import Path
+from typing import IO, TextIO
+
+from .timeline import span
+from .trace import SubprocessTrace, command_name, redact_arguments
+
+CANCELLATION_POLL_SECONDS = 0.1
+TERMINATION_GRACE_SECONDS = 10
+
+
+@dataclass(frozen=True)
+class Invocation:
+    """One command for ``Runner.run_many``, labelled for its prefixed output."""
+
+    arguments: Sequence[str]
+    cwd: Path | None = None
+    env: Mapping[str, str] | None = None
+    label: str | None = None
 
 
 @dataclass
 class Runner:
-    """Runs external tools with explicit arguments and working directories."""
+    """Runs external tools with explicit arguments and working directories.
+
+    A runner with an ``output`` stream collects the output of uncaptured commands
+    there instead of inheriting the terminal, a runner with a ``cancellation``
+    event terminates its running command once the event is set, and a runner
+    with a ``trace`` records the timing and resource usage of every command.
+    """
 
     verbose: bool = True
+    output: TextIO | None = None
+    cancellation: threading.Event | None = None
+    trace: SubprocessTrace | None = None
+
+    def buffered(self, output: TextIO, cancellation: threading.Event) -> Runner:
+        """Return a runner that writes to ``output`` and stops when cancelled."""
+
+        return replace(self, output=output, cancellation=cancellation)
 
     def run(
         self,
@@ -25,23 +62,385 @@ class Runner:
         check: bool = True,
         capture_output: bool = False,
         input_text: str | None = None,
+        stdin: IO[bytes] | None = None,
     ) -> subprocess.CompletedProcess[str]:
-        """Run a command while merging environment overrides with the parent environment."""
+        """Run a command while merging environment overrides with the parent environment.
+
+        ``stdin`` hands an open file to the command as its standard input without
+        passing its contents through this process.
+        """
 
         command = [str(argument) for argument in arguments]
         if self.verbose:
-            print(f"Running subprocess: {shlex.join(command)}")
+            print(f"Running subprocess: {shlex.join(command)}", file=self.output)
 
-        process_environment = os.environ.copy()
-        if env is not None:
-            process_environment.update(env)
+        with span(command_name(command), "subprocess", argv=redact_arguments(command)):
+            return self._run(
+                command,
+                cwd,
+                self._environment(env),
+                check,
+                capture_output,
+                input_text,
+                stdin,
+            )
+
+    def run_many(
+        self,
+        invocations: Sequence[Invocation],
+        *,
+        limit: int = 4,
+        fail_fast: bool = True,
+        check: bool = True,
+        capture_output: bool = False,
+    ) -> list[subprocess.CompletedProcess[str]]:
+        """Run commands concurrently and return their results in invocation order.
 
-        return subprocess.run(
+        Each output line is printed with the command label unless output is
+        captured; either way it is collected in the returned results. With
+        ``fail_fast`` the first failure terminates the other commands and starts
+        no more, otherwise every command runs and all failures are reported.
+        """
+
+        if limit < 1:
+            raise ValueError("At least one concurrent command is required")
+        running = _RunningProcesses(TERMINATION_GRACE_SECONDS)
+        failures: list[subprocess.CompletedProcess[str]] = []
+        futures: list[Future[subprocess.CompletedProcess[str] | None]] = []
+        with ThreadPoolExecutor(
+            max_workers=limit, thread_name_prefix="ft-process"
+        ) as executor:
+            try:
+                futures = [
+                    executor.submit(
+                        self._run_streamed, invocation, capture_output, running
+                    )
+                    for invocation in invocations
+                ]
+                pending = set(futures)
+                while pending:
+                    if self.cancellation is not None and self.cancellation.is_set():
+                        running.stop()
+                    done, pending = wait(
+                        pending,
+                        timeout=CANCELLATION_POLL_SECONDS,
+                        return_when=FIRST_COMPLETED,
+                    )
+                    for future in done:
+                        result = future.result()
+                        if result is None or result.returncode == 0 or running.stopped:
+                            continue
+                        failures.append(result)
+                        if check and fail_fast:
+                            running.stop()
+            except BaseException:
+                running.stop()
+                raise
+
+        if self.cancellation is not None and self.cancellation.is_set():
+            raise RuntimeError(f"Cancelled {len(invocations)} concurrent subprocesses")
+        if check and failures:
+            if len(failures) == 1 or fail_fast:
+                failure = failures[0]
+                raise subprocess.CalledProcessError(
+                    failure.returncode, failure.args, failure.stdout, failure.stderr
+                )
+            raise RuntimeError(
+                f"{len(failures)} of {len(invocations)} commands failed: "
+                + "; ".join(shlex.join(failure.args) for failure in failures)
+            )
+        return [result for future in futures if (result := future.result())]
+
+    def _run(
+        self,
+        command: list[str],
+        cwd: Path | None,
+        process_environment: dict[str, str],
+        check: bool,
+        capture_output: bool,
+        input_text: str | None,
+        stdin: IO[bytes] | None = None,
+    ) -> subprocess.CompletedProcess[str]:
+        if self.output is None and self.cancellation is None and self.trace is None:
+            return subprocess.run(
+                command,
+                cwd=cwd,
+                env=process_environment,
+                check=check,
+                capture_output=capture_output,
+                text=True,
+                input=input_text,
+                stdin=stdin,
+            )
+
+        stdout_target: int | None = None
+        stderr_target: int | None = None
+        if capture_output:
+            stdout_target = stderr_target = subprocess.PIPE
+        elif self.output is not None:
+            stdout_target, stderr_target = subprocess.PIPE, subprocess.STDOUT
+        started = time.time()
+        process = subprocess.Popen(
             command,
             cwd=cwd,
             env=process_environment,
-            check=check,
-            capture_output=capture_output,
             text=True,
-            input=input_text,
+            stdin=subprocess.PIPE if input_text is not None else stdin,
+            stdout=stdout_target,
+            stderr=stderr_target,
+            # A separate process group lets cancellation reach the whole tree.
+            process_group=0 if self.cancellation is not None else None,
+        )
+        usage: resource.struct_rusage | None = None
+        try:
+            stdout, stderr, usage = self._communicate(process, command, input_text)
+        except BaseException:
+            process.kill()
+            process.wait()
+            raise
+        finally:
+            self._record(process, command, cwd, started, usage)
+
+        if self.output is not None and not capture_output and stdout:
+            self.output.write(stdout)
+        if check and process.returncode != 0:
+            raise subprocess.CalledProcessError(
+                process.returncode, command, stdout, stderr
+            )
+        return subprocess.CompletedProcess(
+            command,
+            process.returncode,
+            stdout if capture_output else None,
+            stderr if capture_output else None,
+        )
+
+    def _run_streamed(
+        self,
+        invocation: Invocation,
+        capture_output: bool,
+        running: _RunningProcesses,
+    ) -> subprocess.CompletedProcess[str] | None:
+        if running.stopped:
+            return None
+        command = [str(argument) for argument in invocation.arguments]
+        label = invocation.label or Path(command[0]).name
+        if self.verbose:
+            print(f"Running subprocess: {shlex.join(command)}", file=self.output)
+        with span(command_name(command), "subprocess", argv=redact_arguments(command)):
+            return self._stream(command, invocation, label, capture_output, running)
+
+    def _stream(
+        self,
+        command: list[str],
+        invocation: Invocation,
+        label: str,
+        capture_output: bool,
+        running: _RunningProcesses,
+    ) -> subprocess.CompletedProcess[str]:
+        started = time.time()
+        process = subprocess.Popen(
+            command,
+            cwd=invocation.cwd,
+            env=self._environment(invocation.env),
+            text=True,
+            errors="replace",
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            process_group=0,
+        )
+        running.add(process)
+        stdout_lines: list[str] = []
+        stderr_lines: list[str] = []
+        usage: resource.struct_rusage | None = None
+        try:
+            stderr_reader = threading.Thread(
+                target=self._stream_lines,
+                args=(process.stderr, label, capture_output, stderr_lines),
+                daemon=True,
+            )
+            stderr_reader.start()
+            self._stream_lines(process.stdout, label, capture_output, stdout_lines)
+            stderr_reader.join()
+            usage = _reap(process, 0)
+            returncode = process.wait()
+        finally:
+            running.discard(process)
+            self._record(process, command, invocation.cwd, started, usage)
+        return subprocess.CompletedProcess(
+            command, returncode, "".join(stdout_lines), "".join(stderr_lines)
         )
+
+    def _stream_lines(
+        self,
+        stream: IO[str] | None,
+        label: str,
+        capture_output: bool,
+        lines: list[str],
+    ) -> None:
+        if stream is None:
+            return
+        for line in stream:
+            lines.append(line)
+            if not capture_output:
+                print(f"[{label}] {line.rstrip()}", file=self.output)
+
+    def _communicate(
+        self,
+        process: subprocess.Popen[str],
+        command: list[str],
+        input_text: str | None,
+    ) -> tuple[str | None, str | None, resource.struct_rusage | None]:
+        """Exchange the pipes like ``Popen.communicate`` and reap with ``wait4``.
+
+        Reaping the child here rather than through ``Popen.wait`` keeps its own
+        resource usage, which ``wait4`` returns.
+        """
+
+        pipes = _Pipes(process, input_text)
+        delay = CANCELLATION_POLL_SECONDS / 64
+        while True:
+            if self.cancellation is not None and self.cancellation.is_set():
+                _signal_group(process, signal.SIGTERM)
+                try:
+                    process.wait(timeout=TERMINATION_GRACE_SECONDS)
+                except subprocess.TimeoutExpired:
+                    _signal_group(process, signal.SIGKILL)
+                    process.wait()
+                pipes.join()
+                raise RuntimeError(f"Cancelled subprocess: {shlex.join(command)}")
+            usage = _reap(process, 0 if self.cancellation is None else os.WNOHANG)
+            if process.returncode is not None:
+                pipes.join()
+                return pipes.stdout, pipes.stderr, usage
+            time.sleep(delay)
+            delay = min(delay * 2, CANCELLATION_POLL_SECONDS)
+
+    def _record(
+        self,
+        process: subprocess.Popen[str],
+        command: list[str],
+        cwd: Path | None,
+        started: float,
+        usage: resource.struct_rusage | None,
+    ) -> None:
+        if self.trace is not None:
+            self.trace.record(
+                command, cwd, started, time.time(), process.returncode, usage
+            )
+
+    @staticmethod
+    def _environment(env: Mapping[str, str] | None) -> dict[str, str]:
+        process_environment = os.environ.copy()
+        if env is not None:
+            process_environment.update(env)
+        return process_environment
+
+
+def _reap(process: subprocess.Popen[str], flags: int) -> resource.struct_rusage | None:
+    """Reap an exited child with ``wait4``, returning its resource usage.
+
+    The exit status is stored in ``returncode``, so ``Popen.wait`` and
+    ``Popen.poll`` report it without waiting again. With ``os.WNOHANG`` a
+    child that is still running is left alone.
+    """
+
+    if process.returncode is not None:
+        return None
+    try:
+        pid, status, usage = os.wait4(process.pid, flags)
+    except ChildProcessError:
+        # Something else reaped the child; Popen reports it as exited.
+        process.wait()
+        return None
+    if pid != process.pid:
+        return None
+    process.returncode = os.waitstatus_to_exitcode(status)
+    return usage
+
+
+class _Pipes:
+    """Feed a child's input and collect its output on background threads."""
+
+    def __init__(self, process: subprocess.Popen[str], input_text: str | None) -> None:
+        self.stdout: str | None = None
+        self.stderr: str | None = None
+        self.threads = [
+            threading.Thread(target=target, daemon=True)
+            for target, stream in (
+                (lambda: self._write(process.stdin, input_text), process.stdin),
+                (lambda: self._read(process.stdout, "stdout"), process.stdout),
+                (lambda: self._read(process.stderr, "stderr"), process.stderr),
+            )
+            if stream is not None
+        ]
+        for thread in self.threads:
+            thread.start()
+
+    def join(self) -> None:
+        for thread in self.threads:
+            thread.join()
+
+    @staticmethod
+    def _write(stream: IO[str] | None, text: str | None) -> None:
+        if stream is None:
+            return
+        with suppress(BrokenPipeError), stream:
+            if text:
+                stream.write(text)
+
+    def _read(self, stream: IO[str] | None, name: str) -> None:
+        if stream is None:
+            return
+        with stream:
+            setattr(self, name, stream.read())
+
+
+class _RunningProcesses:
+    """Processes started by ``run_many`` that a failure or cancellation stops.
+
+    Stopping sends SIGTERM, then SIGKILL to any process group still running
+    after ``grace`` seconds.
+    """
+
+    def __init__(self, grace: float) -> None:
+        self.grace = grace
+        self.lock = threading.Lock()
+        self.processes: set[subprocess.Popen[str]] = set()
+        self.stopped = False
+        self.killed = False
+
+    def add(self, process: subprocess.Popen[str]) -> None:
+        with self.lock:
+            self.processes.add(process)
+            stopped, killed = self.stopped, self.killed
+        if stopped:
+            _signal_group(process, signal.SIGKILL if killed else signal.SIGTERM)
+
+    def discard(self, process: subprocess.Popen[str]) -> None:
+        with self.lock:
+            self.processes.discard(process)
+
+    def stop(self) -> None:
+        with self.lock:
+            first = not self.stopped
+            self.stopped = True
+            processes = list(self.processes)
+        for process in processes:
+            _signal_group(process, signal.SIGTERM)
+        if first:
+            timer = threading.Timer(self.grace, self.kill)
+            timer.daemon = True
+            timer.start()
+
+    def kill(self) -> None:
+        # Processes are discarded only once reaped, so these IDs are still theirs.
+        with self.lock:
+            self.killed = True
+            processes = list(self.processes)
+        for process in processes:
+            _signal_group(process, signal.SIGKILL)
+
+
+def _signal_group(process: subprocess.Popen[str], signal_number: int) -> None:
+    with suppress(ProcessLookupError):
+        os.killpg(process.pid, signal_number)
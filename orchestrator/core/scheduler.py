@@ -0,0 +1,243 @@
+"""Dependency-ordered execution of independent steps."""
+
+from __future__ import annotations
+
+import io
+import sys
+import threading
+import time
+from collections.abc import Callable, Iterator, Sequence
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from dataclasses import dataclass, replace
+from typing import TYPE_CHECKING, TextIO
+
+from .context import Context
+from .timeline import span
+
+if TYPE_CHECKING:
+    from .step_cache import StepCache
+
+
+@dataclass(frozen=True)
+class Step:
+    """One named unit of work and the steps that must finish before it starts.
+
+    Steps that declare input patterns can be skipped when a cache recorded them
+    passing with identical inputs.
+    """
+
+    name: str
+    action: Callable[[Context], object]
+    requires: tuple[str, ...] = ()
+    inputs: tuple[str, ...] = ()
+
+
+def topological_order(steps: Sequence[Step]) -> tuple[Step, ...]:
+    """Order steps after their prerequisites, keeping declaration order otherwise."""
+
+    by_name = {step.name: step for step in steps}
+    if len(by_name) != len(steps):
+        raise ValueError("Step names must be unique")
+    for step in steps:
+        unknown = sorted(set(step.requires) - set(by_name))
+        if unknown:
+            raise ValueError(
+                f"Step {step.name} requires unknown steps: {', '.join(unknown)}"
+            )
+
+    ordered: list[Step] = []
+    remaining = list(steps)
+    completed: set[str] = set()
+    while remaining:
+        ready = [step for step in remaining if completed.issuperset(step.requires)]
+        if not ready:
+            raise ValueError(
+                "Step prerequisites form a cycle: "
+                + ", ".join(step.name for step in remaining)
+            )
+        for step in ready:
+            ordered.append(step)
+            completed.add(step.name)
+            remaining.remove(step)
+    return tuple(ordered)
+
+
+def cached_steps(steps: Sequence[Step], cache: StepCache) -> tuple[Step, ...]:
+    """Drop cache hits and prerequisites no remaining step needs.
+
+    Remaining steps with inputs record themselves in the cache when they pass.
+    """
+
+    order = topological_order(steps)
+    dependents: dict[str, list[str]] = {step.name: [] for step in order}
+    for step in order:
+        for requirement in step.requires:
+            dependents[requirement].append(step.name)
+
+    keys = {step.name: cache.key(step) for step in order if step.inputs}
+    needed: set[str] = set()
+    skipped: dict[str, str] = {}
+    for step in reversed(order):
+        if step.name in keys:
+            if cache.hit(keys[step.name]):
+                skipped[step.name] = "cached"
+            else:
+                needed.add(step.name)
+        elif not dependents[step.name] or needed.intersection(dependents[step.name]):
+            needed.add(step.name)
+        else:
+            skipped[step.name] = "skipped; no remaining step needs it"
+    for step in order:
+        if step.name in skipped:
+            print(f"==> {step.name} {skipped[step.name]}")
+
+    def recorded(step: Step, key: str) -> Callable[[Context], object]:
+        def action(context: Context) -> object:
+            result = step.action(context)
+            cache.record(step, key)
+            return result
+
+        return action
+
+    return tuple(
+        replace(
+            step,
+            action=recorded(step, keys[step.name])
+            if step.name in keys
+            else step.action,
+            requires=tuple(name for name in step.requires if name in needed),
+        )
+        for step in order
+        if step.name in needed
+    )
+
+
+def run_steps(
+    context: Context,
+    steps: Sequence[Step],
+    jobs: int = 1,
+    cache: StepCache | None = None,
+) -> None:
+    """Run steps after their prerequisites with at most ``jobs`` running at once.
+
+    A single job streams output as before. Concurrent steps buffer their output,
+    which is printed as one block when each step finishes. The first failure
+    cancels running siblings, starts nothing new, and is raised once they stop.
+    """
+
+    if jobs < 1:
+        raise ValueError("At least one job is required")
+    order = topological_order(steps if cache is None else cached_steps(steps, cache))
+    if jobs == 1:
+        for step in order:
+            _run_step(step, context)
+        return
+
+    waiting = {step.name: set(step.requires) for step in order}
+    cancellation = threading.Event()
+    running: dict[Future[object], tuple[Step, io.StringIO, float]] = {}
+    failure: tuple[Step, BaseException] | None = None
+    with (
+        _thread_output() as output,
+        ThreadPoolExecutor(max_workers=jobs, thread_name_prefix="ft-step") as executor,
+    ):
+        try:
+            while waiting or running:
+                if failure is None:
+                    for step in order:
+                        if len(running) >= jobs:
+                            break
+                        if step.name not in waiting or waiting[step.name]:
+                            continue
+                        del waiting[step.name]
+                        buffer = io.StringIO()
+                        step_context = replace(
+                            context,
+                            runner=context.runner.buffered(buffer, cancellation),
+                        )
+                        future = executor.submit(
+                            output.capture, buffer, step, step_context
+                        )
+                        running[future] = (step, buffer, time.monotonic())
+                if not running:
+                    break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    step, buffer, started = running.pop(future)
+                    error = future.exception()
+                    if error is None:
+                        status = "passed"
+                        for requirements in waiting.values():
+                            requirements.discard(step.name)
+                    elif cancellation.is_set():
+                        status = "cancelled"
+                    else:
+                        status = "failed"
+                        failure = (step, error)
+                        cancellation.set()
+                    output.write_block(
+                        f"==> {step.name} {status} in {time.monotonic() - started:.1f}s",
+                        buffer.getvalue(),
+                    )
+        except BaseException:
+            cancellation.set()
+            raise
+
+    if failure is not None:
+        step, error = failure
+        raise RuntimeError(f"Step {step.name} failed: {error}") from error
+
+
+def _run_step(step: Step, context: Context) -> object:
+    with span(step.name, "step"):
+        return step.action(context)
+
+
+class _ThreadOutput(io.TextIOBase):
+    """Route writes from step threads to their buffers and others to the terminal."""
+
+    def __init__(self, stream: TextIO) -> None:
+        self.stream = stream
+        self.local = threading.local()
+        self.lock = threading.Lock()
+
+    def capture(
+        self,
+        buffer: io.StringIO,
+        step: Step,
+        context: Context,
+    ) -> object:
+        self.local.buffer = buffer
+        try:
+            return _run_step(step, context)
+        finally:
+            self.local.buffer = None
+
+    def write(self, text: str) -> int:
+        buffer = getattr(self.local, "buffer", None)
+        if buffer is not None:
+            return buffer.write(text)
+        with self.lock:
+            return self.stream.write(text)
+
+    def write_block(self, header: str, body: str) -> None:
+        with self.lock:
+            self.stream.write(f"{header}\n{body}")
+            if body and not body.endswith("\n"):
+                self.stream.write("\n")
+            self.stream.flush()
+
+    def flush(self) -> None:
+        self.stream.flush()
+
+
+@contextmanager
+def _thread_output() -> Iterator[_ThreadOutput]:
+    original = sys.stdout
+    output = _ThreadOutput(original)
+    sys.stdout = output
+    try:
+        yield output
+    finally:
+        sys.stdout = original
@@ -0,0 +1,173 @@
+"""Content-addressed record of CI steps that passed with unchanged inputs."""
+
+from __future__ import annotations
+
+import glob
+import hashlib
+import json
+import os
+import re
+import subprocess
+from datetime import UTC, datetime
+from pathlib import Path
+
+from .scheduler import Step
+
+# Outside a git checkout, generated, installed, and local-only directories never
+# count as step inputs.
+IGNORED_DIRECTORIES = frozenset(
+    {
+        ".artifacts",
+        ".git",
+        ".mypy_cache",
+        ".next",
+        ".pytest_cache",
+        ".ruff_cache",
+        ".tools",
+        ".venv",
+        "TestResults",
+        "__pycache__",
+        "bin",
+        "debug",
+        "node_modules",
+        "obj",
+        "playwright-report",
+        "test-results",
+    }
+)
+
+
+class StepCache:
+    """Remember passing steps under a hash of their inputs and the toolchain.
+
+    Input patterns are globs over repository-relative POSIX paths: ``*`` stays
+    within one directory and ``**`` spans any number, so ``backend/**`` includes
+    every file below ``backend``. Candidates are the files git tracks or would
+    track, or outside a checkout, the files below each pattern's fixed prefix.
+    """
+
+    def __init__(self, root: Path, directory: Path, toolchain: Path) -> None:
+        self.root = root
+        self.directory = directory
+        self.toolchain = toolchain
+        self._files: tuple[str, ...] | None = None
+        self._digests: dict[str, str] = {}
+
+    def key(self, step: Step) -> str:
+        """Return the content hash of a step's declared inputs."""
+
+        digest = hashlib.sha256(step.name.encode())
+        digest.update(self._digest_file(self.toolchain))
+        for relative_path in self._matching(step.inputs):
+            digest.update(relative_path.encode() + b"\0")
+            digest.update(self._digest_file(self.root / relative_path))
+        return digest.hexdigest()
+
+    def hit(self, key: str) -> bool:
+        return (self.directory / f"{key}.json").is_file()
+
+    def record(self, step: Step, key: str) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        entry = self.directory / f"{key}.json"
+        temporary = entry.with_suffix(".tmp")
+        temporary.write_text(
+            json.dumps({"step": step.name, "recorded": datetime.now(UTC).isoformat()}),
+            encoding="utf-8",
+        )
+        os.replace(temporary, entry)
+
+    def prune(self, keep_latest: bool = True) -> int:
+        """Remove entries, keeping the newest entry per step unless told otherwise."""
+
+        if not self.directory.is_dir():
+            return 0
+        entries: dict[str, list[tuple[str, Path]]] = {}
+        for entry in self.directory.glob("*.json"):
+            try:
+                value = json.loads(entry.read_text(encoding="utf-8"))
+                step, recorded = str(value["step"]), str(value["recorded"])
+            except OSError, ValueError, KeyError, TypeError:
+                step, recorded = "", ""
+            entries.setdefault(step, []).append((recorded, entry))
+        removed = 0
+        for step, step_entries in entries.items():
+            step_entries.sort(reverse=True)
+            keep = 1 if keep_latest and step else 0
+            for _recorded, entry in step_entries[keep:]:
+                entry.unlink(missing_ok=True)
+                removed += 1
+        return removed
+
+    def _matching(self, patterns: tuple[str, ...]) -> list[str]:
+        expressions = [
+            re.compile(
+                glob.translate(pattern, recursive=True, include_hidden=True, seps="/")
+            )
+            for pattern in patterns
+        ]
+        listed = self._repository_files()
+        candidates = (
+            listed
+            if listed is not None
+            else sorted({path for pattern in patterns for path in self._walk(pattern)})
+        )
+        return [
+            relative_path
+            for relative_path in candidates
+            if any(expression.match(relative_path) for expression in expressions)
+            and (self.root / relative_path).is_file()
+        ]
+
+    def _repository_files(self) -> tuple[str, ...] | None:
+        """List tracked and untracked, unignored files, or ``None`` without git."""
+
+        if self._files is None:
+            try:
+                listed = subprocess.run(
+                    [
+                        "git",
+                        "ls-files",
+                        "-z",
+                        "--cached",
+                        "--others",
+                        "--exclude-standard",
+                    ],
+                    cwd=self.root,
+                    check=True,
+                    capture_output=True,
+                ).stdout
+            except OSError, subprocess.CalledProcessError:
+                return None
+            self._files = tuple(
+                sorted({name for name in listed.decode().split("\0") if name})
+            )
+        return self._files
+
+    def _walk(self, pattern: str) -> list[str]:
+        """List the files below the directories a pattern names literally."""
+
+        if not glob.has_magic(pattern):
+            return [pattern]
+        fixed: list[str] = []
+        for part in pattern.split("/")[:-1]:
+            if glob.has_magic(part):
+                break
+            fixed.append(part)
+        start = self.root.joinpath(*fixed)
+        files: list[str] = []
+        for directory, directories, names in os.walk(start):
+            directories[:] = sorted(
+                name for name in directories if name not in IGNORED_DIRECTORIES
+            )
+            relative_directory = Path(directory).relative_to(self.root)
+            files.extend(
+                (relative_directory / name).as_posix() for name in sorted(names)
+            )
+        return files
+
+    def _digest_file(self, path: Path) -> bytes:
+        key = str(path)
+        if key not in self._digests:
+            with path.open("rb") as file:
+                self._digests[key] = hashlib.file_digest(file, "sha256").hexdigest()
+        return self._digests[key].encode()
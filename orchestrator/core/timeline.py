@@ -0,0 +1,110 @@
+"""Chrome trace-event timeline of one ``ft`` invocation.
+
+Spans are recorded only while ``recording`` is active, so instrumented code costs
+nothing otherwise. The written file opens in ``chrome://tracing`` and Perfetto,
+which nest the spans of each thread by time.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any
+
+_active: Timeline | None = None
+
+
+class Timeline:
+    """Completed spans collected from every thread of this process."""
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.events: list[dict[str, Any]] = []
+        self.threads: dict[int, str] = {}
+
+    def add(
+        self,
+        name: str,
+        category: str,
+        started_ns: int,
+        ended_ns: int,
+        arguments: dict[str, Any],
+    ) -> None:
+        thread = threading.current_thread()
+        thread_id = threading.get_native_id()
+        event = {
+            "name": name,
+            "cat": category,
+            "ph": "X",
+            "ts": started_ns / 1000,
+            "dur": (ended_ns - started_ns) / 1000,
+            "pid": os.getpid(),
+            "tid": thread_id,
+            "args": arguments,
+        }
+        with self.lock:
+            self.events.append(event)
+            self.threads[thread_id] = thread.name
+
+    def write(self, path: Path) -> None:
+        with self.lock:
+            metadata = [
+                {
+                    "name": "thread_name",
+                    "ph": "M",
+                    "pid": os.getpid(),
+                    "tid": thread_id,
+                    "args": {"name": name},
+                }
+                for thread_id, name in self.threads.items()
+            ]
+            events = sorted(self.events, key=lambda event: event["ts"])
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temporary = path.with_name(f".{path.name}.tmp")
+        temporary.write_text(
+            json.dumps(
+                {"traceEvents": metadata + events, "displayTimeUnit": "ms"},
+                separators=(",", ":"),
+            ),
+            encoding="utf-8",
+        )
+        os.replace(temporary, path)
+
+
+@contextmanager
+def recording(path: Path | None) -> Iterator[None]:
+    """Collect spans while the block runs and write them to ``path`` afterwards."""
+
+    global _active
+    if path is None:
+        yield
+        return
+    timeline = _active = Timeline()
+    try:
+        yield
+    finally:
+        _active = None
+        timeline.write(path)
+
+
+@contextmanager
+def span(name: str, category: str, **arguments: Any) -> Iterator[None]:
+    """Time the enclosed block, or the decorated function, as one span."""
+
+    timeline = _active
+    if timeline is None:
+        yield
+        return
+    started = time.perf_counter_ns()
+    try:
+        yield
+    except BaseException as error:
+        arguments["error"] = f"{type(error).__name__}: {error}"
+        raise
+    finally:
+        timeline.add(name, category, started, time.perf_counter_ns(), arguments)
@@ -0,0 +1,135 @@
+"""Append-only timing and resource trace of every subprocess."""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+import resource
+import sys
+import threading
+from collections.abc import Iterator, Sequence
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+from uuid import uuid4
+
+SECRET_NAME_PATTERN = re.compile(r"SECRET|PASSWORD|TOKEN|CREDENTIAL|_KEY\b", re.I)
+URL_CREDENTIALS_PATTERN = re.compile(r"(?<=://)[^/@\s]+@")
+AUTHORIZATION_PATTERN = re.compile(r"^(Authorization:\s*\w+\s+).+$", re.I)
+REDACTED = "<redacted>"
+MAXIMUM_TRACE_BYTES = 16 * 1024 * 1024
+
+
+def redact_arguments(arguments: Sequence[str]) -> list[str]:
+    """Hide secret assignments, URL credentials, and authorization headers."""
+
+    redacted: list[str] = []
+    for argument in arguments:
+        name, separator, _value = argument.partition("=")
+        if separator and SECRET_NAME_PATTERN.search(name):
+            argument = f"{name}={REDACTED}"
+        argument = URL_CREDENTIALS_PATTERN.sub(f"{REDACTED}@", argument)
+        argument = AUTHORIZATION_PATTERN.sub(rf"\g<1>{REDACTED}", argument)
+        redacted.append(argument)
+    return redacted
+
+
+@dataclass
+class SubprocessTrace:
+    """Record each subprocess of one ``ft`` invocation as a JSON line."""
+
+    path: Path
+    run: str = field(default_factory=lambda: uuid4().hex)
+    invocation: list[str] = field(default_factory=lambda: sys.argv[1:])
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def record(
+        self,
+        arguments: Sequence[str],
+        cwd: Path | None,
+        started: float,
+        ended: float,
+        returncode: int | None,
+        usage: resource.struct_rusage | None,
+    ) -> None:
+        entry: dict[str, Any] = {
+            "run": self.run,
+            "invocation": redact_arguments(self.invocation),
+            "argv": redact_arguments(arguments),
+            "cwd": str(cwd or Path.cwd()),
+            "start": started,
+            "end": ended,
+            "duration": round(ended - started, 6),
+            "returncode": returncode,
+            "user_cpu": None if usage is None else round(usage.ru_utime, 6),
+            "system_cpu": None if usage is None else round(usage.ru_stime, 6),
+            "max_rss_kib": None if usage is None else _max_rss_kib(usage),
+        }
+        line = json.dumps(entry, separators=(",", ":")) + "\n"
+        with self.lock:
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                if (
+                    self.path.is_file()
+                    and self.path.stat().st_size > MAXIMUM_TRACE_BYTES
+                ):
+                    os.replace(self.path, self.path.with_suffix(".1.jsonl"))
+                with self.path.open("a", encoding="utf-8") as file:
+                    file.write(line)
+            except OSError as error:
+                print(
+                    f"warning: could not write subprocess trace: {error}",
+                    file=sys.stderr,
+                )
+
+
+def read_trace(path: Path) -> Iterator[dict[str, Any]]:
+    """Yield trace entries from a file and its rotated predecessor, oldest first."""
+
+    for candidate in (path.with_suffix(".1.jsonl"), path):
+        if not candidate.is_file():
+            continue
+        with candidate.open("r", encoding="utf-8") as file:
+            for line in file:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                if isinstance(entry, dict):
+                    yield entry
+
+
+def _max_rss_kib(usage: resource.struct_rusage) -> int:
+    # Linux reports kibibytes and macOS reports bytes.
+    if sys.platform == "darwin":
+        return usage.ru_maxrss // 1024
+    return usage.ru_maxrss
+
+
+def command_name(arguments: Sequence[str]) -> str:
+    """Name a traced command by its program and first positional arguments.
+
+    Long options without ``=`` are assumed to take the following value, so
+    ``docker run --volume a:b image check`` is named ``docker run image check``.
+    """
+
+    if not arguments:
+        return ""
+    words = [Path(arguments[0]).name]
+    index = 1
+    while index < len(arguments) and len(words) < 4:
+        argument = arguments[index]
+        index += 1
+        if argument.startswith("-"):
+            if (
+                argument.startswith("--")
+                and len(argument) > 2
+                and "=" not in argument
+                and index < len(arguments)
+                and not arguments[index].startswith("-")
+            ):
+                index += 1
+        else:
+            words.append(argument.split("@sha256:")[0].rstrip("/").rsplit("/")[-1])
+    return " ".join(words)
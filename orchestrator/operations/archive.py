@@ -0,0 +1,225 @@
+"""Compressed, deduplicated archive of the databases replaced by deployments.
+
+A deployment hard-links the database it is about to replace into
+``archive/pending``, which copies nothing while the instance is stopped. Once
+the new release is healthy, each pending copy is compressed with Zstandard in a
+single streaming pass that also hashes its content. A copy identical to an
+existing archive is dropped, and a retention policy prunes old archives.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import re
+import tempfile
+from collections.abc import Callable, Hashable
+from compression import zstd
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from pathlib import Path
+
+from ..core.clone import clone_file
+
+ARCHIVE_DIRECTORY_NAME = "archive"
+PENDING_DIRECTORY_NAME = "pending"
+COMPRESSION_LEVEL = 3
+CHUNK_BYTES = 1024 * 1024
+TIMESTAMP_FORMAT = "%Y%m%dT%H%M%SZ"
+PENDING_NAME = re.compile(r"^database-\d{8}T\d{6}Z\.db$")
+ARCHIVE_NAME = re.compile(
+    r"^database-(?P<time>\d{8}T\d{6}Z)(?:-(?P<digest>[0-9a-f]{16}))?\.db(?:\.zst)?$"
+)
+
+
+@dataclass(frozen=True)
+class Archive:
+    path: Path
+    created_at: datetime
+    digest: str | None
+    size: int
+
+    @property
+    def compressed(self) -> bool:
+        return self.path.suffix == ".zst"
+
+
+@dataclass(frozen=True)
+class RetentionPolicy:
+    """Keep the newest ``last`` archives and the newest one per recent period."""
+
+    last: int = 5
+    daily: int = 7
+    weekly: int = 4
+    monthly: int = 6
+
+    def keep(self, archives: list[Archive]) -> set[Path]:
+        newest_first = sorted(archives, key=lambda archive: archive.created_at)[::-1]
+        kept = {archive.path for archive in newest_first[: self.last]}
+        periods: tuple[tuple[int, Callable[[datetime], Hashable]], ...] = (
+            (self.daily, lambda moment: moment.date()),
+            (self.weekly, lambda moment: moment.isocalendar()[:2]),
+            (self.monthly, lambda moment: (moment.year, moment.month)),
+        )
+        for count, period in periods:
+            seen: set[Hashable] = set()
+            for archive in newest_first:
+                key = period(archive.created_at)
+                if key in seen:
+                    continue
+                if len(seen) == count:
+                    break
+                seen.add(key)
+                kept.add(archive.path)
+        return kept
+
+
+class ArchiveStore:
+    def __init__(self, directory: Path) -> None:
+        self.directory = directory
+        self.pending_directory = directory / PENDING_DIRECTORY_NAME
+
+    def entries(self) -> list[Archive]:
+        """Return the archives, oldest first, including uncompressed legacy ones."""
+
+        if not self.directory.is_dir():
+            return []
+        archives = []
+        for path in self.directory.iterdir():
+            match = ARCHIVE_NAME.match(path.name)
+            if match is None or not path.is_file():
+                continue
+            archives.append(
+                Archive(
+                    path,
+                    datetime.strptime(match["time"], TIMESTAMP_FORMAT).replace(
+                        tzinfo=UTC
+                    ),
+                    match["digest"],
+                    path.stat().st_size,
+                )
+            )
+        return sorted(archives, key=lambda archive: archive.created_at)
+
+    def pending(self) -> list[Path]:
+        if not self.pending_directory.is_dir():
+            return []
+        return sorted(
+            path
+            for path in self.pending_directory.iterdir()
+            if PENDING_NAME.match(path.name)
+        )
+
+    def stage(self, database: Path) -> Path:
+        """Keep ``database`` for archiving before it is replaced."""
+
+        self.pending_directory.mkdir(mode=0o750, parents=True, exist_ok=True)
+        name = f"database-{datetime.now(UTC).strftime(TIMESTAMP_FORMAT)}.db"
+        destination = self.pending_directory / name
+        try:
+            os.link(database, destination)
+        except FileExistsError:
+            raise
+        except OSError:
+            # Hard links need the same filesystem and permission to link.
+            clone_file(database, destination)
+        return destination
+
+    def archive_pending(self) -> list[Archive]:
+        """Compress every pending copy and return the archives written."""
+
+        archived = []
+        for path in self.pending():
+            timestamp = path.name.removeprefix("database-").removesuffix(".db")
+            archive = self.compress(path, timestamp)
+            if archive is not None:
+                archived.append(archive)
+            path.unlink()
+        return archived
+
+    def compress(self, source: Path, timestamp: str) -> Archive | None:
+        """Write a compressed archive of ``source``, or skip an identical one."""
+
+        self.directory.mkdir(mode=0o750, parents=True, exist_ok=True)
+        descriptor, temporary_value = tempfile.mkstemp(
+            prefix=".archive-", suffix=".zst", dir=self.directory
+        )
+        os.close(descriptor)
+        temporary = Path(temporary_value)
+        try:
+            content = hashlib.sha256()
+            with (
+                source.open("rb") as reader,
+                zstd.open(temporary, "wb", level=COMPRESSION_LEVEL) as writer,
+            ):
+                while chunk := reader.read(CHUNK_BYTES):
+                    content.update(chunk)
+                    writer.write(chunk)
+            digest = content.hexdigest()[:16]
+            if any(archive.digest == digest for archive in self.entries()):
+                temporary.unlink()
+                return None
+            path = self.directory / f"database-{timestamp}-{digest}.db.zst"
+            temporary.chmod(0o640)
+            os.replace(temporary, path)
+        except BaseException:
+            temporary.unlink(missing_ok=True)
+            raise
+        return Archive(
+            path,
+            datetime.strptime(timestamp, TIMESTAMP_FORMAT).replace(tzinfo=UTC),
+            digest,
+            path.stat().st_size,
+        )
+
+    def prune(self, policy: RetentionPolicy) -> list[Archive]:
+        """Delete archives the policy does not keep and return them."""
+
+        archives = self.entries()
+        kept = policy.keep(archives)
+        removed = [archive for archive in archives if archive.path not in kept]
+        for archive in removed:
+            archive.path.unlink()
+        return removed
+
+    def find(self, name: str) -> Archive:
+        """Find an archive by file name or by a prefix of its timestamp."""
+
+        archives = self.entries()
+        for archive in archives:
+            if archive.path.name == name:
+                return archive
+        matches = [
+            archive
+            for archive in archives
+            if archive.path.name.removeprefix("database-").startswith(name)
+        ]
+        if not matches:
+            raise ValueError(f"No archive matches {name}")
+        if len(matches) > 1:
+            raise ValueError(f"Archive {name} is ambiguous; use the full file name")
+        return matches[0]
+
+    @staticmethod
+    def restore(archive: Archive, destination: Path) -> None:
+        """Decompress ``archive`` to ``destination``, streaming it in chunks."""
+
+        descriptor, temporary_value = tempfile.mkstemp(
+            prefix=".restore-", suffix=".db", dir=destination.parent
+        )
+        os.close(descriptor)
+        temporary = Path(temporary_value)
+        try:
+            if archive.compressed:
+                with (
+                    zstd.open(archive.path, "rb") as reader,
+                    temporary.open("wb") as writer,
+                ):
+                    while chunk := reader.read(CHUNK_BYTES):
+                        writer.write(chunk)
+            else:
+                clone_file(archive.path, temporary)
+            os.replace(temporary, destination)
+        except BaseException:
+            temporary.unlink(missing_ok=True)
+            raise
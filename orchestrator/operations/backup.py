@@ -2,24 +2,49 @@
 
 from __future__ import annotations
 
+import json
 import os
 import shutil
-import sqlite3
+import subprocess
 import tempfile
 import time
-from json import load as load_json
+from collections.abc import Iterator
+from contextlib import contextmanager
+from datetime import UTC, datetime
 from pathlib import Path
-from urllib.error import URLError
+from typing import BinaryIO
 from urllib.request import Request, urlopen
 from uuid import uuid4
 
 from ..config.toolchain import Toolchain
+from ..core.clone import clone_file
+from ..core.docker import ContainerSpec, Docker, docker_client
 from ..core.paths import RepoPaths
+from ..core.readiness import wait_for_url
 from ..core.runner import Runner
+from .backup_state import append_history, read_state, write_state
 from .configuration import Configuration
 from .instance import resolve_instance_path
 from .migrator import run_migrator
+from .restic import (
+    ResticSession,
+    Snapshot,
+    in_data_subset,
+    parse_backup_summary,
+    parse_pack_sizes,
+)
 from .restic import run_restic as execute_restic
+from .snapshot import (
+    SNAPSHOT_PAGES,
+    SNAPSHOT_SLEEP_SECONDS,
+    SnapshotCallback,
+    SnapshotProgress,
+    create_snapshot,
+)
+from .snapshot_catalog import SnapshotCatalog
+from .validation import ValidationLevel
+from .validation import validate_database as check_database
+from .verification_ledger import FAILED, PASSED, VerificationLedger
 
 RESTIC_ENVIRONMENT_VARIABLES = (
     "RESTIC_REPOSITORY",
@@ -32,14 +57,63 @@ RESTIC_ENVIRONMENT_VARIABLES = (
 BACKUP_TAG = "financial-tracker"
 RESTORE_SMOKE_SUBJECT = "backup-restore-smoke-test"
 RESTORE_SMOKE_EMAIL = "backup-restore-smoke-test@example.test"
+SHARED_MEMORY_DIRECTORY = Path("/dev/shm")
+# Room left in shared memory beyond the snapshot for everything else using it.
+SHARED_MEMORY_HEADROOM_BYTES = 64 * 1024 * 1024
+BACKUP_STATE_DIRECTORY_NAME = "backup-state"
+DATA_CHECK_SUBSETS = 30
+MEBIBYTE = 1024 * 1024
+
+
+def snapshot_staging_directory(database: Path) -> Path | None:
+    """Return shared memory if a snapshot of ``database`` fits there, else ``None``.
+
+    The snapshot is at most the size of the database and its write-ahead log.
+    """
+
+    if not SHARED_MEMORY_DIRECTORY.is_dir():
+        return None
+    size = sum(
+        path.stat().st_size
+        for path in (database, database.with_name(f"{database.name}-wal"))
+        if path.is_file()
+    )
+    free = shutil.disk_usage(SHARED_MEMORY_DIRECTORY).free
+    if free < size + SHARED_MEMORY_HEADROOM_BYTES:
+        print(
+            f"{SHARED_MEMORY_DIRECTORY} has {free} bytes free, too little for a"
+            f" {size} byte snapshot; staging it on disk"
+        )
+        return None
+    return SHARED_MEMORY_DIRECTORY
+
+
+def restored_database_path(restore_directory: Path) -> Path:
+    """Locate the database restored from a streamed or a mounted snapshot."""
+
+    for candidate in (
+        restore_directory / "database.db",
+        restore_directory / "snapshot" / "database.db",
+    ):
+        if candidate.is_file():
+            return candidate
+    raise RuntimeError("Restic did not restore the expected database file")
 
 
 class BackupOperations:
     """Operations against one deployed instance backup repository."""
 
-    def __init__(self, path_value: str, runner: Runner | None = None) -> None:
+    session: ResticSession | None = None
+
+    def __init__(
+        self,
+        path_value: str,
+        runner: Runner | None = None,
+        docker: Docker | None = None,
+    ) -> None:
         self.path = resolve_instance_path(path_value)
         self.runner = runner or Runner()
+        self.docker = docker or docker_client(self.runner)
         self.restic_image = Toolchain.read(
             RepoPaths.discover().toolchain
         ).require_image("restic")
@@ -61,66 +135,71 @@ class BackupOperations:
     def configuration(self) -> Configuration:
         return Configuration.build_from_existing_instance(str(self.path), False)
 
+    @contextmanager
+    def restic_session(
+        self, volumes: tuple[tuple[Path, str, bool], ...] = ()
+    ) -> Iterator[ResticSession]:
+        """Send ``run_restic`` calls to one container with these mounts."""
+
+        with ResticSession(
+            volumes=volumes, image=self.restic_image, runner=self.runner
+        ) as session:
+            self.session = session
+            try:
+                yield session
+            finally:
+                self.session = None
+
     def run_restic(
         self,
         arguments: list[str],
         volumes: tuple[tuple[Path, str, bool], ...] = (),
-    ) -> None:
+        stdin: BinaryIO | None = None,
+        capture_output: bool = False,
+    ) -> subprocess.CompletedProcess[str]:
         """Run Restic with only its required credentials and explicit mounts."""
 
-        execute_restic(
+        if self.session is not None:
+            if not set(volumes) <= set(self.session.volumes):
+                raise ValueError("Restic session volumes are fixed when it starts")
+            return self.session.run(
+                arguments, stdin=stdin, capture_output=capture_output
+            )
+        return execute_restic(
             arguments,
             volumes=volumes,
             image=self.restic_image,
             runner=self.runner,
+            stdin=stdin,
+            capture_output=capture_output,
         )
 
     @staticmethod
-    def create_database_snapshot(source: Path, destination: Path) -> None:
-        source_connection = sqlite3.connect(f"file:{source}?mode=ro", uri=True)
-        destination_connection = sqlite3.connect(destination)
-        try:
-            source_connection.backup(destination_connection)
-        finally:
-            destination_connection.close()
-            source_connection.close()
+    def create_database_snapshot(
+        source: Path,
+        destination: Path,
+        pages: int = SNAPSHOT_PAGES,
+        sleep: float = SNAPSHOT_SLEEP_SECONDS,
+        progress: SnapshotCallback | None = None,
+    ) -> SnapshotProgress:
+        """Copy the live database in paced steps so its writers are not stalled."""
+
+        return create_snapshot(source, destination, pages, sleep, progress)
 
     @staticmethod
-    def validate_database(database_path: Path) -> None:
-        connection = sqlite3.connect(f"file:{database_path}?mode=ro", uri=True)
-        try:
-            if connection.execute("PRAGMA integrity_check").fetchall() != [("ok",)]:
-                raise RuntimeError("SQLite integrity check failed")
-            if connection.execute("PRAGMA foreign_key_check").fetchall():
-                raise RuntimeError("SQLite foreign-key check failed")
-            migration_table = connection.execute(
-                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = '__EFMigrationsHistory'"
-            ).fetchone()
-            if migration_table is None:
-                raise RuntimeError(
-                    "Restored database does not contain EF migration history"
-                )
-        finally:
-            connection.close()
+    def validate_database(
+        database_path: Path, level: ValidationLevel = ValidationLevel.STANDARD
+    ) -> None:
+        checks = check_database(database_path, level)
+        for check in sorted(checks, key=lambda check: check.seconds, reverse=True):
+            print(f"Validated table {check.table} in {check.seconds:.2f}s")
 
     def get_published_port(self, container: str) -> int:
-        result = self.runner.run(
-            ["docker", "port", container, "8080/tcp"],
-            capture_output=True,
-        )
-        return int(result.stdout.strip().rsplit(":", maxsplit=1)[1])
+        return self.docker.published_port(container, 8080)
 
     @staticmethod
     def wait_for_url(url: str) -> None:
-        deadline = time.monotonic() + 60
-        while time.monotonic() < deadline:
-            try:
-                with urlopen(url, timeout=3) as response:
-                    if 200 <= response.status < 300:
-                        return
-            except OSError, URLError:
-                time.sleep(1)
-        raise RuntimeError(f"Restored backend endpoint did not become ready: {url}")
+        wait_for_url(url)
 
     def verify_restored_backend(
         self, configuration: Configuration, data_directory: Path
@@ -131,42 +210,25 @@ class BackupOperations:
         logs_directory.mkdir(mode=0o777)
         os.chmod(data_directory, 0o777)
         try:
-            self.runner.run(
-                [
-                    "docker",
-                    "run",
-                    "--detach",
-                    "--name",
-                    container,
-                    "--publish",
-                    "127.0.0.1::8080",
-                    "--read-only",
-                    "--tmpfs",
-                    "/tmp",
-                    "--cap-drop",
-                    "ALL",
-                    "--security-opt",
-                    "no-new-privileges:true",
-                    "--volume",
-                    f"{data_directory.resolve()}:/data",
-                    "--volume",
-                    f"{logs_directory.resolve()}:/logs",
-                    "--env",
-                    "ASPNETCORE_ENVIRONMENT=Development",
-                    "--env",
-                    "ASPNETCORE_HTTP_PORTS=8080",
-                    "--env",
-                    "DATABASE_PATH=/data/database.db",
-                    "--env",
-                    "LOG_DIRECTORY=/logs",
-                    "--env",
-                    "FRONTEND_ORIGIN=http://localhost",
-                    "--env",
-                    "AUTH_MODE=development",
-                    "--env",
-                    f"DEVELOPMENT_AUTH_SUBJECT={RESTORE_SMOKE_SUBJECT}",
+            self.docker.run_detached(
+                ContainerSpec(
                     configuration.backend_image,
-                ],
+                    name=container,
+                    environment={
+                        "ASPNETCORE_ENVIRONMENT": "Development",
+                        "ASPNETCORE_HTTP_PORTS": "8080",
+                        "DATABASE_PATH": "/data/database.db",
+                        "LOG_DIRECTORY": "/logs",
+                        "FRONTEND_ORIGIN": "http://localhost",
+                        "AUTH_MODE": "development",
+                        "DEVELOPMENT_AUTH_SUBJECT": RESTORE_SMOKE_SUBJECT,
+                    },
+                    volumes=(
+                        (data_directory.resolve(), "/data"),
+                        (logs_directory.resolve(), "/logs"),
+                    ),
+                    ports=((8080, None),),
+                )
             )
             port = self.get_published_port(container)
             base_url = f"http://127.0.0.1:{port}"
@@ -178,7 +240,7 @@ class BackupOperations:
             with urlopen(
                 Request(f"{base_url}/users/me", headers=headers), timeout=30
             ) as response:
-                application_user = load_json(response)
+                application_user = json.load(response)
             if application_user["email"] != RESTORE_SMOKE_EMAIL:
                 raise RuntimeError(
                     "Restored backend did not resolve the seeded application user"
@@ -186,7 +248,7 @@ class BackupOperations:
             with urlopen(
                 Request(f"{base_url}/accounts", headers=headers), timeout=30
             ) as response:
-                accounts = load_json(response)
+                accounts = json.load(response)
             if isinstance(accounts, list):
                 account_items = accounts
             elif isinstance(accounts, dict) and "items" in accounts:
@@ -209,91 +271,292 @@ class BackupOperations:
                 method="POST",
             )
             with urlopen(request, timeout=30) as response:
-                updated_account = load_json(response)
+                updated_account = json.load(response)
             if updated_account["financialInstitution"] != f"smoke-{identifier}":
                 raise RuntimeError(
                     "Restored backend did not persist the account update"
                 )
         finally:
-            self.runner.run(
-                ["docker", "container", "rm", "--force", container],
-                check=False,
-                capture_output=True,
-            )
+            self.docker.remove(container)
 
     def initialize(self) -> None:
         self.run_restic(["init"])
 
-    def backup(self) -> None:
+    def backup(
+        self,
+        validation: ValidationLevel = ValidationLevel.STANDARD,
+        stream: bool = False,
+    ) -> None:
+        """Snapshot, validate, and upload the database, then apply retention.
+
+        A streamed backup keeps the snapshot in shared memory when the host has
+        room for it there and pipes the file into Restic, so the snapshot never
+        touches disk. Otherwise the snapshot is staged in a disk temporary
+        directory.
+        """
+
         configuration = self.configuration()
+        identity = ["--host", configuration.name, "--tag", BACKUP_TAG]
+        database = Path(configuration.get_database_file_path())
         with tempfile.TemporaryDirectory(
-            prefix="financial-tracker-backup-"
+            prefix="financial-tracker-backup-",
+            dir=snapshot_staging_directory(database) if stream else None,
         ) as directory:
             snapshot_directory = Path(directory)
             snapshot_path = snapshot_directory / "database.db"
-            self.create_database_snapshot(
-                Path(configuration.get_database_file_path()), snapshot_path
+            snapshot = self.create_database_snapshot(database, snapshot_path)
+            print(
+                f"Copied {snapshot.total} database pages in {snapshot.elapsed:.1f}s"
+                f" ({snapshot.pages_per_second:.0f} pages/s)"
             )
-            self.validate_database(snapshot_path)
-            self.run_restic(
-                [
-                    "backup",
-                    "/snapshot/database.db",
-                    "--host",
-                    configuration.name,
-                    "--tag",
-                    BACKUP_TAG,
-                ],
-                ((snapshot_directory, "/snapshot", True),),
+            started = time.monotonic()
+            self.validate_database(snapshot_path, validation)
+            validation_seconds = time.monotonic() - started
+            volumes = () if stream else ((snapshot_directory, "/snapshot", True),)
+            with self.restic_session(volumes):
+                try:
+                    if stream:
+                        with snapshot_path.open("rb") as snapshot_file:
+                            result = self.run_restic(
+                                [
+                                    "backup",
+                                    "--json",
+                                    "--stdin",
+                                    "--stdin-filename",
+                                    "database.db",
+                                    *identity,
+                                ],
+                                stdin=snapshot_file,
+                                capture_output=True,
+                            )
+                    else:
+                        result = self.run_restic(
+                            ["backup", "--json", "/snapshot/database.db", *identity],
+                            volumes,
+                            capture_output=True,
+                        )
+                except subprocess.CalledProcessError as error:
+                    # The JSON output is captured, and with it Restic's errors.
+                    message = (error.stderr or "").strip() or str(error)
+                    raise RuntimeError(f"Restic backup failed: {message}") from error
+                summary = parse_backup_summary(result.stdout)
+                print(
+                    f"Saved snapshot {summary.get('snapshot_id', '')[:8]}:"
+                    f" {summary.get('data_added', 0)} bytes added of"
+                    f" {summary.get('total_bytes_processed', 0)} processed"
+                )
+                started = time.monotonic()
+                self.run_restic(
+                    [
+                        "forget",
+                        *identity,
+                        # Streamed and mounted snapshots record different paths.
+                        "--group-by",
+                        "host,tags",
+                        "--keep-daily",
+                        "7",
+                        "--keep-weekly",
+                        "5",
+                        "--keep-monthly",
+                        "12",
+                        "--prune",
+                    ]
+                )
+                prune_seconds = time.monotonic() - started
+        append_history(
+            self.state_directory / "backups.jsonl",
+            {
+                "snapshot": summary.get("snapshot_id"),
+                "finished_at": datetime.now(UTC).isoformat(),
+                "streamed": stream,
+                "files_new": summary.get("files_new", 0),
+                "files_changed": summary.get("files_changed", 0),
+                "data_added": summary.get("data_added", 0),
+                "data_added_packed": summary.get("data_added_packed", 0),
+                "total_bytes_processed": summary.get("total_bytes_processed", 0),
+                "snapshot_seconds": round(snapshot.elapsed, 3),
+                "validation_seconds": round(validation_seconds, 3),
+                "upload_seconds": round(float(summary.get("total_duration", 0)), 3),
+                "prune_seconds": round(prune_seconds, 3),
+            },
+        )
+
+    @property
+    def state_directory(self) -> Path:
+        return self.path / BACKUP_STATE_DIRECTORY_NAME
+
+    @property
+    def catalog(self) -> SnapshotCatalog:
+        return SnapshotCatalog(self.state_directory / "snapshots.json")
+
+    def list_snapshots(
+        self, configuration: Configuration, refresh: bool = True
+    ) -> list[Snapshot]:
+        """Return this instance's tagged snapshots, oldest first."""
+
+        if refresh:
+            self.catalog.refresh(
+                lambda arguments: self.run_restic(arguments, capture_output=True).stdout
             )
-        self.run_restic(
-            [
-                "forget",
-                "--host",
-                configuration.name,
-                "--tag",
-                BACKUP_TAG,
-                "--keep-daily",
-                "7",
-                "--keep-weekly",
-                "5",
-                "--keep-monthly",
-                "12",
-                "--prune",
-            ]
+        return [
+            snapshot
+            for snapshot in self.catalog.snapshots(BACKUP_TAG)
+            if snapshot.hostname == configuration.name
+        ]
+
+    def check_repository(self, subsets: int = DATA_CHECK_SUBSETS) -> None:
+        """Check repository metadata and the next of ``subsets`` slices of pack data.
+
+        The slice to read is kept in the instance state, so consecutive runs
+        rotate through the slices and read the whole repository once every
+        ``subsets`` runs. The bytes read are the slice's pack sizes in the
+        repository index.
+        """
+
+        if subsets < 1:
+            raise ValueError("At least one data subset is required")
+        state_path = self.state_directory / "data-check.json"
+        state = read_state(state_path)
+        subset = state.get("next", 1) if state.get("subsets") == subsets else 1
+        started = time.monotonic()
+        self.run_restic(["check", f"--read-data-subset={subset}/{subsets}"])
+        seconds = time.monotonic() - started
+        write_state(state_path, {"next": subset % subsets + 1, "subsets": subsets})
+        read = self.data_subset_bytes(subset, subsets)
+        append_history(
+            self.state_directory / "data-checks.jsonl",
+            {
+                "subset": f"{subset}/{subsets}",
+                "bytes": read,
+                "seconds": round(seconds, 3),
+                "checked_at": datetime.now(UTC).isoformat(),
+            },
+        )
+        print(
+            f"Checked repository data subset {subset}/{subsets}"
+            f" ({read / MEBIBYTE:.1f} MiB) in {seconds:.1f}s"
         )
 
-    def verify(self) -> None:
+    def data_subset_bytes(self, subset: int, subsets: int) -> int:
+        """Sum the sizes of the packs ``restic check`` reads for a data subset."""
+
+        sizes: dict[str, int] = {}
+        indexes = self.run_restic(["list", "index"], capture_output=True).stdout
+        for index in indexes.split():
+            sizes.update(
+                parse_pack_sizes(
+                    self.run_restic(["cat", "index", index], capture_output=True).stdout
+                )
+            )
+        return sum(
+            size
+            for pack, size in sizes.items()
+            if in_data_subset(pack, subset, subsets)
+        )
+
+    def verify(
+        self,
+        validation: ValidationLevel = ValidationLevel.STANDARD,
+        since: datetime | None = None,
+        all_unverified: bool = False,
+        data_subsets: int = DATA_CHECK_SUBSETS,
+    ) -> None:
+        """Verify the latest snapshot, or every matching one, unless already verified.
+
+        Verifications are recorded in the instance's ledger; a snapshot that
+        passed with the current migrator image is not restored again.
+        """
+
         configuration = self.configuration()
-        self.run_restic(["check"])
         with tempfile.TemporaryDirectory(
             prefix="financial-tracker-restore-"
+        ) as directory:
+            restore_root = Path(directory)
+            with self.restic_session(((restore_root, "/restore", False),)):
+                self.check_repository(data_subsets)
+                snapshots = self.list_snapshots(configuration)
+                if not snapshots:
+                    raise RuntimeError(
+                        f"No backup snapshots exist for {configuration.name}"
+                    )
+                if since is not None:
+                    snapshots = [
+                        snapshot for snapshot in snapshots if snapshot.time >= since
+                    ]
+                elif not all_unverified:
+                    snapshots = snapshots[-1:]
+                self.verify_snapshots(
+                    configuration, snapshots, validation, restore_root
+                )
+
+    def verify_snapshots(
+        self,
+        configuration: Configuration,
+        snapshots: list[Snapshot],
+        validation: ValidationLevel,
+        restore_root: Path,
+    ) -> None:
+        ledger = VerificationLedger(self.state_directory / "verifications.jsonl")
+        verified = ledger.verified(configuration.migrator_image)
+        for snapshot in snapshots:
+            if (snapshot.id, snapshot.tree) in verified:
+                print(f"Snapshot {snapshot.short_id} is already verified")
+                continue
+            started = time.monotonic()
+            try:
+                self.verify_snapshot(
+                    configuration, snapshot.id, validation, restore_root
+                )
+            except Exception:
+                ledger.record(
+                    snapshot,
+                    configuration.migrator_image,
+                    FAILED,
+                    time.monotonic() - started,
+                )
+                raise
+            ledger.record(
+                snapshot,
+                configuration.migrator_image,
+                PASSED,
+                time.monotonic() - started,
+            )
+            print(f"Snapshot {snapshot.short_id} verified")
+
+    def verify_snapshot(
+        self,
+        configuration: Configuration,
+        snapshot_id: str,
+        validation: ValidationLevel,
+        restore_root: Path,
+    ) -> None:
+        """Restore one snapshot, migrate it, and boot the backend against it.
+
+        ``restore_root`` is mounted at ``/restore`` in the Restic container.
+        """
+
+        with tempfile.TemporaryDirectory(
+            prefix="snapshot-", dir=restore_root
         ) as directory:
             restore_directory = Path(directory)
             self.run_restic(
                 [
                     "restore",
-                    "latest",
-                    "--host",
-                    configuration.name,
-                    "--tag",
-                    BACKUP_TAG,
+                    snapshot_id,
                     "--target",
-                    "/restore",
+                    f"/restore/{restore_directory.name}",
                     "--verify",
                 ],
-                ((restore_directory, "/restore", False),),
+                ((restore_root, "/restore", False),),
             )
-            restored_database = restore_directory / "snapshot" / "database.db"
-            if not restored_database.is_file():
-                raise RuntimeError("Restic did not restore the expected database file")
-            self.validate_database(restored_database)
+            restored_database = restored_database_path(restore_directory)
+            self.validate_database(restored_database, validation)
 
             migration_directory = restore_directory / "migration"
             migration_directory.mkdir(mode=0o777)
             os.chmod(migration_directory, 0o777)
             migration_database = migration_directory / "database.db"
-            shutil.copy2(restored_database, migration_database)
+            clone_file(restored_database, migration_database)
             os.chmod(migration_database, 0o666)
             run_migrator(
                 configuration.migrator_image,
@@ -303,7 +566,8 @@ class BackupOperations:
                     "DEVELOPMENT_AUTH_SUBJECT": RESTORE_SMOKE_SUBJECT,
                     "DEVELOPMENT_AUTH_EMAIL": RESTORE_SMOKE_EMAIL,
                 },
-                runner=self.runner,
+                docker=self.docker,
             )
-            self.validate_database(migration_database)
+            # The restored file was fully checked; migrations only need a quick pass.
+            self.validate_database(migration_database, ValidationLevel.QUICK)
             self.verify_restored_backend(configuration, migration_directory)
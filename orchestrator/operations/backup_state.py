@@ -0,0 +1,50 @@
+"""Small JSON state files kept in an instance's backup state directory."""
+
+from __future__ import annotations
+
+import json
+import os
+from pathlib import Path
+from typing import Any
+
+
+def read_state(path: Path) -> dict[str, Any]:
+    """Return a JSON object state file, or an empty state if it is unreadable."""
+
+    try:
+        state = json.loads(path.read_text(encoding="utf-8"))
+    except OSError, ValueError:
+        return {}
+    return state if isinstance(state, dict) else {}
+
+
+def write_state(path: Path, state: dict[str, Any]) -> None:
+    """Replace a state file atomically so an interrupted run cannot corrupt it."""
+
+    path.parent.mkdir(mode=0o750, parents=True, exist_ok=True)
+    temporary = path.with_name(f".{path.name}.{os.getpid()}")
+    temporary.write_text(json.dumps(state, indent=2) + "\n", encoding="utf-8")
+    os.replace(temporary, path)
+
+
+def append_history(path: Path, entry: dict[str, Any]) -> None:
+    path.parent.mkdir(mode=0o750, parents=True, exist_ok=True)
+    with path.open("a", encoding="utf-8") as file:
+        file.write(json.dumps(entry, separators=(",", ":")) + "\n")
+
+
+def read_history(path: Path) -> list[dict[str, Any]]:
+    """Return the JSON line entries of a history file, skipping damaged lines."""
+
+    if not path.is_file():
+        return []
+    entries = []
+    with path.open("r", encoding="utf-8") as file:
+        for line in file:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(entry, dict):
+                entries.append(entry)
+    return entries
@@ -6,10 +6,9 @@ import json
 import os
 import socket
 import tempfile
-import time
 from http.cookiejar import CookieJar
 from pathlib import Path
-from urllib.error import HTTPError, URLError
+from urllib.error import HTTPError
 from urllib.parse import urlencode, urljoin
 from urllib.request import (
     HTTPCookieProcessor,
@@ -21,8 +20,12 @@ from urllib.request import (
 from uuid import uuid4
 
 from ..config.toolchain import Toolchain
+from ..core.clone import clone_file
+from ..core.docker import ContainerSpec, Docker, docker_client
 from ..core.paths import RepoPaths
+from ..core.readiness import Endpoint, Healthy, wait_until_ready
 from ..core.runner import Runner
+from .database_cache import TemplateDatabaseCache
 from .migrator import run_migrator
 
 SMOKE_TEST_SUBJECT = "container-smoke-test"
@@ -30,34 +33,54 @@ SMOKE_TEST_EMAIL = "container-smoke-test@example.test"
 SMOKE_TEST_STANDARD_SUBJECT = "container-smoke-standard"
 
 
+SMOKE_TEST_ADMIN_SEED = {
+    "AUTH_MODE": "development",
+    "DEVELOPMENT_AUTH_SUBJECT": SMOKE_TEST_SUBJECT,
+    "DEVELOPMENT_AUTH_EMAIL": SMOKE_TEST_EMAIL,
+}
+SMOKE_TEST_STANDARD_SEED = {
+    "AUTH_MODE": "development",
+    "DEVELOPMENT_AUTH_SUBJECT": SMOKE_TEST_STANDARD_SUBJECT,
+    "DEVELOPMENT_AUTH_EMAIL": "container-smoke-standard@example.test",
+    "DEVELOPMENT_AUTH_ROLE": "Standard",
+}
+# The admin seed runs twice to exercise a repeated migration.
+SMOKE_TEST_SEEDS = (
+    SMOKE_TEST_ADMIN_SEED,
+    SMOKE_TEST_ADMIN_SEED,
+    SMOKE_TEST_STANDARD_SEED,
+)
+
+
 def prepare_smoke_test_database(
     data_directory: Path,
     migrator_image: str | None = None,
     runner: Runner | None = None,
+    cache: TemplateDatabaseCache | None = None,
 ) -> None:
-    """Migrate the smoke database and provision deterministic test users."""
+    """Migrate the smoke database and provision deterministic test users.
+
+    With a ``cache``, the prepared database is kept as a template for the
+    migrator image ID and cloned on later runs instead of migrating again.
+    """
 
-    environment = {
-        "AUTH_MODE": "development",
-        "DEVELOPMENT_AUTH_SUBJECT": SMOKE_TEST_SUBJECT,
-        "DEVELOPMENT_AUTH_EMAIL": SMOKE_TEST_EMAIL,
-    }
     image = migrator_image or Toolchain.read(
         RepoPaths.discover().toolchain
     ).require_image("migrator")
-    run_migrator(image, data_directory, environment, runner=runner)
-    run_migrator(image, data_directory, environment, runner=runner)
-    run_migrator(
-        image,
-        data_directory,
-        {
-            "AUTH_MODE": "development",
-            "DEVELOPMENT_AUTH_SUBJECT": SMOKE_TEST_STANDARD_SUBJECT,
-            "DEVELOPMENT_AUTH_EMAIL": "container-smoke-standard@example.test",
-            "DEVELOPMENT_AUTH_ROLE": "Standard",
-        },
-        runner=runner,
-    )
+    docker = docker_client(runner)
+    database = data_directory / "database.db"
+    image_id = docker.image_id(image) if cache is not None else None
+    key = json.dumps([image_id, SMOKE_TEST_SEEDS]) if image_id else None
+    template = cache.get(key) if cache is not None and key else None
+    if template is not None:
+        clone_file(template, database)
+        os.chmod(database, 0o666)
+        return
+
+    for environment in SMOKE_TEST_SEEDS:
+        run_migrator(image, data_directory, environment, docker=docker)
+    if cache is not None and key:
+        cache.put(database, key)
 
 
 class DoNotFollowRedirects(HTTPRedirectHandler):
@@ -71,10 +94,14 @@ class ContainerSmokeTest:
     """Start the built images and verify their operational endpoints."""
 
     def __init__(
-        self, paths: RepoPaths | None = None, runner: Runner | None = None
+        self,
+        paths: RepoPaths | None = None,
+        runner: Runner | None = None,
+        docker: Docker | None = None,
     ) -> None:
         self.paths = paths or RepoPaths.discover()
         self.runner = runner or Runner()
+        self.docker = docker or docker_client(self.runner)
         toolchain = Toolchain.read(self.paths.toolchain)
         self.backend_image = toolchain.require_image("backend")
         self.frontend_image = toolchain.require_image("frontend")
@@ -96,103 +123,65 @@ class ContainerSmokeTest:
             logs.mkdir(mode=0o777)
             os.chmod(directory, 0o777)
             os.chmod(database, 0o666)
-            prepare_smoke_test_database(directory, self.migrator_image, self.runner)
+            prepare_smoke_test_database(
+                directory,
+                self.migrator_image,
+                self.runner,
+                TemplateDatabaseCache(self.paths.artifacts / "smoke-templates"),
+            )
 
-            self.run_docker(["network", "create", network])
+            self.docker.create_network(network)
             try:
-                self.run_docker(
-                    [
-                        "run",
-                        "--detach",
-                        "--name",
-                        backend,
-                        "--network",
-                        network,
-                        "--network-alias",
-                        "backend",
-                        "--publish",
-                        "127.0.0.1::8080",
-                        "--read-only",
-                        "--tmpfs",
-                        "/tmp",
-                        "--cap-drop",
-                        "ALL",
-                        "--security-opt",
-                        "no-new-privileges:true",
-                        "--volume",
-                        f"{directory}:/data",
-                        "--volume",
-                        f"{logs}:/logs",
-                        "--env",
-                        "ASPNETCORE_ENVIRONMENT=Development",
-                        "--env",
-                        "ASPNETCORE_HTTP_PORTS=8080",
-                        "--env",
-                        "DATABASE_PATH=/data/database.db",
-                        "--env",
-                        "LOG_DIRECTORY=/logs",
-                        "--env",
-                        "FRONTEND_ORIGIN=http://localhost",
-                        "--env",
-                        "AUTH_MODE=development",
-                        "--env",
-                        f"DEVELOPMENT_AUTH_SUBJECT={SMOKE_TEST_SUBJECT}",
-                        "--env",
-                        f"DEVELOPMENT_AUTH_ADDITIONAL_SUBJECTS={SMOKE_TEST_STANDARD_SUBJECT}",
-                        "--env",
-                        "GOOGLE_CLIENT_ID=container-smoke-test",
+                self.docker.run_detached(
+                    ContainerSpec(
                         self.backend_image,
-                    ]
+                        name=backend,
+                        environment={
+                            "ASPNETCORE_ENVIRONMENT": "Development",
+                            "ASPNETCORE_HTTP_PORTS": "8080",
+                            "DATABASE_PATH": "/data/database.db",
+                            "LOG_DIRECTORY": "/logs",
+                            "FRONTEND_ORIGIN": "http://localhost",
+                            "AUTH_MODE": "development",
+                            "DEVELOPMENT_AUTH_SUBJECT": SMOKE_TEST_SUBJECT,
+                            "DEVELOPMENT_AUTH_ADDITIONAL_SUBJECTS": SMOKE_TEST_STANDARD_SUBJECT,
+                            "GOOGLE_CLIENT_ID": "container-smoke-test",
+                        },
+                        volumes=((directory, "/data"), (logs, "/logs")),
+                        ports=((8080, None),),
+                        network=network,
+                        network_alias="backend",
+                    )
                 )
                 backend_port = self.get_published_port(backend, 8080)
-                self.wait_for_url(f"http://127.0.0.1:{backend_port}/health/ready")
-                self.wait_for_container_health(backend)
+                self.wait_until_ready(
+                    f"http://127.0.0.1:{backend_port}/health/ready", backend
+                )
                 self.create_and_read_account(backend_port, identifier)
 
                 frontend_port = self.get_available_loopback_port()
                 frontend_origin = f"http://localhost:{frontend_port}"
-                self.run_docker(
-                    [
-                        "run",
-                        "--detach",
-                        "--name",
-                        frontend,
-                        "--network",
-                        network,
-                        "--publish",
-                        f"127.0.0.1:{frontend_port}:3000",
-                        "--read-only",
-                        "--tmpfs",
-                        "/tmp",
-                        "--cap-drop",
-                        "ALL",
-                        "--security-opt",
-                        "no-new-privileges:true",
-                        "--env",
-                        "API_URL=http://backend:8080",
-                        "--env",
-                        f"PUBLIC_ORIGIN={frontend_origin}",
-                        "--env",
-                        "AUTH_MODE=development",
-                        "--env",
-                        f"DEVELOPMENT_AUTH_SUBJECT={SMOKE_TEST_SUBJECT}",
-                        "--env",
-                        f"DEVELOPMENT_AUTH_ADDITIONAL_SUBJECTS={SMOKE_TEST_STANDARD_SUBJECT}",
-                        "--env",
-                        "GOOGLE_CLIENT_ID=container-smoke-test",
-                        "--env",
-                        "GOOGLE_CLIENT_SECRET=container-smoke-test",
-                        "--env",
-                        f"AUTH_URL={frontend_origin}",
-                        "--env",
-                        "AUTH_TRUST_HOST=true",
-                        "--env",
-                        f"AUTH_SECRET={identifier}{identifier}",
+                self.docker.run_detached(
+                    ContainerSpec(
                         self.frontend_image,
-                    ]
+                        name=frontend,
+                        environment={
+                            "API_URL": "http://backend:8080",
+                            "PUBLIC_ORIGIN": frontend_origin,
+                            "AUTH_MODE": "development",
+                            "DEVELOPMENT_AUTH_SUBJECT": SMOKE_TEST_SUBJECT,
+                            "DEVELOPMENT_AUTH_ADDITIONAL_SUBJECTS": SMOKE_TEST_STANDARD_SUBJECT,
+                            "GOOGLE_CLIENT_ID": "container-smoke-test",
+                            "GOOGLE_CLIENT_SECRET": "container-smoke-test",
+                            "AUTH_URL": frontend_origin,
+                            "AUTH_TRUST_HOST": "true",
+                            "AUTH_SECRET": f"{identifier}{identifier}",
+                        },
+                        ports=((3000, frontend_port),),
+                        network=network,
+                    )
                 )
-                self.wait_for_url(f"{frontend_origin}/login")
-                self.wait_for_container_health(frontend)
+                self.wait_until_ready(f"{frontend_origin}/login", frontend)
                 self.verify_frontend_session_and_api_flow(frontend_port)
                 self.verify_frontend_sign_in_outage(frontend_port, backend)
                 self.run_playwright_e2e(frontend_port, f"{identifier}{identifier}")
@@ -202,16 +191,8 @@ class ContainerSmokeTest:
                 raise
             finally:
                 for container in (frontend, backend):
-                    self.runner.run(
-                        ["docker", "container", "rm", "--force", container],
-                        check=False,
-                        capture_output=True,
-                    )
-                self.runner.run(
-                    ["docker", "network", "rm", network],
-                    check=False,
-                    capture_output=True,
-                )
+                    self.docker.remove(container)
+                self.docker.remove_network(network)
 
     @staticmethod
     def create_and_read_account(backend_port: int, identifier: str) -> None:
@@ -310,7 +291,7 @@ class ContainerSmokeTest:
         callback_browser = build_opener(
             HTTPCookieProcessor(cookies), DoNotFollowRedirects()
         )
-        self.run_docker(["stop", backend])
+        self.docker.stop(backend)
         try:
             try:
                 callback_browser.open(sign_in_request, timeout=30)
@@ -339,10 +320,11 @@ class ContainerSmokeTest:
             else:
                 raise RuntimeError("A resolver outage unexpectedly created a session.")
         finally:
-            self.run_docker(["start", backend])
+            self.docker.start(backend)
             restarted_backend_port = self.get_published_port(backend, 8080)
-            self.wait_for_url(f"http://127.0.0.1:{restarted_backend_port}/health/ready")
-            self.wait_for_container_health(backend)
+            self.wait_until_ready(
+                f"http://127.0.0.1:{restarted_backend_port}/health/ready", backend
+            )
 
     def run_playwright_e2e(self, frontend_port: int, auth_secret: str) -> None:
         environment = os.environ.copy()
@@ -354,15 +336,8 @@ class ContainerSmokeTest:
             env=environment,
         )
 
-    def run_docker(self, arguments: list[str]) -> None:
-        self.runner.run(["docker", *arguments])
-
     def get_published_port(self, container: str, container_port: int) -> int:
-        result = self.runner.run(
-            ["docker", "port", container, f"{container_port}/tcp"],
-            capture_output=True,
-        )
-        return int(result.stdout.strip().rsplit(":", maxsplit=1)[1])
+        return self.docker.published_port(container, container_port)
 
     @staticmethod
     def get_available_loopback_port() -> int:
@@ -370,43 +345,10 @@ class ContainerSmokeTest:
             listener.bind(("127.0.0.1", 0))
             return int(listener.getsockname()[1])
 
-    @staticmethod
-    def wait_for_url(url: str) -> None:
-        deadline = time.monotonic() + 60
-        while time.monotonic() < deadline:
-            try:
-                with urlopen(url, timeout=3) as response:
-                    if 200 <= response.status < 300:
-                        return
-            except OSError, URLError:
-                time.sleep(1)
-        raise RuntimeError(f"Container endpoint did not become ready: {url}")
-
-    def wait_for_container_health(self, container: str) -> None:
-        deadline = time.monotonic() + 60
-        while time.monotonic() < deadline:
-            result = self.runner.run(
-                [
-                    "docker",
-                    "inspect",
-                    "--format",
-                    "{{.State.Health.Status}}",
-                    container,
-                ],
-                capture_output=True,
-            )
-            status = result.stdout.strip()
-            if status == "healthy":
-                return
-            if status == "unhealthy":
-                raise RuntimeError(f"Container became unhealthy: {container}")
-            time.sleep(1)
-        raise RuntimeError(f"Container {container} did not become healthy")
+    def wait_until_ready(self, url: str, container: str) -> None:
+        wait_until_ready(self.docker, [Endpoint(url), Healthy(container)])
 
     def print_container_logs(self, container: str) -> None:
-        result = self.runner.run(
-            ["docker", "logs", container], check=False, capture_output=True
-        )
-        if result.returncode == 0:
-            print(result.stdout)
-            print(result.stderr)
+        logs = self.docker.logs(container)
+        if logs:
+            print(logs)
@@ -0,0 +1,133 @@
+"""Local caches of prepared SQLite databases, cloned into place on use.
+
+Restored debug databases are keyed by snapshot ID, the local ID of the
+migrator image, and the migration environment, since the same snapshot migrated
+and seeded by the same image always yields the same database. The image ID
+changes whenever a mutable tag is rebuilt, unlike the reference. Each hit
+refreshes the entry's modification time, and eviction removes the least
+recently used entries once the cache exceeds its size limit.
+
+Template databases are prepared once per key and expire by age and count.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from ..core.clone import clone_file
+
+DATABASE_CACHE_BYTES = 4 * 1024 * 1024 * 1024
+TEMPLATE_CACHE_ENTRIES = 8
+TEMPLATE_CACHE_SECONDS = 14 * 24 * 60 * 60
+
+
+class RestoredDatabaseCache:
+    def __init__(self, root: Path, limit_bytes: int = DATABASE_CACHE_BYTES) -> None:
+        self.root = root
+        self.limit_bytes = limit_bytes
+
+    def path(
+        self, snapshot_id: str, migrator_id: str, environment: dict[str, str]
+    ) -> Path:
+        key = json.dumps([snapshot_id, migrator_id, sorted(environment.items())])
+        return self.root / f"{hashlib.sha256(key.encode()).hexdigest()[:32]}.db"
+
+    def get(
+        self, snapshot_id: str, migrator_id: str, environment: dict[str, str]
+    ) -> Path | None:
+        """Return the cached database and mark it as recently used."""
+
+        path = self.path(snapshot_id, migrator_id, environment)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def put(
+        self,
+        database: Path,
+        snapshot_id: str,
+        migrator_id: str,
+        environment: dict[str, str],
+    ) -> Path:
+        """Store a copy of ``database`` and evict entries beyond the size limit."""
+
+        path = self.path(snapshot_id, migrator_id, environment)
+        _store(database, path)
+        self.evict(keep=path)
+        return path
+
+    def evict(self, keep: Path | None = None) -> None:
+        entries = sorted(
+            (
+                (entry.stat().st_mtime_ns, entry.stat().st_size, entry)
+                for entry in self.root.glob("*.db")
+            ),
+            reverse=True,
+        )
+        total = 0
+        for _, size, entry in entries:
+            total += size
+            if total > self.limit_bytes and entry != keep:
+                entry.unlink(missing_ok=True)
+
+
+class TemplateDatabaseCache:
+    def __init__(
+        self,
+        root: Path,
+        entries: int = TEMPLATE_CACHE_ENTRIES,
+        max_age_seconds: float = TEMPLATE_CACHE_SECONDS,
+    ) -> None:
+        self.root = root
+        self.entries = entries
+        self.max_age_seconds = max_age_seconds
+
+    def path(self, key: str) -> Path:
+        return self.root / f"{hashlib.sha256(key.encode()).hexdigest()[:32]}.db"
+
+    def get(self, key: str) -> Path | None:
+        self.evict()
+        path = self.path(key)
+        return path if path.is_file() else None
+
+    def put(self, database: Path, key: str) -> Path:
+        path = self.path(key)
+        _store(database, path)
+        self.evict()
+        return path
+
+    def evict(self) -> None:
+        """Remove expired templates and all but the newest ``entries``."""
+
+        if not self.root.is_dir():
+            return
+        oldest = time.time() - self.max_age_seconds
+        entries = sorted(
+            ((entry.stat().st_mtime, entry) for entry in self.root.glob("*.db")),
+            reverse=True,
+        )
+        for position, (modified, entry) in enumerate(entries):
+            if position >= self.entries or modified < oldest:
+                entry.unlink(missing_ok=True)
+
+
+def _store(database: Path, path: Path) -> None:
+    path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+    descriptor, temporary = tempfile.mkstemp(
+        prefix=".entry-", suffix=".db", dir=path.parent
+    )
+    os.close(descriptor)
+    try:
+        clone_file(database, Path(temporary))
+        os.chmod(temporary, 0o600)
+        os.replace(temporary, path)
+    except BaseException:
+        Path(temporary).unlink(missing_ok=True)
+        raise
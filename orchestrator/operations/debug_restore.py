@@ -3,20 +3,28 @@
 from __future__ import annotations
 
 import getpass
+import hashlib
 import os
 import shutil
 import tempfile
+from datetime import datetime
 from pathlib import Path
 from urllib.parse import urlsplit
 from uuid import uuid4
 
 from ..config.environment import read_dotenv
 from ..config.toolchain import Toolchain
+from ..core.clone import clone_file
+from ..core.docker import docker_client
 from ..core.paths import RepoPaths
 from ..core.runner import Runner
-from .backup import BACKUP_TAG, BackupOperations
+from .backup import BACKUP_TAG, BackupOperations, restored_database_path
+from .database_cache import RestoredDatabaseCache
 from .migrator import run_migrator
-from .restic import run_restic
+from .restic import ResticSession, Snapshot
+from .restic_mirror import ResticMirror, default_mirror_root
+from .snapshot_catalog import SnapshotCatalog
+from .validation import ValidationLevel
 
 
 class DebugRestoreOperations:
@@ -29,12 +37,22 @@ class DebugRestoreOperations:
         aws_profile: str | None = None,
         paths: RepoPaths | None = None,
         runner: Runner | None = None,
+        at: datetime | None = None,
+        snapshot: str | None = None,
+        mirror_root: Path | None = None,
+        snapshot_packs: bool = False,
+        use_cache: bool = True,
     ) -> None:
         self.paths = paths or RepoPaths.discover()
         self.runner = runner or Runner()
         self.repository = repository
         self.s3_uri = s3_uri
         self.aws_profile = aws_profile
+        self.at = at
+        self.snapshot = snapshot
+        self.mirror_root = mirror_root
+        self.snapshot_packs = snapshot_packs
+        self.use_cache = use_cache
         toolchain = Toolchain.read(self.paths.toolchain)
         self.restic_image = toolchain.require_image("restic")
         self.migrator_image = toolchain.require_image("migrator")
@@ -74,6 +92,12 @@ class DebugRestoreOperations:
                     "The AWS CLI is required to download an S3 Restic repository"
                 )
 
+        if self.snapshot_packs and self.s3_uri is None:
+            raise ValueError("--snapshot-packs requires --s3-uri")
+
+        if self.at is not None and self.snapshot is not None:
+            raise ValueError("Only one of --at or --snapshot may be provided")
+
         if self.aws_profile is not None:
             self.aws_profile = self.aws_profile.strip()
             if not self.aws_profile:
@@ -138,17 +162,22 @@ class DebugRestoreOperations:
                 "AWS authentication completed but the selected profile could not access AWS"
             )
 
-    def download_s3_repository(self, destination: Path) -> None:
-        """Download the complete Restic repository from S3."""
+    def mirror_s3_repository(self) -> ResticMirror:
+        """Bring the persistent local mirror of the S3 repository up to date.
+
+        Only metadata is synced here. Packs are fetched once the selected
+        snapshot turns out to be missing from the database cache.
+        """
 
         if self.s3_uri is None:
             raise RuntimeError("An S3 source was not configured")
         self.ensure_aws_login()
-        self.run_aws(["s3", "sync", self.s3_uri, str(destination)])
-        if not (destination / "config").is_file():
-            raise RuntimeError(
-                "The S3 source did not contain a complete Restic repository"
-            )
+        mirror = ResticMirror(
+            self.s3_uri, self.mirror_root or default_mirror_root(), self.run_aws
+        )
+        mirror.sync(include_data=False)
+        print(f"Mirrored {self.s3_uri} in {mirror.directory}")
+        return mirror
 
     @staticmethod
     def get_restic_password() -> str:
@@ -192,79 +221,136 @@ class DebugRestoreOperations:
             ),
         }
 
+    def catalog(self) -> SnapshotCatalog:
+        """Return the local snapshot catalog of the selected repository."""
+
+        source = self.s3_uri or self.repository or ""
+        name = hashlib.sha256(source.encode()).hexdigest()[:16]
+        return SnapshotCatalog(
+            self.paths.artifacts / "snapshot-catalog" / f"{name}.json"
+        )
+
+    def select_snapshot(self, catalog: SnapshotCatalog) -> Snapshot:
+        """Choose the requested snapshot, or the latest tagged one."""
+
+        if self.snapshot is not None:
+            return catalog.find(self.snapshot)
+        if self.at is not None:
+            return catalog.at(self.at, BACKUP_TAG)
+        return catalog.latest(BACKUP_TAG)
+
+    def database_cache(self) -> RestoredDatabaseCache:
+        return RestoredDatabaseCache(self.paths.artifacts / "restored-databases")
+
     def restore(self) -> None:
-        """Restore and atomically install the latest tagged debug database."""
+        """Restore and atomically install the selected debug database.
+
+        A snapshot already restored by the same local migrator image with the
+        same environment is cloned from the database cache instead of being
+        restored and migrated again.
+        """
 
         password = self.get_restic_password()
+        mirror: ResticMirror | None = None
+        if self.repository is None:
+            mirror = self.mirror_s3_repository()
+            repository_path = mirror.directory
+        else:
+            repository_path = Path(self.repository)
+        cache = self.database_cache()
+        environment = self.get_migration_environment()
+        migrator_id = (
+            docker_client(self.runner).image_id(self.migrator_image)
+            if self.use_cache
+            else None
+        )
+
         with tempfile.TemporaryDirectory(
-            prefix=".financial-tracker-repository-", dir=self.paths.debug_data
-        ) as repository_directory:
-            if self.repository is None:
-                self.download_s3_repository(Path(repository_directory))
-                repository_path = Path(repository_directory)
-            else:
-                repository_path = Path(self.repository)
-
-            with tempfile.TemporaryDirectory(
-                prefix=".financial-tracker-restore-", dir=self.paths.debug_data
-            ) as restore_directory_value:
-                restore_directory = Path(restore_directory_value)
-                run_restic(
-                    ["check"],
-                    repository=repository_path,
-                    password=password,
-                    pass_aws_credentials=False,
-                    image=self.restic_image,
-                    runner=self.runner,
-                )
-                run_restic(
-                    [
-                        "restore",
-                        "latest",
-                        "--tag",
-                        BACKUP_TAG,
-                        "--target",
-                        "/restore",
-                        "--verify",
-                    ],
-                    repository=repository_path,
-                    volumes=((restore_directory, "/restore", False),),
-                    password=password,
-                    pass_aws_credentials=False,
-                    image=self.restic_image,
-                    runner=self.runner,
+            prefix=".financial-tracker-restore-", dir=self.paths.debug_data
+        ) as restore_directory_value:
+            restore_directory = Path(restore_directory_value)
+            staged_database = restore_directory / "database.db"
+            with ResticSession(
+                repository=repository_path,
+                volumes=((restore_directory, "/restore", False),),
+                password=password,
+                pass_aws_credentials=False,
+                image=self.restic_image,
+                runner=self.runner,
+            ) as restic:
+
+                def output(arguments: list[str]) -> str:
+                    return restic.run(arguments, capture_output=True).stdout
+
+                catalog = self.catalog()
+                catalog.refresh(output)
+                snapshot = self.select_snapshot(catalog)
+                cached = (
+                    cache.get(snapshot.id, migrator_id, environment)
+                    if migrator_id is not None
+                    else None
                 )
-
-                restored_database = restore_directory / "snapshot" / "database.db"
-                if not restored_database.is_file():
-                    raise RuntimeError(
-                        "Restic did not restore the expected database file"
+                if cached is None:
+                    if mirror is not None and self.snapshot_packs:
+                        fetched = mirror.fetch_snapshot(output, snapshot)
+                        print(
+                            f"Fetched {fetched} packs for snapshot {snapshot.short_id}"
+                        )
+                    elif mirror is not None:
+                        mirror.sync()
+                    # A partial mirror lacks most packs, which check would report.
+                    if not self.snapshot_packs:
+                        restic.run(["check"])
+                    print(
+                        f"Restoring snapshot {snapshot.short_id}"
+                        f" taken at {snapshot.time.isoformat()}"
+                    )
+                    restic.run(
+                        ["restore", snapshot.id, "--target", "/restore", "--verify"]
                     )
 
-                staged_database = restore_directory / "database.db"
-                shutil.copy2(restored_database, staged_database)
-                restore_directory.chmod(0o777)
+            if cached is not None:
+                print(f"Using the cached database for snapshot {snapshot.short_id}")
+                clone_file(cached, staged_database)
                 staged_database.chmod(0o666)
-                BackupOperations.validate_database(staged_database)
-
-                run_migrator(
-                    self.migrator_image,
-                    restore_directory,
-                    self.get_migration_environment(),
-                    runner=self.runner,
-                )
-                BackupOperations.validate_database(staged_database)
-
-                rollback_path: Path | None = None
-                if self.paths.debug_database.is_file():
-                    rollback_path = self.get_rollback_path(self.paths.debug_data)
-                    try:
-                        shutil.copy2(self.paths.debug_database, rollback_path)
-                    except Exception:
-                        rollback_path.unlink(missing_ok=True)
-                        raise
-
-                os.replace(staged_database, self.paths.debug_database)
-                self.paths.debug_database.chmod(0o666)
-                if rollback_path is not None:
-                    print(f"Previous debug database preserved at {rollback_path}")
+            else:
+                self.prepare_database(restore_directory)
+                if migrator_id is not None:
+                    cache.put(staged_database, snapshot.id, migrator_id, environment)
+            self.install_database(staged_database)
+
+    def prepare_database(self, restore_directory: Path) -> None:
+        """Stage, validate, and migrate the database Restic restored."""
+
+        restored_database = restored_database_path(restore_directory)
+        staged_database = restore_directory / "database.db"
+        if restored_database != staged_database:
+            clone_file(restored_database, staged_database)
+        restore_directory.chmod(0o777)
+        staged_database.chmod(0o666)
+        BackupOperations.validate_database(staged_database)
+
+        run_migrator(
+            self.migrator_image,
+            restore_directory,
+            self.get_migration_environment(),
+            runner=self.runner,
+        )
+        BackupOperations.validate_database(staged_database, ValidationLevel.QUICK)
+
+    def install_database(self, staged_database: Path) -> None:
+        """Replace the debug database, keeping the previous one as a rollback."""
+
+        rollback_path: Path | None = None
+        if self.paths.debug_database.is_file():
+            rollback_path = self.get_rollback_path(self.paths.debug_data)
+            try:
+                clone_file(self.paths.debug_database, rollback_path)
+            except Exception:
+                rollback_path.unlink(missing_ok=True)
+                raise
+
+        os.replace(staged_database, self.paths.debug_database)
+        self.paths.debug_database.chmod(0o666)
+        if rollback_path is not None:
+            print(f"Previous debug database preserved at {rollback_path}")
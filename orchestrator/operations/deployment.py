@@ -4,11 +4,16 @@ from __future__ import annotations
 
 import os
 import shutil
+import sys
 import tempfile
-from datetime import UTC, datetime
 from pathlib import Path
 
+from ..core.clone import clone_file, clone_tree
+from ..core.docker import Docker, docker_client
+from ..core.image_pull import pull_images
 from ..core.runner import Runner
+from ..core.timeline import span
+from .archive import ARCHIVE_DIRECTORY_NAME, ArchiveStore, RetentionPolicy
 from .configuration import Configuration
 from .instance import resolve_instance_path
 from .migrator import run_migrator
@@ -37,12 +42,16 @@ def prepare_database_directory(instance_path: Path) -> None:
     os.chmod(database_path, 0o666)
 
 
+@span("migrate database", "deploy")
 def apply_migrations(
     configuration: Configuration,
     bootstrap_admin_email: str | None = None,
     runner: Runner | None = None,
-) -> None:
-    """Apply migrations in a disposable copy, then atomically replace the database."""
+) -> Path:
+    """Apply migrations in a disposable copy, then atomically replace the database.
+
+    Return the replaced database, staged in the archive's pending directory.
+    """
 
     database_file_path = Path(configuration.get_database_file_path())
     upgrade_directory = Path(
@@ -50,7 +59,7 @@ def apply_migrations(
     )
     os.chmod(upgrade_directory, 0o777)
     upgrade_database_file_path = upgrade_directory / DATABASE_FILE_NAME
-    shutil.copy(database_file_path, upgrade_database_file_path)
+    clone_file(database_file_path, upgrade_database_file_path)
     os.chmod(upgrade_database_file_path, 0o666)
     try:
         environment = (
@@ -71,15 +80,13 @@ def apply_migrations(
         shutil.rmtree(upgrade_directory)
         raise
 
-    archive_directory = Path(configuration.path) / "archive"
-    archive_directory.mkdir(parents=True, exist_ok=True)
-    archive_timestamp = datetime.now(UTC).strftime("%Y%m%dT%H%M%SZ")
-    shutil.copy2(
-        database_file_path,
-        archive_directory / f"database-{archive_timestamp}.db",
+    # Compression waits until the new release is healthy.
+    staged = ArchiveStore(Path(configuration.path) / ARCHIVE_DIRECTORY_NAME).stage(
+        database_file_path
     )
     os.replace(upgrade_database_file_path, database_file_path)
     shutil.rmtree(upgrade_directory)
+    return staged
 
 
 def validate_deploy_request(instance_path: str, release_manifest: str) -> None:
@@ -139,7 +146,7 @@ def deploy_release(
     instance_path.mkdir(mode=0o750)
     try:
         (instance_path / "logs").mkdir(mode=0o777)
-        (instance_path / "archive").mkdir(mode=0o750)
+        (instance_path / ARCHIVE_DIRECTORY_NAME).mkdir(mode=0o750)
         prepare_database_directory(instance_path)
         deployment.validate_release(configuration, manifest_path.parent)
         deployment.pull_images(configuration)
@@ -150,6 +157,7 @@ def deploy_release(
         deployment.stop_instance(throw_on_error=False)
         shutil.rmtree(instance_path)
         raise
+    deployment.archive_database_copies()
 
 
 def rollback_release(instance_path_value: str, runner: Runner | None = None) -> None:
@@ -166,11 +174,17 @@ def rollback_release(instance_path_value: str, runner: Runner | None = None) ->
 class TransactionalDeployment:
     """Coordinate image preparation, migration, health verification, and recovery."""
 
-    def __init__(self, instance_path: Path, runner: Runner | None = None) -> None:
+    def __init__(
+        self,
+        instance_path: Path,
+        runner: Runner | None = None,
+        docker: Docker | None = None,
+    ) -> None:
         self.instance_path = instance_path
         self.recovery_path = instance_path / RECOVERY_DIRECTORY_NAME
         self.staging_recovery_path = instance_path / STAGING_RECOVERY_DIRECTORY_NAME
         self.runner = runner or Runner()
+        self.docker = docker or docker_client(self.runner)
 
     def deploy(
         self,
@@ -184,6 +198,7 @@ class TransactionalDeployment:
         self.pull_images(configuration)
         stopped = False
         recovery_created = False
+        staged: Path | None = None
         try:
             self.stop_instance()
             stopped = True
@@ -191,7 +206,7 @@ class TransactionalDeployment:
             recovery_created = True
             self.install_release_files(configuration, release_manifest_path)
             prepare_database_directory(self.instance_path)
-            apply_migrations(configuration, bootstrap_admin_email, self.runner)
+            staged = apply_migrations(configuration, bootstrap_admin_email, self.runner)
             self.start_instance()
             self.promote_recovery_point()
         except Exception as deployment_error:
@@ -199,6 +214,9 @@ class TransactionalDeployment:
                 self.stop_instance(throw_on_error=False)
                 if recovery_created:
                     self.restore_recovery_point(self.staging_recovery_path)
+                # The restored database was never replaced, so it is not archived.
+                if staged is not None:
+                    staged.unlink(missing_ok=True)
                 try:
                     self.start_instance()
                 except Exception as rollback_error:
@@ -210,6 +228,7 @@ class TransactionalDeployment:
             raise RuntimeError(
                 "Deployment failed; the previous release was restored"
             ) from deployment_error
+        self.archive_database_copies()
 
     def rollback(self) -> None:
         self.ensure_no_incomplete_transaction()
@@ -249,19 +268,18 @@ class TransactionalDeployment:
                 f"Incomplete deployment recovery point exists at {self.staging_recovery_path}; inspect it before retrying"
             )
 
+    @span("pull images", "deploy")
     def pull_images(self, configuration: Configuration) -> None:
-        for image in self._images(configuration):
-            self.runner.run(["docker", "pull", image])
+        pull_images(self.docker, self._images(configuration), self.runner.output)
 
+    @span("ensure images", "deploy")
     def ensure_images(self, configuration: Configuration) -> None:
-        for image in self._images(configuration):
-            result = self.runner.run(
-                ["docker", "image", "inspect", image],
-                check=False,
-                capture_output=True,
-            )
-            if result.returncode != 0:
-                self.runner.run(["docker", "pull", image])
+        pull_images(
+            self.docker,
+            self._images(configuration),
+            self.runner.output,
+            refresh_tags=False,
+        )
 
     @staticmethod
     def _images(configuration: Configuration) -> tuple[str, str, str]:
@@ -298,6 +316,7 @@ class TransactionalDeployment:
         finally:
             environment_file_path.unlink(missing_ok=True)
 
+    @span("create recovery point", "deploy")
     def create_recovery_point(self, destination: Path) -> None:
         destination.mkdir(mode=0o700)
         try:
@@ -309,9 +328,7 @@ class TransactionalDeployment:
                     shutil.copy2(source, destination / file_name)
             database_directory = self.instance_path / DATABASE_DIRECTORY_NAME
             if database_directory.exists():
-                shutil.copytree(
-                    database_directory, destination / DATABASE_DIRECTORY_NAME
-                )
+                clone_tree(database_directory, destination / DATABASE_DIRECTORY_NAME)
         except Exception:
             shutil.rmtree(destination)
             raise
@@ -329,6 +346,7 @@ class TransactionalDeployment:
         )
         configuration.write_to_file()
 
+    @span("restore recovery point", "deploy")
     def restore_recovery_point(self, source: Path) -> None:
         for file_name in RECOVERY_FILE_NAMES + OPTIONAL_RECOVERY_FILE_NAMES:
             recovery_file = source / file_name
@@ -342,18 +360,42 @@ class TransactionalDeployment:
         if instance_database_directory.exists():
             shutil.rmtree(instance_database_directory)
         if recovery_database_directory.exists():
-            shutil.copytree(recovery_database_directory, instance_database_directory)
+            clone_tree(recovery_database_directory, instance_database_directory)
 
     def promote_recovery_point(self) -> None:
         if self.recovery_path.exists():
             shutil.rmtree(self.recovery_path)
         os.replace(self.staging_recovery_path, self.recovery_path)
 
+    @span("archive database copies", "deploy")
+    def archive_database_copies(self) -> None:
+        """Compress replaced databases and prune old archives.
+
+        The new release is already healthy, so a failure here only warns.
+        """
+
+        store = ArchiveStore(self.instance_path / ARCHIVE_DIRECTORY_NAME)
+        try:
+            archived = store.archive_pending()
+            removed = store.prune(RetentionPolicy())
+        except Exception as error:
+            print(
+                f"warning: could not archive replaced databases: {error}",
+                file=sys.stderr,
+            )
+            return
+        for archive in archived:
+            print(f"Archived the replaced database as {archive.path.name}")
+        if removed:
+            print(f"Pruned {len(removed)} archived databases")
+
+    @span("stop instance", "deploy")
     def stop_instance(self, throw_on_error: bool = True) -> None:
         result = self.runner.run(self.compose_command("down"), check=False)
         if throw_on_error and result.returncode != 0:
             raise RuntimeError("The running instance could not be stopped")
 
+    @span("start instance", "deploy")
     def start_instance(self) -> None:
         self.runner.run(
             self.compose_command("up", "--detach", "--wait", "--wait-timeout", "120"),
@@ -1,10 +1,38 @@
-"""Run the hardened database migrator container."""
+"""Run the hardened database migrator container.
+
+The migrator image lists its EF migration IDs in an image label written at
+build time. A database that already records every one of them, and already
+holds the users and invitation the environment asks the migrator to seed, is
+reported up to date without starting a container. So is a database left
+unchanged since the same local image last ran on it with the same environment.
+"""
 
 from __future__ import annotations
 
+import hashlib
+import json
+import re
+import sqlite3
 from pathlib import Path
 
+from ..core.docker import ContainerSpec, Docker, docker_client
 from ..core.runner import Runner
+from .backup_state import read_state, write_state
+
+MIGRATIONS_LABEL = "org.financial-tracker.migrations"
+MIGRATOR_STATE_FILE_NAME = ".migrator-state.json"
+MIGRATION_ATTRIBUTE = re.compile(r'\[Migration\("([^"]+)"\)\]')
+SEEDED_USERS_QUERY = """
+SELECT COUNT(DISTINCT "GoogleSubject") FROM "Users"
+WHERE "GoogleSubject" IN ({placeholders}) AND "Status" <> 'Disabled'
+"""
+BOOTSTRAP_QUERY = """
+SELECT EXISTS (SELECT 1 FROM "Users" WHERE "Role" = 'Admin' AND "Status" = 'Active')
+    OR EXISTS (
+        SELECT 1 FROM "UserInvitations"
+        WHERE "NormalizedEmail" = ? AND "Status" = 'Pending'
+    )
+"""
 
 
 def run_migrator(
@@ -12,30 +40,154 @@ def run_migrator(
     data_directory: Path,
     environment: dict[str, str] | None = None,
     runner: Runner | None = None,
+    docker: Docker | None = None,
 ) -> None:
     """Run a migrator image against ``database.db`` in ``data_directory``."""
 
-    environment_arguments: list[str] = []
-    for name, value in (environment or {}).items():
-        environment_arguments.extend(["--env", f"{name}={value}"])
-
-    (runner or Runner()).run(
-        [
-            "docker",
-            "run",
-            "--rm",
-            "--read-only",
-            "--tmpfs",
-            "/tmp",
-            "--cap-drop",
-            "ALL",
-            "--security-opt",
-            "no-new-privileges:true",
-            "--volume",
-            f"{data_directory.resolve()}:/data",
-            "--env",
-            "DATABASE_PATH=/data/database.db",
-            *environment_arguments,
+    environment = environment or {}
+    database = data_directory / "database.db"
+    client = docker or docker_client(runner)
+    fingerprint = run_fingerprint(client, image, environment, database)
+    state_path = data_directory / MIGRATOR_STATE_FILE_NAME
+    if fingerprint is not None and read_state(state_path).get("run") == fingerprint:
+        print("The database is unchanged since the same migrator run; skipped it")
+        return
+    if migrations_current(client, image, database) and seeds_present(
+        database, environment
+    ):
+        print("The database is already up to date; skipped the migrator")
+        return
+
+    client.run(
+        ContainerSpec(
             image,
-        ],
+            environment={"DATABASE_PATH": "/data/database.db", **environment},
+            volumes=((data_directory.resolve(), "/data"),),
+        )
+    )
+    fingerprint = run_fingerprint(client, image, environment, database)
+    if fingerprint is not None:
+        write_state(state_path, {"run": fingerprint})
+
+
+def source_migrations(directory: Path) -> list[str]:
+    """Return the migration IDs declared by the EF designer files, in order."""
+
+    return sorted(
+        match.group(1)
+        for path in directory.glob("*.Designer.cs")
+        for match in MIGRATION_ATTRIBUTE.finditer(path.read_text(encoding="utf-8"))
     )
+
+
+def seeded_subjects(environment: dict[str, str]) -> list[str]:
+    """Return the development user subjects the migrator ensures exist."""
+
+    if environment.get("AUTH_MODE", "").lower() != "development":
+        return []
+    subject = environment.get("DEVELOPMENT_AUTH_SUBJECT", "")
+    if not subject.strip():
+        return []
+    default = "local-standard,local-read-only" if subject == "local-developer" else ""
+    additional = environment.get("DEVELOPMENT_AUTH_ADDITIONAL_SUBJECTS", default)
+    return [subject] + [
+        value for value in map(str.strip, additional.split(",")) if value
+    ]
+
+
+def seeds_present(database: Path, environment: dict[str, str]) -> bool:
+    """Return whether the migrator's seeding would leave ``database`` as it is.
+
+    The migrator keeps existing development users unchanged and creates no
+    bootstrap invitation once an active administrator or a pending invitation
+    for the same address exists. A disabled development user makes it fail,
+    so that case still runs the container to report the error.
+    """
+
+    subjects = seeded_subjects(environment)
+    email = environment.get("BOOTSTRAP_ADMIN_EMAIL", "").strip().lower()
+    if not subjects and not email:
+        return True
+    connection = sqlite3.connect(f"file:{database}?mode=ro", uri=True)
+    try:
+        if subjects:
+            placeholders = ",".join("?" * len(subjects))
+            (count,) = connection.execute(
+                SEEDED_USERS_QUERY.format(placeholders=placeholders), subjects
+            ).fetchone()
+            if count != len(set(subjects)):
+                return False
+        if email:
+            (present,) = connection.execute(BOOTSTRAP_QUERY, (email,)).fetchone()
+            return bool(present)
+        return True
+    except sqlite3.OperationalError:
+        return False
+    finally:
+        connection.close()
+
+
+def applied_migrations(database: Path) -> set[str] | None:
+    """Read the applied migration IDs, or ``None`` if there is no database."""
+
+    if not database.is_file():
+        return None
+    connection = sqlite3.connect(f"file:{database}?mode=ro", uri=True)
+    try:
+        return {
+            migration
+            for (migration,) in connection.execute(
+                'SELECT "MigrationId" FROM "__EFMigrationsHistory"'
+            )
+        }
+    except sqlite3.OperationalError:
+        return set()
+    finally:
+        connection.close()
+
+
+def declared_migrations(docker: Docker, image: str) -> set[str] | None:
+    """Read the migration IDs an image declares, or ``None`` if it lists none."""
+
+    labels = docker.image_labels(image)
+    if labels is None:
+        return None
+    declared = {
+        migration.strip()
+        for migration in labels.get(MIGRATIONS_LABEL, "").split(",")
+        if migration.strip()
+    }
+    return declared or None
+
+
+def migrations_current(docker: Docker, image: str, database: Path) -> bool:
+    applied = applied_migrations(database)
+    if not applied:
+        return False
+    declared = declared_migrations(docker, image)
+    return declared is not None and declared <= applied
+
+
+def run_fingerprint(
+    docker: Docker, image: str, environment: dict[str, str], database: Path
+) -> str | None:
+    """Identify a migrator run by its local image ID, environment, and database.
+
+    A tag can be rebuilt in place, so the ID of the local image is used rather
+    than the reference. Without one the run is not fingerprinted.
+    """
+
+    files = []
+    for path in (database, database.with_name(f"{database.name}-wal")):
+        try:
+            status = path.stat()
+        except FileNotFoundError:
+            continue
+        files.append([path.name, status.st_size, status.st_mtime_ns, status.st_ino])
+    if not files or files[0][0] != database.name:
+        return None
+    image_id = docker.image_id(image)
+    if image_id is None:
+        return None
+    value = json.dumps([image_id, sorted(environment.items()), files], sort_keys=True)
+    return hashlib.sha256(value.encode()).hexdigest()
@@ -2,8 +2,15 @@
 
 from __future__ import annotations
 
+import json
 import os
+import re
+import subprocess
+import time
+from dataclasses import dataclass
+from datetime import UTC, datetime
 from pathlib import Path
+from typing import Any, BinaryIO
 
 from ..core.paths import RepoPaths
 from ..core.runner import Runner
@@ -28,13 +35,135 @@ def run_restic(
     *,
     image: str | None = None,
     runner: Runner | None = None,
-) -> None:
+    stdin: BinaryIO | None = None,
+    capture_output: bool = False,
+) -> subprocess.CompletedProcess[str]:
     """Runs Restic in a restricted container with explicitly mounted paths.
 
     A supplied password is placed in the Docker process environment rather than
     in the command arguments, keeping it out of shell history and process argv.
+    An open ``stdin`` file is attached to the container's standard input.
     """
 
+    options, docker_environment = _container_options(
+        repository, volumes, password, pass_aws_credentials
+    )
+    if stdin is not None:
+        options.append("--interactive")
+    selected_image = image or _default_restic_image()
+    return (runner or Runner()).run(
+        ["docker", "run", "--rm", *options, selected_image, *arguments],
+        env=docker_environment,
+        stdin=stdin,
+        capture_output=capture_output,
+    )
+
+
+@dataclass(frozen=True)
+class ResticResult:
+    arguments: tuple[str, ...]
+    returncode: int
+    seconds: float
+
+
+class ResticSession:
+    """Run a sequence of Restic commands in one hardened container.
+
+    The container gets the same mounts, credentials, and restrictions as
+    ``run_restic`` and idles until each command is executed in it, so the
+    repository index cached in its ``/tmp`` is loaded once per session rather
+    than once per command. Every command's exit status and duration is kept in
+    ``results``.
+    """
+
+    def __init__(
+        self,
+        repository: str | Path | None = None,
+        volumes: tuple[tuple[Path, str, bool], ...] = (),
+        password: str | None = None,
+        pass_aws_credentials: bool = True,
+        *,
+        image: str | None = None,
+        runner: Runner | None = None,
+    ) -> None:
+        self.volumes = volumes
+        self.options, self.environment = _container_options(
+            repository, volumes, password, pass_aws_credentials
+        )
+        self.image = image or _default_restic_image()
+        self.runner = runner or Runner()
+        self.container: str | None = None
+        self.results: list[ResticResult] = []
+
+    def __enter__(self) -> ResticSession:
+        started = self.runner.run(
+            [
+                "docker",
+                "run",
+                "--detach",
+                "--rm",
+                *self.options,
+                "--entrypoint",
+                "sleep",
+                self.image,
+                # Longer than any session; the container is removed on exit.
+                "86400",
+            ],
+            env=self.environment,
+            capture_output=True,
+        )
+        self.container = started.stdout.strip()
+        return self
+
+    def __exit__(self, *_exception: object) -> None:
+        if self.container is not None:
+            self.runner.run(
+                ["docker", "container", "rm", "--force", self.container],
+                check=False,
+                capture_output=True,
+            )
+            self.container = None
+
+    def run(
+        self,
+        arguments: list[str],
+        *,
+        stdin: BinaryIO | None = None,
+        capture_output: bool = False,
+    ) -> subprocess.CompletedProcess[str]:
+        """Run one Restic command in the session container."""
+
+        if self.container is None:
+            raise RuntimeError("The Restic session has not been started")
+        interactive = ["--interactive"] if stdin is not None else []
+        started = time.monotonic()
+        result = self.runner.run(
+            ["docker", "exec", *interactive, self.container, "restic", *arguments],
+            check=False,
+            stdin=stdin,
+            capture_output=capture_output,
+        )
+        self.results.append(
+            ResticResult(
+                tuple(arguments), result.returncode, time.monotonic() - started
+            )
+        )
+        if result.returncode != 0:
+            raise subprocess.CalledProcessError(
+                result.returncode,
+                ["restic", *arguments],
+                result.stdout,
+                result.stderr,
+            )
+        return result
+
+
+def _container_options(
+    repository: str | Path | None,
+    volumes: tuple[tuple[Path, str, bool], ...],
+    password: str | None,
+    pass_aws_credentials: bool,
+) -> tuple[list[str], dict[str, str]]:
     repository_value = (
         str(repository)
         if repository is not None
@@ -43,10 +172,7 @@ def run_restic(
     if repository_value == "":
         raise ValueError("A Restic repository must be configured")
 
-    command = [
-        "docker",
-        "run",
-        "--rm",
+    options = [
         "--read-only",
         "--user",
         f"{os.getuid()}:{os.getgid()}",
@@ -60,10 +186,10 @@ def run_restic(
         "HOME=/tmp",
     ]
     if repository_value.startswith("/"):
-        command.extend(["--volume", f"{Path(repository_value).resolve()}:/repository"])
-        command.extend(["--env", "RESTIC_REPOSITORY=/repository"])
+        options.extend(["--volume", f"{Path(repository_value).resolve()}:/repository"])
+        options.extend(["--env", "RESTIC_REPOSITORY=/repository"])
     else:
-        command.extend(["--env", "RESTIC_REPOSITORY"])
+        options.extend(["--env", "RESTIC_REPOSITORY"])
 
     docker_environment: dict[str, str] = {}
     for name in RESTIC_ENVIRONMENT_VARIABLES:
@@ -73,18 +199,86 @@ def run_restic(
             continue
         if name == "RESTIC_PASSWORD" and password is not None:
             docker_environment[name] = password
-            command.extend(["--env", name])
+            options.extend(["--env", name])
         elif os.environ.get(name, "") != "":
-            command.extend(["--env", name])
+            options.extend(["--env", name])
     for source, destination, read_only in volumes:
         mode = ":ro" if read_only else ""
-        command.extend(["--volume", f"{source.resolve()}:{destination}{mode}"])
+        options.extend(["--volume", f"{source.resolve()}:{destination}{mode}"])
+    return options, docker_environment
 
-    selected_image = image or _default_restic_image()
-    (runner or Runner()).run(
-        [*command, selected_image, *arguments],
-        env=docker_environment,
-    )
+
+@dataclass(frozen=True)
+class Snapshot:
+    """One Restic snapshot as listed by ``restic snapshots --json``."""
+
+    id: str
+    short_id: str
+    time: datetime
+    tree: str
+    hostname: str = ""
+    tags: tuple[str, ...] = ()
+
+
+def parse_snapshots(output: str) -> list[Snapshot]:
+    """Parse ``restic snapshots --json`` output, oldest snapshot first."""
+
+    snapshots = [
+        Snapshot(
+            id=entry["id"],
+            short_id=entry.get("short_id", entry["id"][:8]),
+            time=parse_restic_time(entry["time"]),
+            tree=entry.get("tree", ""),
+            hostname=entry.get("hostname", ""),
+            tags=tuple(entry.get("tags") or ()),
+        )
+        for entry in json.loads(output or "[]")
+    ]
+    return sorted(snapshots, key=lambda snapshot: snapshot.time)
+
+
+def parse_backup_summary(output: str) -> dict[str, Any]:
+    """Return the summary message of ``restic backup --json`` output."""
+
+    for line in reversed((output or "").splitlines()):
+        try:
+            message = json.loads(line)
+        except ValueError:
+            continue
+        if isinstance(message, dict) and message.get("message_type") == "summary":
+            return message
+    raise RuntimeError("Restic backup did not report a summary")
+
+
+def parse_pack_sizes(output: str) -> dict[str, int]:
+    """Return the size of each pack in ``restic cat index`` output.
+
+    A pack's size is taken as the end of its last blob, which leaves out only
+    the small encrypted header that follows the blobs.
+    """
+
+    return {
+        pack["id"]: max(
+            (blob["offset"] + blob["length"] for blob in pack.get("blobs") or ()),
+            default=0,
+        )
+        for pack in json.loads(output or "{}").get("packs") or ()
+    }
+
+
+def in_data_subset(pack: str, subset: int, subsets: int) -> bool:
+    """Return whether ``restic check --read-data-subset`` reads ``pack``."""
+
+    # Restic assigns a pack to a subset by the first byte of its ID.
+    return int(pack[:2], 16) % subsets == subset - 1
+
+
+def parse_restic_time(value: str) -> datetime:
+    """Parse a Restic timestamp, which carries nanoseconds, as an aware datetime."""
+
+    value = re.sub(r"(\.\d{6})\d+", r"\1", value).replace("Z", "+00:00")
+    parsed = datetime.fromisoformat(value)
+    return parsed if parsed.tzinfo is not None else parsed.replace(tzinfo=UTC)
 
 
 def _default_restic_image() -> str:
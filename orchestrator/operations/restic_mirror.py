@@ -0,0 +1,120 @@
+"""Persistent local mirror of an S3 Restic repository.
+
+Restic names every repository file after the hash of its content, so a file
+that exists locally with the right size never needs fetching again. Syncing
+therefore compares sizes only, and an existing mirror downloads just the packs,
+indexes, and snapshots written since the last restore. A partial mirror holds
+the metadata plus only the packs one snapshot needs.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from collections.abc import Callable, Iterable
+from pathlib import Path
+
+from .restic import Snapshot
+
+SYNC_BATCH_SIZE = 200
+
+AwsCommand = Callable[[list[str]], object]
+ResticOutput = Callable[[list[str]], str]
+
+
+def default_mirror_root() -> Path:
+    cache = os.environ.get("XDG_CACHE_HOME", "").strip() or "~/.cache"
+    return Path(cache).expanduser() / "financial-tracker" / "restic"
+
+
+class ResticMirror:
+    """A local copy of one S3 repository, reused across restores."""
+
+    def __init__(self, source: str, root: Path, aws: AwsCommand) -> None:
+        self.source = source.rstrip("/")
+        self.directory = root / hashlib.sha256(self.source.encode()).hexdigest()[:16]
+        self.aws = aws
+
+    def sync(self, include_data: bool = True) -> None:
+        """Fetch new repository files and drop those the repository pruned.
+
+        Without ``include_data`` only the metadata is synced and existing
+        packs are left in place.
+        """
+
+        self.directory.mkdir(mode=0o700, parents=True, exist_ok=True)
+        arguments = [
+            "s3",
+            "sync",
+            self.source,
+            str(self.directory),
+            "--size-only",
+            "--delete",
+            "--exclude",
+            "locks/*",
+        ]
+        if not include_data:
+            arguments.extend(["--exclude", "data/*"])
+        self.aws(arguments)
+        if not (self.directory / "config").is_file():
+            raise RuntimeError(
+                "The S3 source did not contain a complete Restic repository"
+            )
+
+    def pack_path(self, pack: str) -> Path:
+        return self.directory / "data" / pack[:2] / pack
+
+    def fetch_packs(self, packs: Iterable[str]) -> int:
+        """Download the packs that are not mirrored yet and return how many."""
+
+        missing = sorted(
+            pack for pack in set(packs) if not self.pack_path(pack).is_file()
+        )
+        for start in range(0, len(missing), SYNC_BATCH_SIZE):
+            arguments = [
+                "s3",
+                "sync",
+                f"{self.source}/data",
+                str(self.directory / "data"),
+                "--size-only",
+                "--exclude",
+                "*",
+            ]
+            for pack in missing[start : start + SYNC_BATCH_SIZE]:
+                arguments.extend(["--include", f"{pack[:2]}/{pack}"])
+            self.aws(arguments)
+        absent = [pack for pack in missing if not self.pack_path(pack).is_file()]
+        if absent:
+            raise RuntimeError(f"The S3 source is missing pack {absent[0]}")
+        return len(missing)
+
+    def fetch_snapshot(self, restic: ResticOutput, snapshot: Snapshot) -> int:
+        """Download the packs ``snapshot`` needs, reading the synced indexes.
+
+        Tree packs are fetched first so the snapshot's directory trees can be
+        walked for the data blobs they reference.
+        """
+
+        blob_packs: dict[str, str] = {}
+        tree_packs: set[str] = set()
+        for index in restic(["list", "index"]).split():
+            for pack in json.loads(restic(["cat", "index", index])).get("packs", []):
+                for blob in pack.get("blobs", []):
+                    blob_packs[blob["id"]] = pack["id"]
+                    if blob["type"] == "tree":
+                        tree_packs.add(pack["id"])
+        fetched = self.fetch_packs(tree_packs)
+
+        data_packs: set[str] = set()
+        pending = [snapshot.tree]
+        while pending:
+            tree = json.loads(restic(["cat", "blob", pending.pop()]))
+            for node in tree.get("nodes", []):
+                if node.get("subtree"):
+                    pending.append(node["subtree"])
+                for blob in node.get("content") or []:
+                    if blob not in blob_packs:
+                        raise RuntimeError(f"No index lists data blob {blob}")
+                    data_packs.add(blob_packs[blob])
+        return fetched + self.fetch_packs(data_packs)
@@ -0,0 +1,152 @@
+"""Online SQLite snapshots that yield to the live application's writers.
+
+The source is copied a few pages per step. SQLite releases the read lock
+between steps, and the snapshot pauses there so writers can commit. While the
+source reports busy or locked, the pause backs off exponentially. Once steps
+succeed again it decays back to the configured sleep.
+
+A write from another connection makes SQLite restart the copy from the first
+page. After a few restarts the snapshot starts over with eight times as many
+pages per step, and finally copies everything in one step, which holds the read
+lock throughout and cannot be restarted.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from pathlib import Path
+
+SNAPSHOT_PAGES = 1024
+SNAPSHOT_SLEEP_SECONDS = 0.005
+BUSY_SLEEP_SECONDS = 0.05
+MAXIMUM_SLEEP_SECONDS = 1.0
+SNAPSHOT_RESTARTS = 3
+PAGES_GROWTH = 8
+SNAPSHOT_ATTEMPTS = 4
+
+
+@dataclass(frozen=True)
+class SnapshotProgress:
+    """Progress reported after each snapshot step."""
+
+    copied: int
+    total: int
+    elapsed: float
+    busy: bool = False
+    restarts: int = 0
+
+    @property
+    def pages_per_second(self) -> float:
+        return self.copied / self.elapsed if self.elapsed > 0 else 0.0
+
+
+SnapshotCallback = Callable[[SnapshotProgress], None]
+
+
+class _Restarted(Exception):
+    pass
+
+
+class _Pacer:
+    def __init__(
+        self,
+        sleep: float,
+        progress: SnapshotCallback | None,
+        restart_limit: int | None = None,
+    ) -> None:
+        self.sleep = sleep
+        self.pause = sleep
+        self.progress = progress
+        self.restart_limit = restart_limit
+        self.restarts = 0
+        self.started = time.monotonic()
+        self.last = SnapshotProgress(0, 0, 0.0)
+        self.remaining: int | None = None
+
+    def attempt(self) -> None:
+        """Start counting steps for a new backup of the same snapshot."""
+
+        self.remaining = None
+        if self.restart_limit is not None:
+            self.restart_limit = self.restarts + SNAPSHOT_RESTARTS
+
+    def __call__(self, status: int, remaining: int, total: int) -> None:
+        busy = status in (sqlite3.SQLITE_BUSY, sqlite3.SQLITE_LOCKED)
+        # Only a restart from the first page stops a successful step from
+        # reducing the remaining count.
+        if not busy and self.remaining is not None and remaining >= self.remaining:
+            self.restarts += 1
+            if self.restart_limit is not None and self.restarts > self.restart_limit:
+                raise _Restarted
+        self.remaining = remaining
+        if busy:
+            self.pause = min(
+                max(self.pause * 2, BUSY_SLEEP_SECONDS), MAXIMUM_SLEEP_SECONDS
+            )
+        else:
+            self.pause = max(self.pause / 2, self.sleep)
+        self.last = SnapshotProgress(
+            total - remaining,
+            total,
+            time.monotonic() - self.started,
+            busy,
+            self.restarts,
+        )
+        if self.progress is not None:
+            self.progress(self.last)
+        if remaining and self.pause > 0:
+            time.sleep(self.pause)
+
+
+def create_snapshot(
+    source: Path,
+    destination: Path,
+    pages: int = SNAPSHOT_PAGES,
+    sleep: float = SNAPSHOT_SLEEP_SECONDS,
+    progress: SnapshotCallback | None = None,
+) -> SnapshotProgress:
+    """Copy ``source`` to ``destination`` ``pages`` at a time and return the totals.
+
+    ``sleep`` is the pause between steps while the source is idle. Pass
+    ``pages=-1`` to copy the whole database in one step. Progress reports
+    count restarts, after which ``copied`` starts again from zero.
+    """
+
+    if pages == 0 or pages < -1:
+        raise ValueError("Snapshot pages must be positive, or -1 for a single step")
+    if sleep < 0:
+        raise ValueError("Snapshot sleep must not be negative")
+    pacer = _Pacer(sleep, progress, SNAPSHOT_RESTARTS)
+    for attempt in range(SNAPSHOT_ATTEMPTS):
+        if attempt == SNAPSHOT_ATTEMPTS - 1:
+            pages = -1
+        pacer.attempt()
+        source_connection = sqlite3.connect(f"file:{source}?mode=ro", uri=True)
+        destination_connection = sqlite3.connect(destination)
+        try:
+            # The pacer does all the waiting, including after busy steps.
+            source_connection.backup(
+                destination_connection, pages=pages, progress=pacer, sleep=0
+            )
+        except _Restarted:
+            if pages == -1 or pages * PAGES_GROWTH >= pacer.last.total:
+                pages = -1
+            else:
+                pages *= PAGES_GROWTH
+            continue
+        finally:
+            destination_connection.close()
+            source_connection.close()
+        return SnapshotProgress(
+            pacer.last.total,
+            pacer.last.total,
+            time.monotonic() - pacer.started,
+            restarts=pacer.restarts,
+        )
+    raise RuntimeError(
+        f"The snapshot of {source} restarted {pacer.restarts} times"
+        " under concurrent writes; retry when the database is quieter"
+    )
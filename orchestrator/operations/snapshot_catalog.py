@@ -0,0 +1,109 @@
+"""Local catalog of the snapshots in a Restic repository.
+
+Refreshing lists only snapshot IDs, which Restic reads without decrypting
+anything. Only snapshots missing from the catalog are fetched in full, so
+lookups by time or ID are answered from the local file.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Callable
+from datetime import datetime
+from pathlib import Path
+
+from .backup_state import read_state, write_state
+from .restic import Snapshot, parse_restic_time, parse_snapshots
+
+CATALOG_FORMAT = 1
+
+ResticOutput = Callable[[list[str]], str]
+
+
+class SnapshotCatalog:
+    def __init__(self, path: Path) -> None:
+        self.path = path
+
+    def snapshots(self, tag: str | None = None) -> list[Snapshot]:
+        """Return the cataloged snapshots, oldest first, optionally with a tag."""
+
+        state = read_state(self.path)
+        if state.get("format") != CATALOG_FORMAT:
+            return []
+        snapshots = [
+            Snapshot(
+                id=entry["id"],
+                short_id=entry["short_id"],
+                time=parse_restic_time(entry["time"]),
+                tree=entry["tree"],
+                hostname=entry["hostname"],
+                tags=tuple(entry["tags"]),
+            )
+            for entry in state.get("snapshots", [])
+        ]
+        return [
+            snapshot for snapshot in snapshots if tag is None or tag in snapshot.tags
+        ]
+
+    def refresh(self, restic: ResticOutput) -> list[Snapshot]:
+        """Bring the catalog up to date using ``restic``, which returns stdout."""
+
+        identifiers = restic(["list", "snapshots"]).split()
+        known = {snapshot.id: snapshot for snapshot in self.snapshots()}
+        missing = [identifier for identifier in identifiers if identifier not in known]
+        fetched = (
+            parse_snapshots(restic(["snapshots", "--json", *missing]))
+            if missing
+            else []
+        )
+        current = [
+            known[identifier] for identifier in identifiers if identifier in known
+        ]
+        snapshots = sorted([*current, *fetched], key=lambda snapshot: snapshot.time)
+        write_state(
+            self.path,
+            {
+                "format": CATALOG_FORMAT,
+                "snapshots": [
+                    {
+                        "id": snapshot.id,
+                        "short_id": snapshot.short_id,
+                        "time": snapshot.time.isoformat(),
+                        "tree": snapshot.tree,
+                        "hostname": snapshot.hostname,
+                        "tags": list(snapshot.tags),
+                    }
+                    for snapshot in snapshots
+                ],
+            },
+        )
+        return snapshots
+
+    def find(self, identifier: str) -> Snapshot:
+        """Return the snapshot whose ID starts with ``identifier``."""
+
+        matches = [
+            snapshot
+            for snapshot in self.snapshots()
+            if snapshot.id.startswith(identifier.lower())
+        ]
+        if not matches:
+            raise ValueError(f"No snapshot matches {identifier}")
+        if len(matches) > 1:
+            raise ValueError(f"Snapshot ID {identifier} is ambiguous")
+        return matches[0]
+
+    def latest(self, tag: str | None = None) -> Snapshot:
+        snapshots = self.snapshots(tag)
+        if not snapshots:
+            raise ValueError("The backup repository has no matching snapshots")
+        return snapshots[-1]
+
+    def at(self, moment: datetime, tag: str | None = None) -> Snapshot:
+        """Return the newest snapshot taken at or before ``moment``."""
+
+        earlier = [
+            snapshot for snapshot in self.snapshots(tag) if snapshot.time <= moment
+        ]
+        if not earlier:
+            raise ValueError(f"No snapshot was taken at or before {moment.isoformat()}")
+        return earlier[-1]
@@ -0,0 +1,73 @@
+"""Persistent record of restore verifications for one instance."""
+
+from __future__ import annotations
+
+from dataclasses import asdict, dataclass
+from datetime import UTC, datetime
+from pathlib import Path
+
+from .backup_state import append_history, read_history
+from .restic import Snapshot
+
+PASSED = "passed"
+FAILED = "failed"
+
+
+@dataclass(frozen=True)
+class Verification:
+    snapshot: str
+    tree: str
+    migrator_image: str
+    result: str
+    seconds: float
+    verified_at: str
+
+
+class VerificationLedger:
+    """Append-only JSON lines recording each snapshot verification.
+
+    A snapshot counts as verified once it passed with the same tree and the
+    same migrator image; a new migrator release verifies snapshots again.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+
+    def entries(self) -> list[Verification]:
+        entries = []
+        for entry in read_history(self.path):
+            try:
+                entries.append(Verification(**entry))
+            except TypeError:
+                continue
+        return entries
+
+    def verified(self, migrator_image: str) -> set[tuple[str, str]]:
+        """Return the snapshot and tree IDs that passed with this migrator."""
+
+        digest = image_digest(migrator_image)
+        return {
+            (entry.snapshot, entry.tree)
+            for entry in self.entries()
+            if entry.migrator_image == digest and entry.result == PASSED
+        }
+
+    def record(
+        self, snapshot: Snapshot, migrator_image: str, result: str, seconds: float
+    ) -> None:
+        entry = Verification(
+            snapshot.id,
+            snapshot.tree,
+            image_digest(migrator_image),
+            result,
+            round(seconds, 3),
+            datetime.now(UTC).isoformat(),
+        )
+        append_history(self.path, asdict(entry))
+
+
+def image_digest(image: str) -> str:
+    """Return the content digest of a pinned image reference, or the reference."""
+
+    _, separator, digest = image.partition("@")
+    return digest if separator else image
@@ -0,0 +1,487 @@
+"""Continuous shipping of SQLite write-ahead log frames into a segment store.
+
+A generation starts with a copy of the database file plus every committed frame
+then in the WAL, and continues with one segment per poll holding the frames
+committed since. Replaying a generation's segments up to a point in time
+rebuilds the database as it was then.
+
+The shipper always holds a read transaction on the live database, moving it
+forward by beginning a new one before ending the previous one. While a reader
+holds a WAL read mark SQLite cannot restart the WAL, and a reader on the
+database file alone stops any further checkpointing, so no committed frame can
+be overwritten before it has been shipped. Once the WAL grows past a limit the
+shipper briefly takes the write lock, ships the remaining frames, and
+checkpoints, so that the next writer can start the WAL over.
+
+A poll that fails because the database is busy or the store is briefly
+unwritable is retried with a growing delay; nothing it did is kept, so the
+next poll ships the same frames again.
+"""
+
+from __future__ import annotations
+
+import errno
+import gzip
+import os
+import shutil
+import sqlite3
+import struct
+import sys
+import threading
+import time
+from array import array
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from pathlib import Path
+from uuid import uuid4
+
+from .backup_state import append_history, read_history, read_state, write_state
+
+WAL_HEADER_SIZE = 32
+FRAME_HEADER_SIZE = 24
+WAL_MAGIC_LITTLE_ENDIAN = 0x377F0682
+WAL_MAGIC_BIG_ENDIAN = 0x377F0683
+CHECKSUM_MASK = 0xFFFFFFFF
+POLL_SECONDS = 1.0
+CHECKPOINT_BYTES = 16 * 1024 * 1024
+GENERATION_SECONDS = 6 * 60 * 60
+RETAINED_GENERATIONS = 3
+BUSY_TIMEOUT_SECONDS = 5.0
+MAX_RETRY_SECONDS = 60.0
+TRANSIENT_ERRNOS = frozenset(
+    (
+        errno.EAGAIN,
+        errno.EBUSY,
+        errno.EDQUOT,
+        errno.EINTR,
+        errno.EIO,
+        errno.ENOMEM,
+        errno.ENOSPC,
+        errno.ETIMEDOUT,
+    )
+)
+
+
+@dataclass(frozen=True)
+class WalHeader:
+    page_size: int
+    salt: tuple[int, int]
+    checksum: tuple[int, int]
+    big_endian: bool
+
+
+@dataclass(frozen=True)
+class WalPosition:
+    """The end of the last shipped commit frame and the checksum chain there."""
+
+    salt: tuple[int, int]
+    offset: int
+    checksum: tuple[int, int]
+
+
+def wal_checksum(
+    data: bytes, checksum: tuple[int, int], big_endian: bool
+) -> tuple[int, int]:
+    """Continue SQLite's WAL checksum over ``data``, a multiple of eight bytes."""
+
+    words = array("I", data)
+    if (sys.byteorder == "big") != big_endian:
+        words.byteswap()
+    first, second = checksum
+    iterator = iter(words)
+    for even, odd in zip(iterator, iterator, strict=True):
+        first = (first + even + second) & CHECKSUM_MASK
+        second = (second + odd + first) & CHECKSUM_MASK
+    return first, second
+
+
+def read_wal_header(data: bytes) -> WalHeader | None:
+    """Parse a WAL header, or return ``None`` if the WAL is empty or invalid."""
+
+    if len(data) < WAL_HEADER_SIZE:
+        return None
+    magic, _, page_size, _, salt1, salt2, checksum1, checksum2 = struct.unpack(
+        ">8I", data[:WAL_HEADER_SIZE]
+    )
+    if magic not in (WAL_MAGIC_LITTLE_ENDIAN, WAL_MAGIC_BIG_ENDIAN):
+        return None
+    big_endian = magic == WAL_MAGIC_BIG_ENDIAN
+    if wal_checksum(data[:24], (0, 0), big_endian) != (checksum1, checksum2):
+        return None
+    return WalHeader(page_size, (salt1, salt2), (checksum1, checksum2), big_endian)
+
+
+def committed_end(
+    frames: bytes, header: WalHeader, position: WalPosition
+) -> WalPosition:
+    """Return the position after the last valid commit frame in ``frames``.
+
+    ``frames`` is the WAL content starting at ``position.offset``.
+    """
+
+    frame_size = FRAME_HEADER_SIZE + header.page_size
+    checksum = position.checksum
+    committed = position
+    start = 0
+    while start + frame_size <= len(frames):
+        frame = frames[start : start + frame_size]
+        _, database_pages, salt1, salt2, checksum1, checksum2 = struct.unpack(
+            ">6I", frame[:FRAME_HEADER_SIZE]
+        )
+        if (salt1, salt2) != header.salt:
+            break
+        checksum = wal_checksum(frame[:8], checksum, header.big_endian)
+        checksum = wal_checksum(frame[FRAME_HEADER_SIZE:], checksum, header.big_endian)
+        if checksum != (checksum1, checksum2):
+            break
+        start += frame_size
+        if database_pages:
+            committed = WalPosition(header.salt, position.offset + start, checksum)
+    return committed
+
+
+def apply_frames(database: Path, frames: bytes, page_size: int) -> None:
+    """Write WAL frames into a database file, truncating at each commit."""
+
+    frame_size = FRAME_HEADER_SIZE + page_size
+    with database.open("r+b") as file:
+        for start in range(0, len(frames) - frame_size + 1, frame_size):
+            page_number, database_pages = struct.unpack(
+                ">2I", frames[start : start + 8]
+            )
+            file.seek((page_number - 1) * page_size)
+            file.write(frames[start + FRAME_HEADER_SIZE : start + frame_size])
+            if database_pages:
+                file.truncate(database_pages * page_size)
+
+
+class SegmentStore:
+    """Generations of a base database copy followed by WAL frame segments.
+
+    Each generation is a directory named so that generations sort by age.
+    The next segment index of each generation is kept in memory, so shipping
+    a segment never rereads the generation's growing segment list.
+    """
+
+    def __init__(self, root: Path) -> None:
+        self.root = root
+        self.next_segments: dict[Path, int] = {}
+
+    def generations(self) -> list[Path]:
+        if not self.root.is_dir():
+            return []
+        return sorted(
+            path for path in self.root.iterdir() if (path / "generation.json").is_file()
+        )
+
+    def create_generation(self, database: Path) -> Path:
+        """Start a generation with a compressed copy of ``database``.
+
+        The copy may be torn by a concurrent checkpoint, so the generation is
+        only usable once its first segment is shipped and it is committed.
+        """
+
+        now = datetime.now(UTC)
+        generation = self.root / f"{now:%Y%m%dT%H%M%S%fZ}-{uuid4().hex[:8]}"
+        (generation / "segments").mkdir(mode=0o750, parents=True)
+        with (
+            database.open("rb") as source,
+            gzip.open(generation / "base.db.gz", "wb", compresslevel=1) as target,
+        ):
+            shutil.copyfileobj(source, target, 1024 * 1024)
+        self.next_segments[generation] = 0
+        return generation
+
+    def commit_generation(self, generation: Path, page_size: int) -> None:
+        write_state(
+            generation / "generation.json",
+            {"created_at": datetime.now(UTC).isoformat(), "page_size": page_size},
+        )
+
+    def append_segment(self, generation: Path, frames: bytes) -> None:
+        index = self.next_segments.get(generation)
+        if index is None:
+            index = len(read_history(generation / "segments.jsonl"))
+        name = f"{index:08d}.wal.gz"
+        with gzip.open(generation / "segments" / name, "wb", compresslevel=1) as file:
+            file.write(frames)
+        append_history(
+            generation / "segments.jsonl",
+            {
+                "index": index,
+                "file": name,
+                "bytes": len(frames),
+                "shipped_at": datetime.now(UTC).isoformat(),
+            },
+        )
+        self.next_segments[generation] = index + 1
+
+    def prune(self, keep: int = RETAINED_GENERATIONS) -> None:
+        """Remove all but the newest generations, including abandoned ones."""
+
+        directories = sorted(path for path in self.root.iterdir() if path.is_dir())
+        for generation in directories[:-keep]:
+            shutil.rmtree(generation)
+            self.next_segments.pop(generation, None)
+
+    def restore(self, moment: datetime, target: Path) -> datetime:
+        """Rebuild the database as of ``moment`` and return the time it reflects."""
+
+        candidates = [
+            (generation, read_state(generation / "generation.json"))
+            for generation in self.generations()
+        ]
+        candidates = [
+            (generation, state)
+            for generation, state in candidates
+            if datetime.fromisoformat(state["created_at"]) <= moment
+        ]
+        if not candidates:
+            raise ValueError(
+                f"No streamed generation started at or before {moment.isoformat()}"
+            )
+        generation, state = candidates[-1]
+        with (
+            gzip.open(generation / "base.db.gz", "rb") as source,
+            target.open("wb") as destination,
+        ):
+            shutil.copyfileobj(source, destination, 1024 * 1024)
+        reached = datetime.fromisoformat(state["created_at"])
+        for segment in read_history(generation / "segments.jsonl"):
+            shipped_at = datetime.fromisoformat(segment["shipped_at"])
+            # The first segment completes the base copy and always applies.
+            if shipped_at > moment and segment["index"] > 0:
+                break
+            with gzip.open(generation / "segments" / segment["file"], "rb") as file:
+                apply_frames(target, file.read(), state["page_size"])
+            reached = shipped_at
+        return reached
+
+
+class WalShipper:
+    """Ship committed WAL frames of one live database into a segment store."""
+
+    def __init__(
+        self,
+        database: Path,
+        store: SegmentStore,
+        checkpoint_bytes: int = CHECKPOINT_BYTES,
+        generation_seconds: float = GENERATION_SECONDS,
+    ) -> None:
+        self.database = database
+        self.wal = database.with_name(f"{database.name}-wal")
+        self.store = store
+        self.checkpoint_bytes = checkpoint_bytes
+        self.generation_seconds = generation_seconds
+        self.generation: Path | None = None
+        self.generation_started = 0.0
+        self.position: WalPosition | None = None
+        self.shipped_bytes = 0
+        self.readers = [self._connect(), self._connect()]
+        self.writer = self._connect()
+        self.reading: sqlite3.Connection | None = None
+        mode = self.writer.execute("PRAGMA journal_mode").fetchone()[0]
+        if mode.lower() != "wal":
+            self.close()
+            raise ValueError(f"{database} must use WAL journal mode, not {mode}")
+
+    def close(self) -> None:
+        for connection in (*self.readers, self.writer):
+            connection.close()
+        self.reading = None
+
+    def run(self, stop: threading.Event, interval: float = POLL_SECONDS) -> None:
+        """Ship frames every ``interval`` seconds until ``stop`` is set."""
+
+        failures = 0
+        try:
+            while True:
+                try:
+                    self.ship()
+                except (sqlite3.OperationalError, OSError) as error:
+                    if not transient(error):
+                        raise
+                    failures += 1
+                    delay = min(interval * 2**failures, MAX_RETRY_SECONDS)
+                    print(
+                        f"warning: WAL shipping failed, retrying in {delay:.1f}s:"
+                        f" {error}",
+                        file=sys.stderr,
+                    )
+                else:
+                    failures = 0
+                    delay = interval
+                if stop.wait(delay):
+                    break
+            self.ship()
+        finally:
+            self.close()
+
+    def ship(self) -> int:
+        """Ship the frames committed since the last call and return their bytes."""
+
+        self._advance_reader()
+        expired = time.monotonic() - self.generation_started > self.generation_seconds
+        if self.generation is None or expired:
+            shipped = self._start_generation()
+        else:
+            shipped = self._ship_frames()
+        if self.wal.is_file() and self.wal.stat().st_size > self.checkpoint_bytes:
+            shipped += self._checkpoint()
+        self.shipped_bytes += shipped
+        return shipped
+
+    def _start_generation(self) -> int:
+        header = self._read_header()
+        page_size = (
+            header.page_size
+            if header is not None
+            else self.writer.execute("PRAGMA page_size").fetchone()[0]
+        )
+        self.generation = self.store.create_generation(self.database)
+        self.generation_started = time.monotonic()
+        # Every committed frame still in the WAL may have been checkpointed into
+        # the copy part way, so all of them ship with the base.
+        self.position = (
+            None
+            if header is None
+            else WalPosition(header.salt, WAL_HEADER_SIZE, header.checksum)
+        )
+        try:
+            shipped = self._ship_frames()
+            self.store.commit_generation(self.generation, page_size)
+        except BaseException:
+            # An uncommitted generation is never restored, so start another.
+            self.generation = None
+            raise
+        self.store.prune()
+        return shipped
+
+    def _ship_frames(self) -> int:
+        header = self._read_header()
+        if header is None or self.generation is None:
+            return 0
+        position = self.position
+        if position is None or position.salt != header.salt:
+            # The WAL restarted after every shipped frame was checkpointed.
+            position = WalPosition(header.salt, WAL_HEADER_SIZE, header.checksum)
+        with self.wal.open("rb") as file:
+            file.seek(position.offset)
+            frames = file.read()
+        end = committed_end(frames, header, position)
+        if end.offset == position.offset:
+            self.position = end
+            return 0
+        data = frames[: end.offset - position.offset]
+        self.store.append_segment(self.generation, data)
+        self.position = end
+        return len(data)
+
+    def _checkpoint(self) -> int:
+        # Holding the write lock means nothing commits between shipping the
+        # last frames and checkpointing them.
+        self.writer.execute("BEGIN IMMEDIATE")
+        try:
+            shipped = self._ship_frames()
+            self._end_reader()
+            self.readers[0].execute("PRAGMA wal_checkpoint(PASSIVE)").fetchall()
+            self._advance_reader()
+        finally:
+            self.writer.execute("ROLLBACK")
+        return shipped
+
+    def _advance_reader(self) -> None:
+        previous = self.reading
+        reader = self.readers[1] if previous is self.readers[0] else self.readers[0]
+        reader.execute("BEGIN")
+        try:
+            reader.execute("SELECT count(*) FROM sqlite_master").fetchone()
+        except BaseException:
+            reader.execute("ROLLBACK")
+            raise
+        self.reading = reader
+        if previous is not None:
+            previous.execute("COMMIT")
+
+    def _end_reader(self) -> None:
+        if self.reading is not None:
+            self.reading.execute("COMMIT")
+            self.reading = None
+
+    def _read_header(self) -> WalHeader | None:
+        try:
+            with self.wal.open("rb") as file:
+                return read_wal_header(file.read(WAL_HEADER_SIZE))
+        except FileNotFoundError:
+            return None
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(
+            self.database,
+            timeout=BUSY_TIMEOUT_SECONDS,
+            isolation_level=None,
+            check_same_thread=False,
+        )
+
+
+def transient(error: sqlite3.OperationalError | OSError) -> bool:
+    """Return whether a failed poll may succeed when it is retried."""
+
+    if isinstance(error, sqlite3.OperationalError):
+        return error.sqlite_errorcode & 0xFF in (
+            sqlite3.SQLITE_BUSY,
+            sqlite3.SQLITE_LOCKED,
+        )
+    return error.errno in TRANSIENT_ERRNOS
+
+
+@dataclass(frozen=True)
+class ShippingBenchmark:
+    transactions: int
+    shipped_bytes: int
+    seconds: float
+
+    @property
+    def bytes_per_second(self) -> float:
+        return self.shipped_bytes / self.seconds if self.seconds > 0 else 0.0
+
+
+def benchmark(
+    directory: Path,
+    transactions: int = 2000,
+    row_bytes: int = 512,
+    interval: float = 0.05,
+) -> ShippingBenchmark:
+    """Ship a synthetic write load and check that a restore reproduces it."""
+
+    database = directory / "database.db"
+    connection = sqlite3.connect(database, isolation_level=None)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("CREATE TABLE entries (id INTEGER PRIMARY KEY, value BLOB)")
+    store = SegmentStore(directory / "store")
+    shipper = WalShipper(database, store, checkpoint_bytes=1024 * 1024)
+    stop = threading.Event()
+    thread = threading.Thread(target=shipper.run, args=(stop, interval))
+    started = time.monotonic()
+    thread.start()
+    try:
+        for _ in range(transactions):
+            connection.execute(
+                "INSERT INTO entries (value) VALUES (?)", (os.urandom(row_bytes),)
+            )
+    finally:
+        stop.set()
+        thread.join()
+        connection.close()
+    seconds = time.monotonic() - started
+
+    restored = directory / "restored.db"
+    store.restore(datetime.now(UTC), restored)
+    check = sqlite3.connect(restored)
+    try:
+        (count,) = check.execute("SELECT count(*) FROM entries").fetchone()
+    finally:
+        check.close()
+    if count != transactions:
+        raise RuntimeError(f"Restored {count} of {transactions} streamed transactions")
+    return ShippingBenchmark(transactions, shipper.shipped_bytes, seconds)
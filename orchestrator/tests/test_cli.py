@@ -1,4 +1,11 @@
-from orchestrator.cli import build_parser
+import ast
+import subprocess
+import sys
+from pathlib import Path
+
+from orchestrator.cli import build_parser, main
+from orchestrator.commands.registry import GROUPS
+from orchestrator.core import context
 
 
 def test_cli_registers_leaf_commands():
@@ -17,3 +24,50 @@ def test_cli_registers_leaf_commands():
     assert (
         parser.parse_args(["env", "validate", "--profile", "debug"]).profile == "debug"
     )
+
+
+def test_cli_imports_only_the_selected_command():
+    script = (
+        "import sys\n"
+        "from orchestrator.cli import build_parser\n"
+        "argv = ['env', 'explain', 'PUBLIC_ORIGIN']\n"
+        "assert build_parser(argv).parse_args(argv).name == 'PUBLIC_ORIGIN'\n"
+        "print(sorted(m for m in sys.modules if m.startswith('orchestrator.')))\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", script],
+        cwd=Path(__file__).resolve().parents[2],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    modules = ast.literal_eval(result.stdout)
+    assert "orchestrator.commands.env_explain" in modules
+    assert not [
+        module
+        for module in modules
+        if module.startswith(("orchestrator.commands.", "orchestrator.operations."))
+        and module
+        not in {
+            "orchestrator.commands.env_explain",
+            "orchestrator.commands.env_support",
+            "orchestrator.commands.registry",
+        }
+    ]
+
+
+def test_command_manifest_resolves_every_handler():
+    for group in GROUPS:
+        for command in group.commands:
+            assert callable(command.load_handler()), (group.name, command.name)
+
+
+def test_context_failures_are_reported_as_cli_errors(monkeypatch, capsys):
+    def outside_repository():
+        raise ValueError("ft must run inside the repository")
+
+    monkeypatch.setattr(context, "Context", outside_repository)
+
+    assert main(["env", "explain", "PUBLIC_ORIGIN"]) == 1
+    assert capsys.readouterr().err == "error: ft must run inside the repository\n"
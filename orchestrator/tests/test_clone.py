@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import errno
+import os
+from pathlib import Path
+
+import pytest
+
+from orchestrator.core import clone
+
+
+@pytest.mark.parametrize("method", clone.CLONE_METHODS, ids=lambda method: method[0])
+def test_each_copy_mechanism_reproduces_the_file(tmp_path: Path, monkeypatch, method):
+    monkeypatch.setattr(clone, "CHUNK_BYTES", 4096)
+    source = tmp_path / "source.db"
+    source.write_bytes(os.urandom(3 * 4096 + 123))
+    source.chmod(0o640)
+    destination = tmp_path / "destination.db"
+
+    try:
+        used = clone.clone_file(source, destination, (method,))
+    except clone.UnsupportedCloneError:
+        pytest.skip(f"{method[0]} is not supported on this filesystem")
+
+    assert used == method[0]
+    assert destination.read_bytes() == source.read_bytes()
+    assert destination.stat().st_mode & 0o777 == 0o640
+
+
+def test_clone_falls_back_when_reflinks_are_unsupported(tmp_path: Path):
+    def unsupported(source: int, destination: int, size: int) -> None:
+        raise OSError(errno.EOPNOTSUPP, "not supported")
+
+    source = tmp_path / "data" / "database.db"
+    source.parent.mkdir()
+    source.write_bytes(b"database")
+
+    used = clone.clone_file(
+        source,
+        tmp_path / "copy.db",
+        (("reflink", unsupported), ("buffered", clone.CLONE_METHODS[-1][1])),
+    )
+    clone.clone_tree(source.parent, tmp_path / "recovery")
+
+    assert used == "buffered"
+    assert (tmp_path / "copy.db").read_bytes() == b"database"
+    assert (tmp_path / "recovery" / "database.db").read_bytes() == b"database"
+
+
+def test_copies_that_stop_early_are_never_reported_as_complete(
+    tmp_path: Path, monkeypatch
+):
+    monkeypatch.setattr(clone, "CHUNK_BYTES", 4)
+    source = tmp_path / "source.db"
+    source.write_bytes(b"database")
+
+    def stalls_at(stop: int):
+        def copy(source: int, destination: int, size: int) -> None:
+            def step(_source, _destination, count, offset):
+                return 0 if offset >= stop else os.write(_destination, b"data")
+
+            clone._copy_chunks(step, source, destination, size)
+
+        return copy
+
+    used = clone.clone_file(
+        source,
+        tmp_path / "copy.db",
+        (("empty", stalls_at(0)), ("buffered", clone.CLONE_METHODS[-1][1])),
+    )
+    assert used == "buffered"
+    assert (tmp_path / "copy.db").read_bytes() == b"database"
+
+    with pytest.raises(OSError, match="stopped at byte 4 of 8"):
+        clone.clone_file(source, tmp_path / "partial.db", (("short", stalls_at(4)),))
@@ -0,0 +1,307 @@
+import io
+import json
+import socketserver
+import struct
+import threading
+import time
+from http.server import BaseHTTPRequestHandler
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+from orchestrator.core.docker import (
+    ContainerSpec,
+    DockerCli,
+    DockerEngine,
+    engine_socket,
+)
+from orchestrator.core.image_pull import pull_images
+from orchestrator.core.readiness import Endpoint, Healthy, wait_until_ready
+
+
+class FakeEngine(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path: Path, exit_code: int) -> None:
+        self.requests: list[tuple[str, str, object]] = []
+        self.exit_code = exit_code
+        self.missing_images: set[str] = set()
+        super().__init__(str(path), FakeEngineHandler)
+
+
+class FakeEngineHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: FakeEngine
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self._handle()
+
+    def do_POST(self):
+        self._handle()
+
+    def do_DELETE(self):
+        self._handle()
+
+    def _handle(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length)) if length else None
+        path = self.path.removeprefix("/v1.41")
+        self.server.requests.append((self.command, path, body))
+        if path.startswith("/containers/create") and isinstance(body, dict):
+            if body["Image"] in self.server.missing_images:
+                self._reply(404, b'{"message":"No such image"}')
+            else:
+                self._reply(201, json.dumps({"Id": "abc123"}).encode())
+        elif path.startswith("/images/create"):
+            self.server.missing_images.clear()
+            self._reply(200, b'{"status":"Pull complete"}\n')
+        elif path.startswith("/containers/abc123/logs"):
+            frames = b"".join(
+                struct.pack(">BxxxL", stream, len(data)) + data
+                for stream, data in ((1, b"migrating\n"), (2, b"done\n"))
+            )
+            self._reply(200, frames, "application/vnd.docker.raw-stream")
+        elif path == "/containers/abc123/wait":
+            self._reply(200, json.dumps({"StatusCode": self.server.exit_code}).encode())
+        elif path == "/containers/backend/json":
+            ports = {"8080/tcp": [{"HostIp": "127.0.0.1", "HostPort": "49153"}]}
+            self._reply(
+                200,
+                json.dumps(
+                    {
+                        "State": {"Health": {"Status": "healthy"}},
+                        "NetworkSettings": {"Ports": ports},
+                    }
+                ).encode(),
+            )
+        elif path == "/containers/frontend/json":
+            self._reply(200, b'{"State":{"Health":{"Status":"starting"}}}')
+        elif path.startswith("/events"):
+            action = "die" if self.server.exit_code else "health_status: healthy"
+            self._reply(200, json.dumps({"Action": action}).encode() + b"\n")
+        elif path.startswith("/images/"):
+            self._reply(404, b'{"message":"No such image"}')
+        else:
+            self._reply(204, b"")
+
+    def _reply(self, status: int, body: bytes, content_type="application/json"):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+
+
+@pytest.fixture
+def engine(tmp_path: Path, request):
+    server = FakeEngine(tmp_path / "docker.sock", getattr(request, "param", 0))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_engine_runs_hardened_container_and_streams_its_logs(
+    engine: FakeEngine, tmp_path: Path
+):
+    output = io.StringIO()
+    client = DockerEngine(Path(engine.server_address), output=output)
+
+    client.run(
+        ContainerSpec(
+            "migrator-image",
+            environment={"DATABASE_PATH": "/data/database.db"},
+            volumes=((tmp_path, "/data"),),
+        )
+    )
+
+    assert output.getvalue() == "migrating\ndone\n"
+    assert [(method, path.split("?")[0]) for method, path, _ in engine.requests] == [
+        ("POST", "/containers/create"),
+        ("POST", "/containers/abc123/start"),
+        ("GET", "/containers/abc123/logs"),
+        ("POST", "/containers/abc123/wait"),
+        ("DELETE", "/containers/abc123"),
+    ]
+    create_body = engine.requests[0][2]
+    assert isinstance(create_body, dict)
+    assert create_body["HostConfig"]["ReadonlyRootfs"] is True
+    assert create_body["HostConfig"]["CapDrop"] == ["ALL"]
+    assert create_body["HostConfig"]["Binds"] == [f"{tmp_path}:/data"]
+
+
+@pytest.mark.parametrize("engine", [3], indirect=True)
+def test_engine_reports_failed_containers_after_removing_them(engine: FakeEngine):
+    client = DockerEngine(Path(engine.server_address), output=io.StringIO())
+
+    with pytest.raises(RuntimeError, match="exited with status 3"):
+        client.run(ContainerSpec("migrator-image"))
+
+    assert engine.requests[-1][:2] == ("DELETE", "/containers/abc123?force=1")
+
+
+def test_engine_pulls_a_missing_image_before_creating_the_container(
+    engine: FakeEngine, monkeypatch, tmp_path: Path
+):
+    monkeypatch.setenv("DOCKER_CONFIG", str(tmp_path))
+    engine.missing_images.add("registry.example/migrator:1.2")
+    client = DockerEngine(Path(engine.server_address), output=io.StringIO())
+
+    client.run_detached(ContainerSpec("registry.example/migrator:1.2"))
+
+    assert [(method, path.split("?")[0]) for method, path, _ in engine.requests] == [
+        ("POST", "/containers/create"),
+        ("POST", "/images/create"),
+        ("POST", "/containers/create"),
+        ("POST", "/containers/abc123/start"),
+    ]
+    assert "fromImage=registry.example%2Fmigrator&tag=1.2" in engine.requests[1][1]
+
+
+def test_engine_inspects_ports_health_and_images(engine: FakeEngine):
+    client = DockerEngine(Path(engine.server_address))
+
+    assert client.published_port("backend", 8080) == 49153
+    assert client.health_status("backend") == "healthy"
+    assert not client.image_exists("registry.example/backend@sha256:abc")
+    assert client.image_labels("registry.example/backend@sha256:abc") is None
+
+
+def test_readiness_follows_health_events_and_probes_endpoints_together(
+    engine: FakeEngine,
+):
+    class Ready(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+    http_server = socketserver.TCPServer(("127.0.0.1", 0), Ready)
+    threading.Thread(target=http_server.serve_forever, daemon=True).start()
+    client = DockerEngine(Path(engine.server_address))
+    started = time.monotonic()
+    try:
+        wait_until_ready(
+            client,
+            [
+                Endpoint(f"http://127.0.0.1:{http_server.server_address[1]}/ready"),
+                Healthy("frontend"),
+            ],
+            timeout=5,
+        )
+    finally:
+        http_server.shutdown()
+        http_server.server_close()
+
+    assert time.monotonic() - started < 1
+    assert any(path.startswith("/events") for _, path, _ in engine.requests)
+
+
+@pytest.mark.parametrize("engine", [1], indirect=True)
+def test_readiness_fails_when_the_container_exits(engine: FakeEngine):
+    client = DockerEngine(Path(engine.server_address))
+    closed = socketserver.TCPServer(("127.0.0.1", 0), BaseHTTPRequestHandler)
+    port = closed.server_address[1]
+    closed.server_close()
+    started = time.monotonic()
+
+    with pytest.raises(RuntimeError, match="exited before becoming healthy"):
+        wait_until_ready(
+            client,
+            [Endpoint(f"http://127.0.0.1:{port}/ready"), Healthy("frontend")],
+            timeout=30,
+        )
+
+    assert time.monotonic() - started < 5
+
+
+def test_images_are_pulled_concurrently_unless_present_by_digest():
+    class SlowRegistry:
+        def __init__(self):
+            self.pulled: list[str] = []
+
+        def image_exists(self, image):
+            return image in ("cached@sha256:abc", "local:latest")
+
+        def pull(self, image, progress=None):
+            for current in (0, 512 * 1024, 1024 * 1024):
+                progress(
+                    {
+                        "id": "layer",
+                        "status": "Downloading",
+                        "progressDetail": {"current": current, "total": 1024 * 1024},
+                    }
+                )
+                time.sleep(0.1)
+            self.pulled.append(image)
+
+    registry = SlowRegistry()
+    output = io.StringIO()
+    started = time.monotonic()
+
+    results = pull_images(
+        registry,
+        ["backend@sha256:1", "frontend@sha256:2", "cached@sha256:abc", "local:latest"],
+        output,
+    )
+
+    assert time.monotonic() - started < 0.6
+    assert sorted(registry.pulled) == [
+        "backend@sha256:1",
+        "frontend@sha256:2",
+        "local:latest",
+    ]
+    assert [result.pulled for result in results] == [True, True, False, True]
+    assert "Found cached in" in output.getvalue()
+    assert "MiB downloaded" in output.getvalue()
+    assert not pull_images(registry, ["local:latest"], output, refresh_tags=False)[
+        0
+    ].pulled
+
+
+def test_cli_pull_failures_name_the_image_and_the_registry_error():
+    class FailingRunner:
+        def run(self, command, **kwargs):
+            assert kwargs == {"check": False, "capture_output": True}
+            return SimpleNamespace(returncode=1, stdout="", stderr="manifest unknown\n")
+
+    with pytest.raises(
+        RuntimeError, match="Could not pull backend@sha256:1: manifest unknown$"
+    ):
+        pull_images(DockerCli(FailingRunner()), ["backend@sha256:1"], io.StringIO())
+
+
+def test_docker_contexts_and_credential_helpers_fall_back_to_the_cli(
+    engine: FakeEngine, monkeypatch, tmp_path: Path
+):
+    monkeypatch.delenv("DOCKER_CONTEXT", raising=False)
+    monkeypatch.setenv("DOCKER_HOST", f"unix://{engine.server_address}")
+    monkeypatch.setenv("DOCKER_CONFIG", str(tmp_path))
+    assert engine_socket() == Path(engine.server_address)
+    monkeypatch.delenv("DOCKER_HOST")
+    (tmp_path / "config.json").write_text(
+        json.dumps({"currentContext": "remote", "credsStore": "desktop"}),
+        encoding="utf-8",
+    )
+    assert engine_socket() is None
+
+    commands: list[list[str]] = []
+
+    class RecordingRunner:
+        def run(self, command, **_kwargs):
+            commands.append(command)
+
+    client = DockerEngine(Path(engine.server_address), runner=RecordingRunner())
+    client.pull("registry.example/backend:1")
+
+    assert commands == [["docker", "pull", "registry.example/backend:1"]]
+    assert engine.requests == []
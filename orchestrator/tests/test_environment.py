@@ -4,6 +4,7 @@ from pathlib import Path
 import pytest
 
 from orchestrator.commands import env_render
+from orchestrator.config import loader
 from orchestrator.config.environment import EnvironmentSchema, read_dotenv
 from orchestrator.core.context import Context
 from orchestrator.core.paths import RepoPaths
@@ -107,3 +108,57 @@ def test_dotenv_rejects_malformed_lines(tmp_path: Path):
 
     with pytest.raises(ValueError, match="Invalid dotenv line"):
         read_dotenv(path)
+
+
+def test_schema_is_reused_until_its_file_changes(tmp_path: Path):
+    path = tmp_path / "environment.toml"
+    path.write_text('[variables.NAME]\ndescription = "Name"\n', encoding="utf-8")
+
+    first = EnvironmentSchema.read(path)
+    assert EnvironmentSchema.read(path) is first
+
+    path.write_text(
+        '[variables.NAME]\ndescription = "Name"\n'
+        '[variables.OTHER]\ndescription = "Other"\n',
+        encoding="utf-8",
+    )
+    changed = EnvironmentSchema.read(path)
+    assert set(changed.variables) == {"NAME", "OTHER"}
+
+    loader.clear()
+    assert EnvironmentSchema.read(path) is not changed
+
+
+def test_compiled_paths_locate_the_repository_once(monkeypatch: pytest.MonkeyPatch):
+    discovered: list[RepoPaths] = []
+    discover = RepoPaths.discover
+    monkeypatch.setattr(loader, "_repository", None)
+    monkeypatch.setattr(
+        RepoPaths, "discover", lambda: discovered.append(discover()) or discovered[-1]
+    )
+
+    config = discover().root / "config"
+    first = loader._compiled_path(config / "environment.toml")
+    second = loader._compiled_path(config / "toolchain.toml")
+
+    assert len(discovered) == 1
+    assert first is not None and second is not None
+    assert first.parent == second.parent == discover().artifacts / "config-cache"
+
+
+def test_compiled_schema_is_used_while_the_source_is_unchanged(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+):
+    path = tmp_path / "environment.toml"
+    compiled = tmp_path / "cache" / "environment.marshal"
+    path.write_text('[variables.NAME]\ndescription = "Name"\n', encoding="utf-8")
+    monkeypatch.setattr(loader, "_compiled_path", lambda _: compiled)
+
+    document = loader.read_toml(path, compiled=True)
+    assert compiled.exists()
+
+    def fail(*_):
+        raise AssertionError("the compiled form should have been used")
+
+    monkeypatch.setattr(loader.tomllib, "load", fail)
+    assert loader.read_toml(path, compiled=True) == document
@@ -1,21 +1,57 @@
 from __future__ import annotations
 
+import errno
 import io
 import json
+import os
+import shutil
 import sqlite3
+import subprocess
+import threading
+import time
+from contextlib import nullcontext
+from datetime import UTC, datetime
+from fnmatch import fnmatch
 from pathlib import Path
 from types import SimpleNamespace
 from urllib.request import Request
 
 import pytest
 
-from orchestrator.operations import container_smoke, debug_restore, migrator
+from orchestrator.commands import backup_stats
+from orchestrator.core.docker import DockerCli
+from orchestrator.core.runner import Runner
+from orchestrator.operations import backup as backup_module
+from orchestrator.operations import (
+    container_smoke,
+    debug_restore,
+    migrator,
+    snapshot,
+    validation,
+    wal_shipping,
+)
+from orchestrator.operations.archive import Archive, ArchiveStore, RetentionPolicy
 from orchestrator.operations.backup import BackupOperations
 from orchestrator.operations.configuration import Configuration, Environment
-from orchestrator.operations.deployment import apply_migrations, validate_deploy_request
+from orchestrator.operations.database_cache import (
+    RestoredDatabaseCache,
+    TemplateDatabaseCache,
+)
+from orchestrator.operations.deployment import (
+    TransactionalDeployment,
+    apply_migrations,
+    validate_deploy_request,
+)
 from orchestrator.operations.instance import resolve_instance_path
 from orchestrator.operations.release_manifest import ReleaseManifest
-from orchestrator.operations.restic import run_restic
+from orchestrator.operations.restic import (
+    ResticSession,
+    Snapshot,
+    parse_restic_time,
+    run_restic,
+)
+from orchestrator.operations.restic_mirror import ResticMirror
+from orchestrator.operations.snapshot_catalog import SnapshotCatalog
 
 
 def build_configuration(
@@ -98,7 +134,9 @@ def test_migrator_uses_hardened_container_contract(tmp_path: Path):
     migrator_runner = RecordingRunner()
 
     migrator.run_migrator(
-        "registry.example/migrator@sha256:abc", tmp_path, runner=migrator_runner
+        "registry.example/migrator@sha256:abc",
+        tmp_path,
+        docker=DockerCli(migrator_runner),
     )
 
     assert captured["command"] == [
@@ -121,6 +159,93 @@ def test_migrator_uses_hardened_container_contract(tmp_path: Path):
     assert captured["kwargs"] == {}
 
 
+class FakeMigratorDocker:
+    def __init__(self, database: Path) -> None:
+        self.database = database
+        self.labels = {migrator.MIGRATIONS_LABEL: "1_Initial"}
+        self.runs: list[dict[str, str]] = []
+
+    def image_id(self, image: str) -> str:
+        return f"sha256:{image}"
+
+    def image_labels(self, image: str) -> dict[str, str]:
+        return self.labels
+
+    def run(self, spec) -> None:
+        self.runs.append(spec.environment)
+        subject = spec.environment.get("DEVELOPMENT_AUTH_SUBJECT")
+        if subject is not None:
+            with sqlite3.connect(self.database) as connection:
+                connection.execute(
+                    "INSERT OR IGNORE INTO Users VALUES (?, 'Admin', 'Active')",
+                    (subject,),
+                )
+            connection.close()
+
+
+def create_migrated_database(path: Path) -> None:
+    with sqlite3.connect(path) as connection:
+        connection.execute(
+            "CREATE TABLE __EFMigrationsHistory (MigrationId TEXT NOT NULL)"
+        )
+        connection.execute("INSERT INTO __EFMigrationsHistory VALUES ('1_Initial')")
+        connection.execute(
+            "CREATE TABLE Users (GoogleSubject TEXT UNIQUE, Role TEXT, Status TEXT)"
+        )
+        connection.execute("CREATE TABLE UserInvitations (NormalizedEmail, Status)")
+    connection.close()
+
+
+def test_migrator_is_skipped_for_current_databases_and_repeated_runs(
+    tmp_path: Path,
+):
+    database_path = tmp_path / "database.db"
+    create_migrated_database(database_path)
+    docker = FakeMigratorDocker(database_path)
+    seed = {"AUTH_MODE": "development", "DEVELOPMENT_AUTH_SUBJECT": "local"}
+    bootstrap = {"BOOTSTRAP_ADMIN_EMAIL": " Admin@Example.test "}
+
+    migrator.run_migrator("migrator", tmp_path, docker=docker)
+    migrator.run_migrator("migrator", tmp_path, seed, docker=docker)
+    migrator.run_migrator("migrator", tmp_path, seed, docker=docker)
+    migrator.run_migrator("migrator", tmp_path, bootstrap, docker=docker)
+    docker.labels = {migrator.MIGRATIONS_LABEL: "1_Initial,2_Next"}
+    migrator.run_migrator("migrator", tmp_path, docker=docker)
+
+    assert [environment.get("AUTH_MODE") for environment in docker.runs] == [
+        "development",
+        None,
+    ]
+
+
+def test_seeded_smoke_database_skips_the_migrator_once_users_exist(
+    monkeypatch, tmp_path: Path
+):
+    database_path = tmp_path / "database.db"
+    create_migrated_database(database_path)
+    docker = FakeMigratorDocker(database_path)
+    monkeypatch.setattr(container_smoke, "docker_client", lambda _runner: docker)
+
+    container_smoke.prepare_smoke_test_database(tmp_path, "migrator")
+    assert len(docker.runs) == 2
+
+    (tmp_path / migrator.MIGRATOR_STATE_FILE_NAME).unlink()
+    with sqlite3.connect(database_path) as connection:
+        connection.execute(
+            "DELETE FROM Users WHERE GoogleSubject = 'container-smoke-standard'"
+        )
+    connection.close()
+    container_smoke.prepare_smoke_test_database(tmp_path, "migrator")
+    assert docker.runs[-1]["DEVELOPMENT_AUTH_ROLE"] == "Standard"
+    assert len(docker.runs) == 3
+
+    copy = tmp_path / "copy"
+    copy.mkdir()
+    shutil.copy2(database_path, copy / "database.db")
+    container_smoke.prepare_smoke_test_database(copy, "migrator")
+    assert len(docker.runs) == 3
+
+
 def test_container_smoke_database_provisions_users(monkeypatch, tmp_path: Path):
     calls: list[tuple[str, Path, dict[str, str]]] = []
 
@@ -136,6 +261,41 @@ def test_container_smoke_database_provisions_users(monkeypatch, tmp_path: Path):
     assert calls[2][2]["DEVELOPMENT_AUTH_ROLE"] == "Standard"
 
 
+def test_container_smoke_database_is_cloned_from_a_cached_template(
+    monkeypatch, tmp_path: Path
+):
+    calls: list[str] = []
+
+    def fake_run_migrator(image, data_directory, environment, **_kwargs):
+        calls.append(environment["DEVELOPMENT_AUTH_SUBJECT"])
+        with (data_directory / "database.db").open("a", encoding="utf-8") as file:
+            file.write(environment["DEVELOPMENT_AUTH_SUBJECT"])
+
+    image_ids = {"migrator": "sha256:one"}
+    monkeypatch.setattr(container_smoke, "run_migrator", fake_run_migrator)
+    monkeypatch.setattr(
+        container_smoke,
+        "docker_client",
+        lambda _runner: SimpleNamespace(image_id=lambda image: image_ids[image]),
+    )
+    cache = TemplateDatabaseCache(tmp_path / "templates")
+    directories = [tmp_path / name for name in ("first", "second", "third")]
+    for directory in directories:
+        directory.mkdir()
+        (directory / "database.db").touch()
+
+    container_smoke.prepare_smoke_test_database(directories[0], "migrator", cache=cache)
+    container_smoke.prepare_smoke_test_database(directories[1], "migrator", cache=cache)
+    assert len(calls) == 3
+    assert (directories[1] / "database.db").read_text(encoding="utf-8") == (
+        directories[0] / "database.db"
+    ).read_text(encoding="utf-8")
+
+    image_ids["migrator"] = "sha256:two"
+    container_smoke.prepare_smoke_test_database(directories[2], "migrator", cache=cache)
+    assert len(calls) == 6
+
+
 def test_release_manifest_rejects_mutable_images(tmp_path: Path):
     manifest_path = tmp_path / "release-manifest.json"
     digest = "a" * 64
@@ -180,6 +340,56 @@ def test_apply_migrations_passes_bootstrap_email(monkeypatch, tmp_path: Path):
 
     assert captured["image"] == "registry.example/migrator@sha256:abc"
     assert captured["environment"] == {"BOOTSTRAP_ADMIN_EMAIL": "owner@example.com"}
+    pending = ArchiveStore(instance_path / "archive").pending()
+    assert len(pending) == 1
+    assert pending[0].stat().st_ino != database_path.stat().st_ino
+
+
+def test_failed_deploy_drops_its_pending_archive_copy(monkeypatch, tmp_path: Path):
+    instance_path = tmp_path / "instance"
+    database_path = instance_path / "data" / "database.db"
+    database_path.parent.mkdir(parents=True)
+    database_path.touch()
+    monkeypatch.setattr(
+        "orchestrator.operations.deployment.run_migrator",
+        lambda *_args, **_kwargs: None,
+    )
+    monkeypatch.setattr(
+        "orchestrator.operations.deployment.prepare_database_directory",
+        lambda _path: None,
+    )
+    configuration = SimpleNamespace(
+        path=str(instance_path),
+        migrator_image="registry.example/migrator@sha256:abc",
+        get_database_file_path=lambda: str(database_path),
+    )
+    deployment = TransactionalDeployment(
+        instance_path, Runner(verbose=False), SimpleNamespace()
+    )
+    starts: list[str] = []
+
+    def start_instance() -> None:
+        starts.append("start")
+        if len(starts) == 1:
+            raise RuntimeError("unhealthy")
+
+    for name in (
+        "ensure_no_incomplete_transaction",
+        "validate_release",
+        "pull_images",
+        "stop_instance",
+        "create_recovery_point",
+        "install_release_files",
+        "restore_recovery_point",
+    ):
+        monkeypatch.setattr(deployment, name, lambda *_args, **_kwargs: None)
+    monkeypatch.setattr(deployment, "start_instance", start_instance)
+
+    with pytest.raises(RuntimeError, match="previous release was restored"):
+        deployment.deploy(configuration, tmp_path / "manifest.json", "")
+
+    assert starts == ["start", "start"]
+    assert ArchiveStore(instance_path / "archive").pending() == []
 
 
 def test_deploy_validation_accepts_missing_instance_path(tmp_path: Path):
@@ -236,6 +446,7 @@ def test_backup_restoration_uses_hardened_runtime_and_persists_data(
     monkeypatch.setattr(BackupOperations, "wait_for_url", lambda *_args: None)
     operations = BackupOperations.__new__(BackupOperations)
     operations.runner = RecordingRunner()
+    operations.docker = DockerCli(operations.runner)
 
     operations.verify_restored_backend(
         SimpleNamespace(backend_image="backend-image"), tmp_path
@@ -294,6 +505,7 @@ def test_debug_restore_stages_migrates_and_replaces_database(
             "debug_data": debug_data,
             "debug_environment": debug_environment,
             "debug_database": database_path,
+            "artifacts": tmp_path / ".artifacts",
         },
     )()
     operations = debug_restore.DebugRestoreOperations.__new__(
@@ -303,23 +515,58 @@ def test_debug_restore_stages_migrates_and_replaces_database(
     operations.repository = str(repository)
     operations.s3_uri = None
     operations.aws_profile = None
+    operations.at = None
+    operations.snapshot = None
+    operations.mirror_root = None
+    operations.snapshot_packs = False
+    operations.use_cache = True
     operations.restic_image = "restic-image"
     operations.migrator_image = "migrator-image"
     operations.runner = object()
     monkeypatch.setattr(operations, "get_restic_password", lambda: "restic-secret")
 
-    def fake_run_restic(arguments, **kwargs):
-        if arguments[0] == "restore":
-            restore_directory = kwargs["volumes"][0][0]
-            restored_database = restore_directory / "snapshot" / "database.db"
-            restored_database.parent.mkdir()
-            with sqlite3.connect(restored_database) as connection:
-                connection.execute(
-                    "CREATE TABLE __EFMigrationsHistory (MigrationId TEXT NOT NULL)"
-                )
+    class FakeSession:
+        def __init__(self, **kwargs):
+            self.restore_directory = kwargs["volumes"][0][0]
 
-    monkeypatch.setattr(debug_restore, "run_restic", fake_run_restic)
-    monkeypatch.setattr(debug_restore, "run_migrator", lambda *args, **kwargs: None)
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *_exception):
+            pass
+
+        def run(self, arguments, **_kwargs):
+            if arguments[0] == "list":
+                return SimpleNamespace(stdout="abc123\n")
+            if arguments[0] == "snapshots":
+                snapshot = {
+                    "id": "abc123",
+                    "time": "2026-01-01T00:00:00Z",
+                    "tree": "tree",
+                    "tags": ["financial-tracker"],
+                }
+                return SimpleNamespace(stdout=json.dumps([snapshot]))
+            if arguments[0] == "restore":
+                assert arguments[1] == "abc123"
+                calls.append("restore")
+                restored_database = self.restore_directory / "snapshot" / "database.db"
+                restored_database.parent.mkdir()
+                with sqlite3.connect(restored_database) as connection:
+                    connection.execute(
+                        "CREATE TABLE __EFMigrationsHistory (MigrationId TEXT NOT NULL)"
+                    )
+
+    calls: list[str] = []
+    monkeypatch.setattr(debug_restore, "ResticSession", FakeSession)
+    monkeypatch.setattr(
+        debug_restore, "run_migrator", lambda *args, **kwargs: calls.append("migrate")
+    )
+    image_ids = {"migrator-image": "sha256:one"}
+    monkeypatch.setattr(
+        debug_restore,
+        "docker_client",
+        lambda _runner: SimpleNamespace(image_id=lambda image: image_ids[image]),
+    )
 
     operations.validate()
     operations.restore()
@@ -327,3 +574,681 @@ def test_debug_restore_stages_migrates_and_replaces_database(
     assert database_path.is_file()
     assert database_path.read_bytes() != b"previous database"
     assert list(debug_data.glob("database.db.before-restore-*.bak"))
+    restored = database_path.read_bytes()
+
+    database_path.write_text("modified database", encoding="utf-8")
+    operations.restore()
+
+    assert calls == ["restore", "migrate"]
+    assert database_path.read_bytes() == restored
+
+    image_ids["migrator-image"] = "sha256:two"
+    operations.restore()
+
+    assert calls == ["restore", "migrate", "restore", "migrate"]
+
+
+def test_database_snapshot_copies_in_paced_steps(tmp_path: Path):
+    source = tmp_path / "source.db"
+    connection = sqlite3.connect(source)
+    connection.execute("CREATE TABLE entries (value TEXT)")
+    connection.executemany(
+        "INSERT INTO entries VALUES (?)", [("x" * 500,) for _ in range(200)]
+    )
+    connection.commit()
+    connection.close()
+    reports = []
+
+    result = BackupOperations.create_database_snapshot(
+        source, tmp_path / "snapshot.db", pages=4, sleep=0, progress=reports.append
+    )
+
+    assert len(reports) > 1
+    assert [report.copied for report in reports] == sorted(
+        report.copied for report in reports
+    )
+    assert result.copied == result.total == reports[-1].total
+    copy = sqlite3.connect(tmp_path / "snapshot.db")
+    assert copy.execute("SELECT count(*) FROM entries").fetchone() == (200,)
+    copy.close()
+
+
+def test_database_snapshot_finishes_under_concurrent_writes(tmp_path: Path):
+    source = tmp_path / "source.db"
+    connection = sqlite3.connect(source, check_same_thread=False)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("CREATE TABLE entries (value TEXT)")
+    connection.executemany(
+        "INSERT INTO entries VALUES (?)", [("x" * 500,) for _ in range(400)]
+    )
+    connection.commit()
+    stop = threading.Event()
+
+    def write() -> None:
+        while not stop.is_set():
+            connection.execute("INSERT INTO entries VALUES ('y')")
+            connection.commit()
+            time.sleep(0.001)
+
+    writer = threading.Thread(target=write)
+    writer.start()
+    reports = []
+    try:
+        result = BackupOperations.create_database_snapshot(
+            source,
+            tmp_path / "snapshot.db",
+            pages=1,
+            sleep=0.002,
+            progress=reports.append,
+        )
+    finally:
+        stop.set()
+        writer.join()
+        connection.close()
+
+    assert result.restarts >= snapshot.SNAPSHOT_RESTARTS
+    assert reports[-1].restarts == result.restarts
+    copy = sqlite3.connect(tmp_path / "snapshot.db")
+    assert copy.execute("PRAGMA integrity_check").fetchone() == ("ok",)
+    assert copy.execute("SELECT count(*) FROM entries").fetchone()[0] >= 400
+    copy.close()
+
+
+def test_database_snapshot_backs_off_while_the_source_is_busy(monkeypatch):
+    pauses = []
+    monkeypatch.setattr(snapshot.time, "sleep", pauses.append)
+    pacer = snapshot._Pacer(0.005, None)
+
+    for status in (sqlite3.SQLITE_BUSY, sqlite3.SQLITE_BUSY, sqlite3.SQLITE_OK):
+        pacer(status, 10, 20)
+
+    assert pauses == [0.05, 0.1, 0.05]
+
+
+def test_full_validation_checks_each_table_and_reports_foreign_key_problems(
+    tmp_path: Path,
+):
+    database = tmp_path / "database.db"
+    connection = sqlite3.connect(database)
+    connection.executescript(
+        """
+        CREATE TABLE "__EFMigrationsHistory" (MigrationId TEXT PRIMARY KEY);
+        CREATE TABLE accounts (id INTEGER PRIMARY KEY);
+        CREATE TABLE "account entries" (
+            id INTEGER PRIMARY KEY, account INTEGER REFERENCES accounts (id)
+        );
+        INSERT INTO accounts VALUES (1);
+        INSERT INTO "account entries" VALUES (1, 1);
+        """
+    )
+    connection.commit()
+
+    checks = validation.validate_database(database, validation.ValidationLevel.FULL)
+
+    assert sorted(check.table for check in checks) == [
+        "__EFMigrationsHistory",
+        "account entries",
+        "accounts",
+    ]
+    connection.execute('INSERT INTO "account entries" VALUES (2, 7)')
+    connection.commit()
+    connection.close()
+    validation.validate_database(database, validation.ValidationLevel.QUICK)
+    with pytest.raises(RuntimeError, match="account entries: row 2 references"):
+        validation.validate_database(database, validation.ValidationLevel.FULL)
+
+    corrupt = tmp_path / "corrupt.db"
+    connection = sqlite3.connect(corrupt)
+    connection.execute('CREATE TABLE "__EFMigrationsHistory" (MigrationId TEXT)')
+    connection.execute("CREATE TABLE filler (value TEXT)")
+    connection.executemany(
+        "INSERT INTO filler VALUES (?)", [("x" * 3000,) for _ in range(20)]
+    )
+    connection.commit()
+    connection.execute("DELETE FROM filler")
+    connection.commit()
+    (freelist,) = connection.execute("PRAGMA freelist_count").fetchone()
+    connection.close()
+    assert freelist
+    # Point the free-page count past the file, which per-table checks never read.
+    with corrupt.open("r+b") as file:
+        file.seek(36)
+        file.write((freelist + 1000).to_bytes(4, "big"))
+    with pytest.raises(RuntimeError, match="SQLite quick check failed$"):
+        validation.validate_database(corrupt, validation.ValidationLevel.FULL)
+
+
+def test_streamed_backup_pipes_the_validated_snapshot_into_restic(
+    monkeypatch, tmp_path: Path
+):
+    database = tmp_path / "database.db"
+    with sqlite3.connect(database) as connection:
+        connection.execute("CREATE TABLE __EFMigrationsHistory (MigrationId TEXT)")
+    connection.close()
+    calls: list[tuple[list[str], bytes | None]] = []
+
+    class RecordingRunner:
+        def run(self, command: list[str], **kwargs):
+            stdin = kwargs.get("stdin")
+            calls.append((command, stdin.read() if stdin else None))
+            return SimpleNamespace(stdout=summary)
+
+    summary = '{"message_type":"summary","snapshot_id":"abc","data_added":10}\n'
+    operations = BackupOperations.__new__(BackupOperations)
+    operations.path = tmp_path
+    operations.runner = RecordingRunner()
+    monkeypatch.setattr(operations, "restic_session", lambda _volumes: nullcontext())
+    operations.restic_image = "restic-image"
+    monkeypatch.setenv("RESTIC_REPOSITORY", "s3:https://storage.example/backups")
+    monkeypatch.setattr(
+        operations,
+        "configuration",
+        lambda: SimpleNamespace(
+            name="tracker", get_database_file_path=lambda: str(database)
+        ),
+    )
+
+    operations.backup(stream=True)
+
+    (backup, streamed), (forget, _) = calls
+    assert "--interactive" in backup
+    assert "--volume" not in backup
+    assert backup[backup.index("restic-image") + 1 :] == [
+        "backup",
+        "--json",
+        "--stdin",
+        "--stdin-filename",
+        "database.db",
+        "--host",
+        "tracker",
+        "--tag",
+        "financial-tracker",
+    ]
+    assert streamed is not None and streamed.startswith(b"SQLite format 3\x00")
+    assert forget[forget.index("--group-by") + 1] == "host,tags"
+
+    def fail(command: list[str], **kwargs):
+        raise subprocess.CalledProcessError(
+            1, command, "", "Fatal: unable to create lock in backend\n"
+        )
+
+    operations.runner = SimpleNamespace(run=fail)
+    with pytest.raises(RuntimeError, match="unable to create lock in backend"):
+        operations.backup(stream=True)
+
+
+def test_streamed_snapshot_is_staged_on_disk_when_shared_memory_is_small(
+    monkeypatch, tmp_path: Path
+):
+    database = tmp_path / "database.db"
+    database.write_bytes(b"x" * 1000)
+    shared_memory = tmp_path / "shm"
+    shared_memory.mkdir()
+    monkeypatch.setattr(backup_module, "SHARED_MEMORY_DIRECTORY", shared_memory)
+    monkeypatch.setattr(backup_module, "SHARED_MEMORY_HEADROOM_BYTES", 100)
+    free = {"bytes": 1100}
+    monkeypatch.setattr(
+        backup_module.shutil,
+        "disk_usage",
+        lambda _path: SimpleNamespace(free=free["bytes"]),
+    )
+
+    assert backup_module.snapshot_staging_directory(database) == shared_memory
+    (tmp_path / "database.db-wal").write_bytes(b"x")
+    assert backup_module.snapshot_staging_directory(database) is None
+    free["bytes"] = 1101
+    assert backup_module.snapshot_staging_directory(database) == shared_memory
+
+
+def test_verify_skips_snapshots_recorded_as_verified(monkeypatch, tmp_path: Path):
+    identity = {"hostname": "tracker", "tags": ["financial-tracker"]}
+    snapshots = [
+        {"id": "older", "time": "2026-01-01T02:00:00.123456789Z", "tree": "t1"},
+        {"id": "newer", "time": "2026-01-02T02:00:00.123456789+01:00", "tree": "t2"},
+    ]
+    snapshots = [{**snapshot, **identity} for snapshot in snapshots]
+    verified: list[str] = []
+    operations = BackupOperations.__new__(BackupOperations)
+    operations.path = tmp_path
+    monkeypatch.setattr(
+        operations,
+        "configuration",
+        lambda: SimpleNamespace(name="tracker", migrator_image="migrator@sha256:a"),
+    )
+    monkeypatch.setattr(
+        operations,
+        "run_restic",
+        lambda arguments, **_kwargs: SimpleNamespace(
+            stdout="older\nnewer\n" if arguments[0] == "list" else json.dumps(snapshots)
+        ),
+    )
+    monkeypatch.setattr(operations, "check_repository", lambda _subsets: None)
+    monkeypatch.setattr(operations, "restic_session", lambda _volumes: nullcontext())
+    monkeypatch.setattr(
+        operations,
+        "verify_snapshot",
+        lambda _configuration, snapshot_id, *_args: verified.append(snapshot_id),
+    )
+
+    operations.verify()
+    operations.verify()
+    operations.verify(all_unverified=True)
+
+    assert verified == ["newer", "older"]
+    ledger = (tmp_path / "backup-state" / "verifications.jsonl").read_text()
+    assert [json.loads(line)["migrator_image"] for line in ledger.splitlines()] == [
+        "sha256:a",
+        "sha256:a",
+    ]
+
+
+def test_repository_check_rotates_through_data_subsets(monkeypatch, tmp_path: Path):
+    checks: list[str] = []
+
+    indexes = {
+        "i1": {"packs": [{"id": "00aa", "blobs": [{"offset": 0, "length": 100}]}]},
+        "i2": {
+            "packs": [
+                {
+                    "id": "01bb",
+                    "blobs": [
+                        {"offset": 0, "length": 40},
+                        {"offset": 40, "length": 60},
+                    ],
+                },
+                {"id": "03cc", "blobs": [{"offset": 0, "length": 7}]},
+            ]
+        },
+    }
+
+    def fake_run_restic(arguments, **_kwargs):
+        if arguments[0] == "check":
+            checks.append(arguments[1])
+        if arguments == ["list", "index"]:
+            return SimpleNamespace(stdout="i1\ni2\n")
+        if arguments[:2] == ["cat", "index"]:
+            return SimpleNamespace(stdout=json.dumps(indexes[arguments[2]]))
+        return SimpleNamespace(stdout="")
+
+    operations = BackupOperations.__new__(BackupOperations)
+    operations.path = tmp_path
+    monkeypatch.setattr(operations, "run_restic", fake_run_restic)
+
+    for _ in range(4):
+        operations.check_repository(3)
+    operations.check_repository(5)
+
+    assert checks == [
+        "--read-data-subset=1/3",
+        "--read-data-subset=2/3",
+        "--read-data-subset=3/3",
+        "--read-data-subset=1/3",
+        "--read-data-subset=1/5",
+    ]
+    history = [
+        json.loads(line)
+        for line in (tmp_path / "backup-state" / "data-checks.jsonl")
+        .read_text()
+        .splitlines()
+    ]
+    assert history[0]["subset"] == "1/3"
+    assert [entry["bytes"] for entry in history] == [107, 100, 0, 107, 100]
+
+
+def test_backup_stats_report_percentiles_trends_and_deduplication(
+    capsys, tmp_path: Path
+):
+    history = tmp_path / "backup-state" / "backups.jsonl"
+    history.parent.mkdir()
+    history.write_text(
+        "".join(
+            json.dumps(
+                {
+                    "finished_at": f"2026-01-0{day}",
+                    "data_added": 1024 * 1024,
+                    "total_bytes_processed": 10 * 1024 * 1024,
+                    "snapshot_seconds": day,
+                    "upload_seconds": 2,
+                }
+            )
+            + "\n"
+            for day in range(1, 5)
+        ),
+        encoding="utf-8",
+    )
+
+    backup_stats.run(SimpleNamespace(), SimpleNamespace(path=str(tmp_path), last=90))
+
+    output = capsys.readouterr().out
+    assert "4 backups from 2026-01-01 to 2026-01-04" in output
+    assert "snapshot         2.0      4.0      4.0   +133%" in output
+    assert "(10.0x)" in output
+
+
+def test_restic_session_runs_commands_in_one_hardened_container(monkeypatch):
+    commands: list[list[str]] = []
+
+    class RecordingRunner:
+        def run(self, command: list[str], **_kwargs):
+            commands.append(command)
+            failed = command[-1] == "unlock"
+            return SimpleNamespace(
+                stdout="container-id\n", stderr="", returncode=failed
+            )
+
+    monkeypatch.setenv("RESTIC_REPOSITORY", "s3:https://storage.example/backups")
+    with ResticSession(image="restic-image", runner=RecordingRunner()) as session:
+        session.run(["check"])
+        with pytest.raises(subprocess.CalledProcessError):
+            session.run(["unlock"])
+
+    start, check, unlock, remove = commands
+    assert start[:4] == ["docker", "run", "--detach", "--rm"]
+    assert {"--read-only", "--cap-drop", "no-new-privileges:true"} <= set(start)
+    assert check == ["docker", "exec", "container-id", "restic", "check"]
+    assert unlock[-1] == "unlock"
+    assert remove == ["docker", "container", "rm", "--force", "container-id"]
+    assert [result.returncode for result in session.results] == [0, 1]
+
+
+def test_snapshot_catalog_refreshes_incrementally_and_resolves_points_in_time(
+    tmp_path: Path,
+):
+    requests: list[list[str]] = []
+    listed = ["aaa111", "bbb222"]
+    details = {
+        "aaa111": "2026-09-01T02:00:00Z",
+        "bbb222": "2026-09-02T02:00:00Z",
+        "ccc333": "2026-09-03T02:00:00Z",
+    }
+
+    def restic(arguments: list[str]) -> str:
+        requests.append(arguments)
+        if arguments[0] == "list":
+            return "\n".join(listed)
+        return json.dumps(
+            [
+                {"id": identifier, "time": details[identifier], "tree": "t", "tags": []}
+                for identifier in arguments[2:]
+            ]
+        )
+
+    catalog = SnapshotCatalog(tmp_path / "snapshots.json")
+    catalog.refresh(restic)
+    listed[:] = ["bbb222", "ccc333"]
+    catalog.refresh(restic)
+
+    assert requests[-1] == ["snapshots", "--json", "ccc333"]
+    assert [snapshot.id for snapshot in catalog.snapshots()] == ["bbb222", "ccc333"]
+    assert catalog.at(parse_restic_time("2026-09-03T00:00")).id == "bbb222"
+    assert catalog.find("ccc").id == "ccc333"
+    with pytest.raises(ValueError, match="No snapshot was taken"):
+        catalog.at(parse_restic_time("2026-09-01"))
+
+
+def test_wal_shipping_restores_concurrent_writes_across_checkpoints(tmp_path: Path):
+    result = wal_shipping.benchmark(tmp_path, transactions=3000, interval=0.01)
+
+    assert result.transactions == 3000
+    assert result.shipped_bytes > 3000 * 512
+    assert len(wal_shipping.SegmentStore(tmp_path / "store").generations()) == 1
+
+
+def test_segment_store_numbers_segments_without_rereading_them(
+    monkeypatch, tmp_path: Path
+):
+    database = tmp_path / "database.db"
+    database.write_bytes(b"base")
+    store = wal_shipping.SegmentStore(tmp_path / "store")
+    generation = store.create_generation(database)
+    reads: list[Path] = []
+    read_history = wal_shipping.read_history
+    monkeypatch.setattr(
+        wal_shipping,
+        "read_history",
+        lambda path: reads.append(path) or read_history(path),
+    )
+
+    for _ in range(3):
+        store.append_segment(generation, b"frames")
+    wal_shipping.SegmentStore(store.root).append_segment(generation, b"frames")
+
+    assert reads == [generation / "segments.jsonl"]
+    assert [segment["index"] for segment in read_history(reads[0])] == [0, 1, 2, 3]
+
+
+def test_wal_shipping_restores_to_a_point_in_time(tmp_path: Path):
+    database = tmp_path / "database.db"
+    connection = sqlite3.connect(database, isolation_level=None)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("CREATE TABLE entries (value INTEGER)")
+    store = wal_shipping.SegmentStore(tmp_path / "store")
+    shipper = wal_shipping.WalShipper(database, store, checkpoint_bytes=4096)
+
+    def write_and_ship(count: int) -> datetime:
+        for value in range(count):
+            connection.execute("INSERT INTO entries VALUES (?)", (value,))
+        shipper.ship()
+        return datetime.now(UTC)
+
+    first = write_and_ship(10)
+    shipper.generation_seconds = 0
+    second = write_and_ship(5)
+    shipper.generation_seconds = wal_shipping.GENERATION_SECONDS
+    write_and_ship(20)
+    shipper.close()
+    connection.close()
+
+    def restored_count(moment: datetime, name: str) -> int:
+        store.restore(moment, tmp_path / name)
+        restored = sqlite3.connect(tmp_path / name)
+        try:
+            return restored.execute("SELECT count(*) FROM entries").fetchone()[0]
+        finally:
+            restored.close()
+
+    assert len(store.generations()) == 2
+    assert restored_count(first, "first.db") == 10
+    assert restored_count(second, "second.db") == 15
+    assert restored_count(datetime.now(UTC), "latest.db") == 35
+    with pytest.raises(ValueError, match="No streamed generation"):
+        store.restore(datetime(2020, 1, 1, tzinfo=UTC), tmp_path / "early.db")
+
+
+def test_wal_shipping_retries_transient_failures(capsys, monkeypatch, tmp_path: Path):
+    database = tmp_path / "database.db"
+    connection = sqlite3.connect(database, isolation_level=None)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("CREATE TABLE entries (value INTEGER)")
+    for value in range(10):
+        connection.execute("INSERT INTO entries VALUES (?)", (value,))
+    store = wal_shipping.SegmentStore(tmp_path / "store")
+    append_segment = store.append_segment
+    failures = [OSError(errno.ENOSPC, "No space left on device")]
+
+    def flaky_append_segment(generation: Path, frames: bytes) -> None:
+        if failures:
+            raise failures.pop()
+        append_segment(generation, frames)
+
+    monkeypatch.setattr(store, "append_segment", flaky_append_segment)
+    stop = threading.Event()
+    stop.set()
+    wal_shipping.WalShipper(database, store).run(stop, interval=0.01)
+
+    assert "retrying in 0.0s: [Errno 28] No space left on device" in (
+        capsys.readouterr().err
+    )
+    store.restore(datetime.now(UTC), tmp_path / "restored.db")
+    restored = sqlite3.connect(tmp_path / "restored.db")
+    assert restored.execute("SELECT count(*) FROM entries").fetchone() == (10,)
+    restored.close()
+
+    failures.append(PermissionError(errno.EACCES, "Permission denied"))
+    with pytest.raises(PermissionError):
+        wal_shipping.WalShipper(database, store).run(stop, interval=0.01)
+    connection.close()
+
+
+class LocalS3:
+    """Serve ``aws s3 sync`` from a local directory standing in for a bucket."""
+
+    def __init__(self, bucket: Path) -> None:
+        self.bucket = bucket
+        self.downloaded: list[str] = []
+
+    def __call__(self, arguments: list[str]) -> None:
+        assert arguments[:2] == ["s3", "sync"]
+        source = self.bucket / arguments[2].removeprefix("s3://bucket").lstrip("/")
+        destination = Path(arguments[3])
+        rules = [
+            (flag, pattern)
+            for flag, pattern in zip(arguments[4:], arguments[5:], strict=False)
+            if flag in ("--include", "--exclude")
+        ]
+
+        def included(name: str) -> bool:
+            result = True
+            for flag, pattern in rules:
+                if fnmatch(name, pattern):
+                    result = flag == "--include"
+            return result
+
+        remote = {
+            path.relative_to(source).as_posix()
+            for path in source.rglob("*")
+            if path.is_file()
+        }
+        for name in sorted(remote):
+            target = destination / name
+            if included(name) and not target.is_file():
+                target.parent.mkdir(parents=True, exist_ok=True)
+                shutil.copyfile(source / name, target)
+                self.downloaded.append(name)
+        if "--delete" in arguments:
+            for path in list(destination.rglob("*")):
+                name = path.relative_to(destination).as_posix()
+                if path.is_file() and included(name) and name not in remote:
+                    path.unlink()
+
+
+def test_restic_mirror_fetches_only_new_and_needed_packs(tmp_path: Path):
+    bucket = tmp_path / "bucket"
+    tree_pack, needed_pack, other_pack = (
+        "aa" + "1" * 62,
+        "bb" + "2" * 62,
+        "cc" + "3" * 62,
+    )
+    for name in ("config", "keys/k1", "snapshots/s1", "index/i1"):
+        (bucket / name).parent.mkdir(parents=True, exist_ok=True)
+        (bucket / name).write_text(name)
+    for pack in (tree_pack, needed_pack, other_pack):
+        (bucket / "data" / pack[:2]).mkdir(parents=True)
+        (bucket / "data" / pack[:2] / pack).write_text(pack)
+    s3 = LocalS3(bucket)
+
+    mirror = ResticMirror("s3://bucket", tmp_path / "cache", s3)
+    mirror.sync()
+    assert len(s3.downloaded) == 7
+    s3.downloaded.clear()
+    (bucket / "data" / "cc" / other_pack).unlink()
+    (bucket / "snapshots" / "s2").write_text("s2")
+    mirror.sync()
+    assert s3.downloaded == ["snapshots/s2"]
+    assert not mirror.pack_path(other_pack).exists()
+
+    index = {
+        "packs": [
+            {"id": tree_pack, "blobs": [{"id": "root", "type": "tree"}]},
+            {"id": needed_pack, "blobs": [{"id": "chunk", "type": "data"}]},
+            {"id": other_pack, "blobs": [{"id": "unused", "type": "data"}]},
+        ]
+    }
+    tree = {"nodes": [{"name": "database.db", "type": "file", "content": ["chunk"]}]}
+    outputs = {
+        "list": "i1\n",
+        "cat index": json.dumps(index),
+        "cat blob": json.dumps(tree),
+    }
+
+    def restic(arguments: list[str]) -> str:
+        return outputs.get(" ".join(arguments[:2]), outputs.get(arguments[0], ""))
+
+    partial = ResticMirror("s3://bucket", tmp_path / "partial", s3)
+    s3.downloaded.clear()
+    partial.sync(include_data=False)
+    snapshot = Snapshot("s1", "s1", parse_restic_time("2026-01-01"), "root")
+    assert partial.fetch_snapshot(restic, snapshot) == 2
+    assert [name for name in s3.downloaded if name.startswith(("aa", "bb", "cc"))] == [
+        f"aa/{tree_pack}",
+        f"bb/{needed_pack}",
+    ]
+
+
+def test_restored_database_cache_evicts_least_recently_used_entries(tmp_path: Path):
+    database = tmp_path / "database.db"
+    database.write_bytes(b"x" * 100)
+    cache = RestoredDatabaseCache(tmp_path / "cache", limit_bytes=250)
+    seeds = {"DEVELOPMENT_AUTH_SUBJECT": "local-developer"}
+
+    first = cache.put(database, "first", "sha256:one", seeds)
+    second = cache.put(database, "second", "sha256:one", seeds)
+    os.utime(first, ns=(1, 1))
+    os.utime(second, ns=(2, 2))
+    assert cache.get("first", "sha256:one", seeds) == first
+    cache.put(database, "third", "sha256:one", seeds)
+
+    assert cache.get("second", "sha256:one", seeds) is None
+    assert cache.get("first", "sha256:one", seeds) == first
+    assert cache.get("first", "sha256:one", {"DEVELOPMENT_AUTH_SUBJECT": "x"}) is None
+
+
+def test_archive_store_compresses_deduplicates_and_restores(tmp_path: Path):
+    store = ArchiveStore(tmp_path / "archive")
+    database = tmp_path / "database.db"
+    database.write_bytes(b"ledger" * 100_000)
+    staged = store.stage(database)
+    assert staged.stat().st_ino == database.stat().st_ino
+    database.unlink()
+    duplicate = store.pending_directory / "database-20260102T000000Z.db"
+    duplicate.write_bytes(b"ledger" * 100_000)
+    legacy = tmp_path / "archive" / "database-20250101T000000Z.db"
+    legacy.write_bytes(b"legacy")
+
+    archived = store.archive_pending()
+
+    assert len(archived) == 1
+    assert archived[0].compressed
+    assert archived[0].size < 600_000
+    assert store.pending() == []
+    assert [archive.path for archive in store.entries()] == [legacy, archived[0].path]
+    restored = tmp_path / "restored.db"
+    store.restore(store.find(archived[0].path.name), restored)
+    assert restored.read_bytes() == b"ledger" * 100_000
+    store.restore(store.find("20250101"), restored)
+    assert restored.read_bytes() == b"legacy"
+
+
+def test_archive_retention_keeps_recent_daily_weekly_and_monthly_copies():
+    def archive(moment: str) -> Archive:
+        return Archive(
+            Path(f"{moment}.db.zst"), datetime.fromisoformat(moment), None, 1
+        )
+
+    archives = [
+        archive("2026-01-15T00:00:00+00:00"),
+        archive("2026-02-15T00:00:00+00:00"),
+        archive("2026-03-02T00:00:00+00:00"),
+        archive("2026-03-09T00:00:00+00:00"),
+        archive("2026-03-10T08:00:00+00:00"),
+        archive("2026-03-10T09:00:00+00:00"),
+    ]
+
+    kept = RetentionPolicy(last=1, daily=2, weekly=3, monthly=2).keep(archives)
+
+    assert kept == {
+        Path("2026-03-10T09:00:00+00:00.db.zst"),
+        Path("2026-03-09T00:00:00+00:00.db.zst"),
+        Path("2026-03-02T00:00:00+00:00.db.zst"),
+        Path("2026-02-15T00:00:00+00:00.db.zst"),
+    }
@@ -1,6 +1,17 @@
 import subprocess
+import sys
+import threading
+import time
 
-from orchestrator.core.runner import Runner
+import pytest
+
+from orchestrator.core.runner import Invocation, Runner
+from orchestrator.core.trace import (
+    SubprocessTrace,
+    command_name,
+    read_trace,
+    redact_arguments,
+)
 
 
 def test_runner_merges_environment_overrides(monkeypatch, tmp_path):
@@ -19,3 +30,147 @@ def test_runner_merges_environment_overrides(monkeypatch, tmp_path):
     assert captured["args"] == (["tool", "--value", "x"],)
     assert captured["kwargs"]["cwd"] == tmp_path  # type: ignore[index]
     assert captured["kwargs"]["env"]["FT_TEST"] == "yes"  # type: ignore[index]
+
+
+def test_run_many_prefixes_lines_and_keeps_invocation_order(capsys):
+    results = Runner(verbose=False).run_many(
+        [
+            Invocation(
+                [sys.executable, "-c", "import time; time.sleep(0.2); print('slow')"],
+                label="first",
+            ),
+            Invocation([sys.executable, "-c", "print('fast')"], label="second"),
+        ],
+        limit=2,
+    )
+
+    assert [result.stdout for result in results] == ["slow\n", "fast\n"]
+    output = capsys.readouterr().out
+    assert output.index("[second] fast") < output.index("[first] slow")
+
+
+def test_run_many_fail_fast_terminates_siblings():
+    started = time.monotonic()
+
+    with pytest.raises(subprocess.CalledProcessError) as error:
+        Runner(verbose=False).run_many(
+            [
+                Invocation([sys.executable, "-c", "import time; time.sleep(60)"]),
+                Invocation([sys.executable, "-c", "raise SystemExit(3)"]),
+                Invocation([sys.executable, "-c", "print('never started')"]),
+            ],
+            limit=2,
+            capture_output=True,
+        )
+
+    assert error.value.returncode == 3
+    assert time.monotonic() - started < 30
+
+
+def test_run_many_kills_siblings_that_ignore_termination(monkeypatch):
+    monkeypatch.setattr("orchestrator.core.runner.TERMINATION_GRACE_SECONDS", 0.2)
+    ignore_termination = (
+        "import signal, time; signal.signal(signal.SIGTERM, signal.SIG_IGN);"
+        " time.sleep(60)"
+    )
+    started = time.monotonic()
+
+    with pytest.raises(subprocess.CalledProcessError):
+        Runner(verbose=False).run_many(
+            [
+                Invocation([sys.executable, "-c", ignore_termination]),
+                Invocation(
+                    [sys.executable, "-c", "import time; time.sleep(1); exit(3)"]
+                ),
+            ],
+            limit=2,
+            capture_output=True,
+        )
+
+    assert time.monotonic() - started < 10
+
+
+def test_run_many_collects_every_failure_when_not_failing_fast():
+    with pytest.raises(RuntimeError, match="2 of 3 commands failed"):
+        Runner(verbose=False).run_many(
+            [
+                Invocation([sys.executable, "-c", "raise SystemExit(1)"]),
+                Invocation([sys.executable, "-c", "print('ok')"]),
+                Invocation([sys.executable, "-c", "raise SystemExit(2)"]),
+            ],
+            fail_fast=False,
+            capture_output=True,
+        )
+
+
+def test_traced_runner_records_redacted_arguments_and_child_usage(tmp_path):
+    trace = SubprocessTrace(tmp_path / "trace.jsonl", invocation=["ci", "run"])
+    script = "x = bytearray(64 * 1024 * 1024); sum(range(2_000_000))"
+
+    Runner(verbose=False, trace=trace).run(
+        [sys.executable, "-c", script, "RESTIC_PASSWORD=hunter2"]
+    )
+    with pytest.raises(subprocess.CalledProcessError):
+        Runner(verbose=False, trace=trace).run_many(
+            [Invocation([sys.executable, "-c", "raise SystemExit(3)"], label="fail")]
+        )
+
+    first, second = read_trace(tmp_path / "trace.jsonl")
+    assert first["argv"][-1] == "RESTIC_PASSWORD=<redacted>"
+    assert first["returncode"] == 0 and first["invocation"] == ["ci", "run"]
+    assert first["max_rss_kib"] > 64 * 1024 and first["user_cpu"] > 0
+    assert second["returncode"] == 3 and second["run"] == first["run"]
+
+
+def test_command_names_skip_option_values_and_image_registries():
+    assert (
+        command_name(
+            [
+                "/usr/bin/docker",
+                "run",
+                "--rm",
+                "--volume",
+                "data:/data",
+                "docker.io/restic/restic:0.18.0@sha256:abc",
+                "check",
+            ]
+        )
+        == "docker run restic:0.18.0 check"
+    )
+    assert command_name(["npm", "exec", "--", "tsc", "--noEmit"]) == "npm exec tsc"
+    assert redact_arguments(["https://user:pw@example.com/repo"]) == [
+        "https://<redacted>@example.com/repo"
+    ]
+
+
+def test_runner_hands_an_open_file_to_the_command_as_stdin(tmp_path):
+    source = tmp_path / "input.bin"
+    source.write_bytes(b"streamed\n")
+
+    with source.open("rb") as stdin:
+        result = Runner(verbose=False).run(["cat"], capture_output=True, stdin=stdin)
+
+    assert result.stdout == "streamed\n"
+
+
+def test_traced_runner_exchanges_pipes_and_stops_when_cancelled(tmp_path):
+    trace = SubprocessTrace(tmp_path / "trace.jsonl")
+    cancellation = threading.Event()
+    runner = Runner(verbose=False, cancellation=cancellation, trace=trace)
+    script = (
+        "import sys; print(sys.stdin.read().upper()); print('err', file=sys.stderr)"
+    )
+
+    result = runner.run(
+        [sys.executable, "-c", script], capture_output=True, input_text="ledger"
+    )
+    threading.Timer(0.2, cancellation.set).start()
+    started = time.monotonic()
+    with pytest.raises(RuntimeError, match="Cancelled subprocess"):
+        runner.run([sys.executable, "-c", "import time; time.sleep(30)"])
+
+    assert (result.stdout, result.stderr) == ("LEDGER\n", "err\n")
+    assert time.monotonic() - started < 5
+    first, cancelled = read_trace(tmp_path / "trace.jsonl")
+    assert first["returncode"] == 0 and first["user_cpu"] is not None
+    assert cancelled["returncode"] == -15
@@ -0,0 +1,207 @@
+import json
+import subprocess
+import sys
+import threading
+import time
+from argparse import Namespace
+from pathlib import Path
+
+import pytest
+
+from orchestrator.commands import pipeline
+from orchestrator.core.context import Context
+from orchestrator.core.paths import RepoPaths
+from orchestrator.core.runner import Runner
+from orchestrator.core.scheduler import Step, run_steps, topological_order
+from orchestrator.core.step_cache import StepCache
+from orchestrator.core.timeline import recording
+
+
+def test_steps_run_after_prerequisites_without_interleaving_output(
+    tmp_path: Path, capsys
+):
+    started = threading.Barrier(2, timeout=5)
+    finished: list[str] = []
+
+    def independent(name: str):
+        def action(context: Context) -> None:
+            print(f"{name} first line")
+            started.wait()
+            context.runner.run(
+                [sys.executable, "-c", f"print('{name} subprocess line')"]
+            )
+            finished.append(name)
+
+        return action
+
+    def dependent(_context: Context) -> None:
+        assert sorted(finished) == ["left", "right"]
+        print("joined")
+
+    run_steps(
+        Context(paths=RepoPaths(tmp_path), runner=Runner(verbose=False)),
+        [
+            Step("left", independent("left")),
+            Step("right", independent("right")),
+            Step("join", dependent, ("left", "right")),
+        ],
+        jobs=2,
+    )
+
+    output = capsys.readouterr().out
+    for name in ("left", "right"):
+        assert (
+            f"==> {name} passed in" in output
+            and f"{name} first line\n{name} subprocess line\n" in output
+        )
+    assert output.index("joined") > output.index("==> join passed")
+
+
+def test_failed_step_cancels_running_siblings_and_skips_dependents(tmp_path: Path):
+    started = time.monotonic()
+    ran: list[str] = []
+
+    def slow(context: Context) -> None:
+        context.runner.run([sys.executable, "-c", "import time; time.sleep(60)"])
+
+    def failing(_context: Context) -> None:
+        time.sleep(0.2)
+        raise RuntimeError("broken")
+
+    with pytest.raises(RuntimeError, match="Step failing failed: broken"):
+        run_steps(
+            Context(paths=RepoPaths(tmp_path), runner=Runner(verbose=False)),
+            [
+                Step("slow", slow),
+                Step("failing", failing),
+                Step("after", lambda _context: ran.append("after"), ("slow",)),
+            ],
+            jobs=2,
+        )
+
+    assert time.monotonic() - started < 30
+    assert ran == []
+
+
+def test_topological_order_rejects_cycles():
+    with pytest.raises(ValueError, match="cycle"):
+        topological_order(
+            [Step("a", print, ("b",)), Step("b", print, ("a",))],
+        )
+
+
+def test_ci_workflows_form_one_acyclic_step_graph():
+    steps = pipeline.select_steps(
+        name for names in pipeline.WORKFLOWS.values() for name in names
+    )
+
+    assert len(topological_order(steps)) == len(pipeline.STEPS)
+    api_contract = {step.name: step for step in steps}["frontend models --verify"]
+    assert "backend build" in api_contract.requires
+    assert pipeline.select_steps(pipeline.WORKFLOWS["api-contract"])[-1].requires == (
+        "frontend install",
+    )
+
+
+def test_timed_steps_run_alone_after_the_workflow_and_uncached(
+    monkeypatch, tmp_path: Path
+):
+    batches: list[tuple[list[str], int]] = []
+    monkeypatch.setattr(
+        pipeline,
+        "run_steps",
+        lambda _context, steps, jobs, _cache: batches.append(
+            ([step.name for step in steps], jobs)
+        ),
+    )
+
+    pipeline.python_workflow(
+        Context(paths=RepoPaths(tmp_path), runner=Runner(verbose=False)),
+        Namespace(jobs=4, no_cache=True),
+    )
+
+    assert [jobs for _, jobs in batches] == [4, 1]
+    assert "python startup" not in batches[0][0]
+    assert batches[1][0] == ["python startup"]
+    assert not next(
+        step for step in pipeline.STEPS if step.name == "python startup"
+    ).inputs
+
+
+def test_cached_steps_skip_unchanged_checks_and_their_prerequisites(
+    tmp_path: Path, capsys
+):
+    (tmp_path / "config").mkdir()
+    (tmp_path / "config" / "toolchain.toml").write_text("[tools]\n", encoding="utf-8")
+    (tmp_path / "src").mkdir()
+    source = tmp_path / "src" / "module.py"
+    source.write_text("value = 1\n", encoding="utf-8")
+    ran: list[str] = []
+    steps = [
+        Step("install", lambda _context: ran.append("install")),
+        Step("check", lambda _context: ran.append("check"), ("install",), ("src/*",)),
+    ]
+    context = Context(paths=RepoPaths(tmp_path), runner=Runner(verbose=False))
+
+    def run_cached() -> None:
+        cache = StepCache(tmp_path, context.paths.ci_cache, context.paths.toolchain)
+        run_steps(context, steps, cache=cache)
+
+    run_cached()
+    run_cached()
+    assert ran == ["install", "check"]
+    assert "==> check cached" in capsys.readouterr().out
+
+    source.write_text("value = 2\n", encoding="utf-8")
+    run_cached()
+    assert ran == ["install", "check", "install", "check"]
+    assert (
+        StepCache(tmp_path, context.paths.ci_cache, context.paths.toolchain).prune()
+        == 1
+    )
+
+
+def test_step_inputs_use_git_listing_and_slash_aware_globs(tmp_path: Path):
+    for name in ("src/a.py", "src/nested/b.py", "build/out.py", ".gitignore"):
+        (tmp_path / name).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / name).write_text("build/\n", encoding="utf-8")
+
+    def matching(*patterns: str) -> list[str]:
+        cache = StepCache(tmp_path, tmp_path / "cache", tmp_path / "toolchain")
+        return cache._matching(patterns)
+
+    assert matching("src/*") == ["src/a.py"]
+    assert matching("src/**") == ["src/a.py", "src/nested/b.py"]
+    assert "build/out.py" in matching("**/*.py")
+
+    subprocess.run(["git", "init", "-q"], cwd=tmp_path, check=True)
+    subprocess.run(["git", "add", "src/a.py"], cwd=tmp_path, check=True)
+    assert matching("**/*.py") == ["src/a.py", "src/nested/b.py"]
+
+
+def test_recorded_timeline_nests_subprocesses_in_their_steps(tmp_path: Path):
+    def step(context: Context) -> None:
+        context.runner.run([sys.executable, "-c", "pass"])
+
+    with recording(tmp_path / "trace.json"):
+        run_steps(
+            Context(paths=RepoPaths(tmp_path), runner=Runner(verbose=False)),
+            [Step("first", step), Step("second", step, ("first",))],
+            jobs=2,
+        )
+
+    events = json.loads((tmp_path / "trace.json").read_text())["traceEvents"]
+    spans = {event["name"]: event for event in events if event["ph"] == "X"}
+    subprocesses = [event for event in events if event.get("cat") == "subprocess"]
+    assert len(subprocesses) == 2
+    for subprocess_span in subprocesses:
+        parent = next(
+            spans[name]
+            for name in ("first", "second")
+            if spans[name]["tid"] == subprocess_span["tid"]
+            and spans[name]["ts"] <= subprocess_span["ts"]
+            and subprocess_span["ts"] + subprocess_span["dur"]
+            <= spans[name]["ts"] + spans[name]["dur"]
+        )
+        assert parent["cat"] == "step"
+    assert spans["second"]["ts"] >= spans["first"]["ts"] + spans["first"]["dur"]